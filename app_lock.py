@@ -0,0 +1,111 @@
+"""
+Lockdatei für die Übergabe zwischen App und Updater.
+
+Die App hält save-backup.lock exklusiv gesperrt, solange sie läuft, und gibt die Sperre
+frei, sobald alles geschrieben ist (closeEvent). Der Updater bekommt PID und Lockdatei
+übergeben, wartet auf genau diese Sperre und diesen Prozess und tauscht die exe sofort
+danach aus - ohne Prozessliste und ohne feste Pause. Stirbt die App, gibt das Betriebssystem
+die Sperre automatisch frei.
+
+FileLock nutzt denselben Mechanismus für kurze Schreibvorgänge, die GUI und Kommandozeile
+gleichzeitig machen können (refs.json im Blob-Speicher, Journal von save_paths.json).
+"""
+import os
+import time
+import threading
+
+LOCK_FILE = "save-backup.lock"
+LOCK_POLL = 0.02  # Sekunden zwischen zwei Versuchen beim Warten
+
+if os.name == "nt":
+    import msvcrt
+
+    def _try_lock(fd):
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _try_lock(fd):
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class AppLock:
+    def __init__(self, path=LOCK_FILE):
+        self.path = path
+        self._fd = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def acquire(self, timeout=0):
+        """Sperrt die Lockdatei; wartet bis zu timeout Sekunden (None: unbegrenzt). Gibt True/False zurück."""
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not _try_lock(fd):
+            if deadline is not None and time.monotonic() >= deadline:
+                os.close(fd)
+                return False
+            time.sleep(LOCK_POLL)
+        # PID hineinschreiben, nur zur Information (gewartet wird auf die Sperre)
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        os.lseek(fd, 0, os.SEEK_SET)
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            _unlock(self._fd)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class FileLock:
+    """
+    Exklusive Sperre über Threads und Prozesse hinweg, im selben Thread wiederbetretbar
+    (flock-Sperren verschiedener Dateideskriptoren würden sich sonst selbst blockieren).
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = AppLock(path)
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            if self._depth == 0:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._lock.acquire(timeout=None)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            self._lock.release()
+        self._thread_lock.release()
@@ -0,0 +1,216 @@
+"""
+Komprimiertes Einzeldatei-Archiv für Backups (backup.sba im Backup-Ordner).
+
+Aufbau:
+    MAGIC
+    pro Datei: Folge von Blöcken [clen u32][rawlen u32][methode u8][daten]
+    Index (zlib-komprimiertes JSON mit Pfad, Größe, mtime, Hash und Block-Offsets)
+    Footer: [index_offset u64][index_len u32][FOOTER_MAGIC]
+
+Jeder Block (max. CHUNK_SIZE roh) wird einzeln komprimiert. Dadurch bleibt der Speicherbedarf
+beim Schreiben und Lesen begrenzt, und einzelne Dateien lassen sich über den Index direkt
+anspringen, ohne das ganze Archiv zu entpacken.
+"""
+import os
+import bz2
+import json
+import lzma
+import zlib
+import struct
+import hashlib
+
+from copy_engine import check_cancel, make_dirs
+from backup_store import scan_items
+from op_log import timed
+import io_throttle
+
+ARCHIVE_FILE = "backup.sba"
+MAGIC = b"SBAK1\0\0\0"
+FOOTER_MAGIC = b"SBAIDX1\0"
+FOOTER = struct.Struct("<QI8s")
+BLOCK = struct.Struct("<IIB")
+CHUNK_SIZE = 1024 * 1024
+
+METHOD_STORED = 0
+METHOD_COMPRESSED = 1
+
+CODECS = {
+    "zlib": (lambda data: zlib.compress(data, 6), zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+    "bz2": (lambda data: bz2.compress(data, 9), bz2.decompress),
+}
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def archive_path(backup_path):
+    return os.path.join(backup_path, ARCHIVE_FILE)
+
+
+def is_archive_backup(backup_path):
+    return os.path.isfile(archive_path(backup_path))
+
+
+def create_archive_backup(src_root, names, dst, codec="zlib", progress=None, cancel=None):
+    """Sichert die ausgewählten Namen als ein komprimiertes Archiv in den Backup-Ordner dst."""
+    if os.path.exists(dst):
+        raise FileExistsError(f"Backup {dst} existiert bereits")
+    with timed("scan"):
+        items, dirs, errors = scan_items(src_root, names)
+    if progress:
+        progress.total(sum(st.st_size for _, files in items for _, _, st in files),
+                       sum(len(files) for _, files in items))
+    os.makedirs(dst)
+    try:
+        with timed("copy"):
+            copied, write_errors = write_archive(archive_path(dst), items, dirs, codec, progress, cancel)
+    except BaseException:
+        os.rmdir(dst)
+        raise
+    return copied, errors + write_errors
+
+
+def list_entries(path):
+    return [entry["path"] for entry in read_index(path)["files"]]
+
+
+def write_archive(path, items, dirs, codec="zlib", progress=None, cancel=None):
+    """
+    Schreibt alle Dateien aus items ([(name, [(rel_pfad, abs_pfad, stat)])], siehe
+    backup_store.scan_items) als Stream in ein Archiv. Gibt (kopierte Namen, Fehler) zurück.
+    """
+    if codec not in CODECS:
+        raise ArchiveError(f"Unbekanntes Kompressionsverfahren: {codec}")
+    compress, _ = CODECS[codec]
+    entries = []
+    copied = []
+    errors = []
+    tmp_path = path + ".tmp"
+
+    try:
+        with open(tmp_path, "wb") as out:
+            out.write(MAGIC)
+            for name, files in items:
+                item_entries = []
+                item_start = out.tell()
+                try:
+                    for rel_path, abs_path, st in files:
+                        check_cancel(cancel)
+                        item_entries.append(_write_entry(out, rel_path, abs_path, st, compress, progress, cancel))
+                except (OSError, ValueError) as e:
+                    # Angefangene Datei verwerfen, damit das Archiv konsistent bleibt
+                    out.seek(item_start)
+                    out.truncate()
+                    errors.append((name, e))
+                    continue
+                entries.extend(item_entries)
+                copied.append(name)
+
+            index = zlib.compress(json.dumps({
+                "version": 1,
+                "codec": codec,
+                "items": copied,
+                "dirs": dirs,
+                "files": entries,
+            }, ensure_ascii=False).encode("utf-8"))
+            index_offset = out.tell()
+            out.write(index)
+            out.write(FOOTER.pack(index_offset, len(index), FOOTER_MAGIC))
+            with timed("fsync"):
+                out.flush()
+                os.fsync(out.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return copied, errors
+
+
+def _write_entry(out, rel_path, abs_path, st, compress, progress, cancel):
+    hasher = hashlib.sha256()
+    blocks = []
+    size = 0
+    with open(abs_path, "rb") as src:
+        while chunk := src.read(CHUNK_SIZE):
+            check_cancel(cancel)
+            hasher.update(chunk)
+            data = compress(chunk)
+            method = METHOD_COMPRESSED
+            if len(data) >= len(chunk):
+                data, method = chunk, METHOD_STORED  # nicht komprimierbar (z.B. schon gepackt)
+            blocks.append(out.tell())
+            out.write(BLOCK.pack(len(data), len(chunk), method))
+            out.write(data)
+            size += len(chunk)
+            io_throttle.charge(len(chunk), cancel=cancel)
+            if progress:
+                progress(len(chunk), 0)
+    if progress:
+        progress(0, 1)
+    return {"path": rel_path, "size": size, "mtime": st.st_mtime, "hash": hasher.hexdigest(), "blocks": blocks}
+
+
+def read_index(path):
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() < len(MAGIC) + FOOTER.size:
+            raise ArchiveError(f"{path} ist kein gültiges Archiv")
+        f.seek(-FOOTER.size, os.SEEK_END)
+        index_offset, index_len, magic = FOOTER.unpack(f.read(FOOTER.size))
+        if magic != FOOTER_MAGIC:
+            raise ArchiveError(f"{path} ist unvollständig oder beschädigt")
+        f.seek(index_offset)
+        return json.loads(zlib.decompress(f.read(index_len)).decode("utf-8"))
+
+
+def iter_entry(f, entry, decompress):
+    """Liefert den Inhalt einer Datei blockweise, ohne den Rest des Archivs anzufassen."""
+    for offset in entry["blocks"]:
+        f.seek(offset)
+        clen, rawlen, method = BLOCK.unpack(f.read(BLOCK.size))
+        data = f.read(clen)
+        if method == METHOD_COMPRESSED:
+            data = decompress(data)
+        if len(data) != rawlen:
+            raise ArchiveError(f"Block von {entry['path']} ist beschädigt")
+        yield data
+
+
+def extract_archive(path, target_root, paths=None, progress=None, cancel=None):
+    """
+    Entpackt alle Dateien (oder nur die in paths) nach target_root.
+    Gibt die Liste [(zieldatei, Fehler)] zurück.
+    """
+    index = read_index(path)
+    _, decompress = CODECS[index["codec"]]
+    entries = index["files"]
+    if paths is not None:
+        wanted = set(paths)
+        entries = [e for e in entries if e["path"] in wanted or e["path"].split("/", 1)[0] in wanted]
+    else:
+        make_dirs(os.path.join(target_root, d) for d in index.get("dirs", []))
+    if progress:
+        progress.total(sum(e["size"] for e in entries), len(entries))
+    make_dirs(os.path.dirname(os.path.join(target_root, e["path"])) for e in entries)
+
+    errors = []
+    with open(path, "rb") as f:
+        for entry in entries:
+            dst_file = os.path.join(target_root, entry["path"])
+            try:
+                with open(dst_file, "wb") as dst:
+                    for data in iter_entry(f, entry, decompress):
+                        check_cancel(cancel)
+                        dst.write(data)
+                        io_throttle.charge(len(data), cancel=cancel)
+                        if progress:
+                            progress(len(data), 0)
+                os.utime(dst_file, (entry["mtime"], entry["mtime"]))
+            except (OSError, ArchiveError, zlib.error, lzma.LZMAError, ValueError) as e:
+                errors.append((dst_file, e))
+            if progress:
+                progress(0, 1)
+    return errors
@@ -0,0 +1,257 @@
+"""
+SQLite-Katalog aller Backups (BACKUP_DIR/catalog.sqlite).
+
+Hält pro Backup Spiel, Erstellzeit, Größe, Dateianzahl, Notiz und Favoriten-Flag, damit die
+Backup-Liste mit einer indizierten Abfrage statt os.listdir + Datums-Parsing gefüllt wird.
+Pro Spiel merkt sich der Katalog die mtime des Backup-Ordners; nur wenn sich diese ändert
+(z.B. weil jemand im Explorer Ordner gelöscht hat), wird der Ordner neu eingelesen.
+
+Zusätzlich steht jede gesicherte Datei (Pfad, Größe, mtime, Hash) in der Tabelle files, damit
+"welche Backups enthalten X" eine indizierte Abfrage ist statt eines Laufs durch BACKUP_DIR.
+Die Zeilen entstehen beim Eintragen eines Backups; ältere Kataloge werden bei der ersten
+Suche nachindiziert (index_missing).
+"""
+import os
+import sqlite3
+import datetime
+import threading
+
+from backup_store import is_store_backup, read_manifest
+from backup_archive import archive_path, is_archive_backup, read_index
+
+CATALOG_FILE = "catalog.sqlite"
+
+# Bekannte Namensformate von Backup-Ordnern (neues und altes Format)
+DATE_FORMATS = ("%d.%m.%Y_%H-%M-%S", "%Y-%m-%d_%H-%M-%S")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS backups (
+    game TEXT NOT NULL,
+    name TEXT NOT NULL,
+    created REAL NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    file_count INTEGER NOT NULL DEFAULT 0,
+    note TEXT NOT NULL DEFAULT '',
+    favorite INTEGER NOT NULL DEFAULT 0,
+    kind TEXT NOT NULL DEFAULT 'folder',
+    PRIMARY KEY (game, name)
+);
+CREATE INDEX IF NOT EXISTS backups_by_date ON backups (game, created DESC);
+CREATE INDEX IF NOT EXISTS backups_by_favorite ON backups (game, favorite, created DESC);
+CREATE TABLE IF NOT EXISTS games (
+    game TEXT PRIMARY KEY,
+    dir_mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    game TEXT NOT NULL,
+    backup TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL,
+    hash TEXT,
+    PRIMARY KEY (game, backup, path)
+);
+CREATE INDEX IF NOT EXISTS files_by_path ON files (game, path);
+CREATE INDEX IF NOT EXISTS files_by_hash ON files (hash);
+"""
+
+
+def parse_backup_date(name):
+    """Erstellzeit aus dem Ordnernamen, auch mit angehängtem Text ("2025-06-07_21-31-29 was geht")."""
+    stamp = name.split(" ", 1)[0]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(stamp, fmt).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+def backup_contents(backup_path):
+    """Gibt (art, [(rel_pfad, größe, mtime, hash)]) zurück; alte Ordnerkopien haben keinen Hash."""
+    if is_archive_backup(backup_path) or is_store_backup(backup_path):
+        if is_archive_backup(backup_path):
+            kind, entries = "archive", read_index(archive_path(backup_path))["files"]
+        else:
+            kind, entries = "store", read_manifest(backup_path)["files"]
+        return kind, [(e["path"], e["size"], e.get("mtime"), e.get("hash")) for e in entries]
+    files = []
+    for root, _, names in os.walk(backup_path):
+        rel_root = os.path.relpath(root, backup_path).replace(os.sep, "/")
+        for name in names:
+            st = os.stat(os.path.join(root, name))
+            rel_path = name if rel_root == "." else f"{rel_root}/{name}"
+            files.append((rel_path, st.st_size, st.st_mtime, None))
+    return "folder", files
+
+
+def backup_summary(backup_path):
+    """Gibt (art, größe, dateianzahl) eines Backup-Ordners zurück."""
+    kind, files = backup_contents(backup_path)
+    return kind, sum(f[1] for f in files), len(files)
+
+
+def _like_pattern(text):
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class BackupCatalog:
+    def __init__(self, backup_dir):
+        self.backup_dir = backup_dir
+        os.makedirs(backup_dir, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(backup_dir, CATALOG_FILE), check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.lock = threading.RLock()
+        with self.lock, self.db:
+            self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def game_dir(self, game):
+        return os.path.join(self.backup_dir, game)
+
+    # --- Abgleich mit dem Dateisystem
+
+    def _dir_mtime(self, game):
+        try:
+            return os.stat(self.game_dir(game)).st_mtime
+        except FileNotFoundError:
+            return 0.0
+
+    def _touch(self, game):
+        """Nach eigenen Änderungen die Ordner-mtime übernehmen, damit kein Rescan ausgelöst wird."""
+        self.db.execute("INSERT OR REPLACE INTO games (game, dir_mtime) VALUES (?, ?)",
+                        (game, self._dir_mtime(game)))
+
+    def ensure_synced(self, game, notes=None, favorites=None):
+        """Liest den Backup-Ordner nur neu ein, wenn er sich seit dem letzten Abgleich geändert hat."""
+        with self.lock:
+            row = self.db.execute("SELECT dir_mtime FROM games WHERE game = ?", (game,)).fetchone()
+            if row is not None and row["dir_mtime"] == self._dir_mtime(game):
+                return False
+            self.rescan(game, notes or {}, favorites or [])
+            return True
+
+    def rescan(self, game, notes, favorites):
+        game_dir = self.game_dir(game)
+        on_disk = set(os.listdir(game_dir)) if os.path.isdir(game_dir) else set()
+        known = {row["name"] for row in self.db.execute("SELECT name FROM backups WHERE game = ?", (game,))}
+
+        rows = []
+        file_rows = []
+        for name in on_disk - known:
+            path = os.path.join(game_dir, name)
+            if not os.path.isdir(path):
+                continue
+            created = parse_backup_date(name) or os.stat(path).st_mtime
+            try:
+                kind, files = backup_contents(path)
+            except (OSError, ValueError):
+                kind, files = "folder", []
+            rows.append((game, name, created, sum(f[1] for f in files), len(files),
+                         notes.get(name, ""), int(name in favorites), kind))
+            file_rows.extend((game, name) + f for f in files)
+
+        gone = [(game, name) for name in known - on_disk]
+        with self.lock, self.db:
+            self.db.executemany("DELETE FROM backups WHERE game = ? AND name = ?", gone)
+            self.db.executemany("DELETE FROM files WHERE game = ? AND backup = ?", gone)
+            self.db.executemany("INSERT OR REPLACE INTO backups VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", file_rows)
+            self._touch(game)
+
+    # --- Abfragen
+
+    def list_backups(self, game, favorites_only=False):
+        """Backups eines Spiels, neueste zuerst."""
+        query = "SELECT * FROM backups WHERE game = ?"
+        if favorites_only:
+            query += " AND favorite = 1"
+        with self.lock:
+            return self.db.execute(query + " ORDER BY created DESC", (game,)).fetchall()
+
+    def get(self, game, name):
+        with self.lock:
+            return self.db.execute("SELECT * FROM backups WHERE game = ? AND name = ?", (game, name)).fetchone()
+
+    # --- Dateisuche
+
+    def index_missing(self, game):
+        """Trägt die Dateien von Backups nach, die noch keine Zeilen in files haben (alte Kataloge)."""
+        with self.lock:
+            names = [row["name"] for row in self.db.execute(
+                "SELECT name FROM backups b WHERE game = ? AND file_count > 0 AND NOT EXISTS "
+                "(SELECT 1 FROM files f WHERE f.game = b.game AND f.backup = b.name)", (game,))]
+        for name in names:
+            try:
+                _, files = backup_contents(os.path.join(self.game_dir(game), name))
+            except (OSError, ValueError):
+                continue
+            with self.lock, self.db:
+                self.db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                                    [(game, name) + f for f in files])
+        return len(names)
+
+    def search_files(self, game, text, limit=200):
+        """Gesicherte Pfade, die text enthalten: Zeilen mit path, backups (Anzahl), latest (Erstellzeit)."""
+        with self.lock:
+            return self.db.execute(
+                "SELECT f.path, COUNT(*) AS backups, MAX(b.created) AS latest FROM files f "
+                "JOIN backups b ON b.game = f.game AND b.name = f.backup "
+                "WHERE f.game = ? AND f.path LIKE ? ESCAPE '\\' GROUP BY f.path ORDER BY f.path LIMIT ?",
+                (game, _like_pattern(text), limit)).fetchall()
+
+    def file_versions(self, game, path):
+        """Alle Backups mit genau dieser Datei (Größe, mtime, Hash der Kopie), neueste zuerst."""
+        with self.lock:
+            return self.db.execute(
+                "SELECT b.name, b.created, b.favorite, b.note, f.size, f.mtime, f.hash FROM files f "
+                "JOIN backups b ON b.game = f.game AND b.name = f.backup "
+                "WHERE f.game = ? AND f.path = ? ORDER BY b.created DESC", (game, path)).fetchall()
+
+    def backups_with_hash(self, digest):
+        """(spiel, backup, pfad) aller Dateien mit diesem Inhalt, über alle Spiele."""
+        with self.lock:
+            return self.db.execute("SELECT game, backup, path FROM files WHERE hash = ?", (digest,)).fetchall()
+
+    # --- Änderungen
+
+    def add_backup(self, game, name, note="", created=None):
+        path = os.path.join(self.game_dir(game), name)
+        kind, files = backup_contents(path)
+        created = created or parse_backup_date(name) or os.stat(path).st_mtime
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO backups VALUES (?, ?, ?, ?, ?, ?, 0, ?)",
+                            (game, name, created, sum(f[1] for f in files), len(files), note, kind))
+            self.db.execute("DELETE FROM files WHERE game = ? AND backup = ?", (game, name))
+            self.db.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)", [(game, name) + f for f in files])
+            self._touch(game)
+
+    def rename_backup(self, game, old_name, new_name):
+        with self.lock, self.db:
+            self.db.execute("UPDATE backups SET name = ? WHERE game = ? AND name = ?", (new_name, game, old_name))
+            self.db.execute("UPDATE files SET backup = ? WHERE game = ? AND backup = ?", (new_name, game, old_name))
+            self._touch(game)
+
+    def delete_backups(self, game, names):
+        with self.lock, self.db:
+            self.db.executemany("DELETE FROM backups WHERE game = ? AND name = ?", [(game, n) for n in names])
+            self.db.executemany("DELETE FROM files WHERE game = ? AND backup = ?", [(game, n) for n in names])
+            self._touch(game)
+
+    def delete_game(self, game):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM backups WHERE game = ?", (game,))
+            self.db.execute("DELETE FROM files WHERE game = ?", (game,))
+            self.db.execute("DELETE FROM games WHERE game = ?", (game,))
+
+    def set_note(self, game, name, note):
+        with self.lock, self.db:
+            self.db.execute("UPDATE backups SET note = ? WHERE game = ? AND name = ?", (note, game, name))
+
+    def set_favorite(self, game, name, favorite):
+        with self.lock, self.db:
+            self.db.execute("UPDATE backups SET favorite = ? WHERE game = ? AND name = ?",
+                            (int(favorite), game, name))
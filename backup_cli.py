@@ -0,0 +1,297 @@
+"""
+Kommandozeile für Backups ohne GUI (z.B. für Cron oder systemd-Timer).
+
+    python backup_cli.py list [spiel]
+    python backup_cli.py backup --all [--jobs 2]
+    python backup_cli.py backup <spiel> [datei ...]
+    python backup_cli.py restore <spiel> <backup> [--mirror] [--dry-run] [datei ...]
+    python backup_cli.py undo-restore <spiel>
+    python backup_cli.py prune <spiel>|--all [--dry-run]
+    python backup_cli.py verify [spiel ...]
+    python backup_cli.py find <spiel> <text> [--differs] [--first-change]
+
+Lädt weder PyQt5 noch requests. Backup, Restore, Prüfen und Aufräumen laufen über den job_scheduler:
+Spiele auf verschiedenen Platten gleichzeitig, auf derselben Platte höchstens "device_jobs"
+(settings.json) auf einmal. --jobs begrenzt die Jobs insgesamt, --workers die Kopier-Threads
+pro Spiel. Spiele mit demselben Savegame-Ordner werden nur einmal gelesen und teilen sich
+das Backup.
+"""
+import os
+import sys
+import argparse
+import datetime
+
+from backup_core import BackupCore, backup_path, format_size, new_backup_name
+from job_scheduler import DEFAULT_MAX_JOBS
+
+DEFAULT_JOBS = DEFAULT_MAX_JOBS
+
+
+def cmd_list(core, args):
+    if not args.game:
+        for game, data in core.savegames.items():
+            print(f"{game}\t{len(core.list_backups(game))} Backup(s)\t{data['path']}")
+        return 0
+    if args.game not in core.savegames:
+        print(f"Unbekanntes Spiel: {args.game}", file=sys.stderr)
+        return 2
+    for row in core.list_backups(args.game):
+        created = datetime.datetime.fromtimestamp(row["created"]).strftime("%Y-%m-%d %H:%M:%S")
+        star = "*" if row["favorite"] else " "
+        print(f"{star} {row['name']}\t{created}\t{row['file_count']} Datei(en)\t{format_size(row['size'])}")
+    return 0
+
+
+def cmd_backup(core, args):
+    if args.all:
+        games = list(core.savegames)
+    elif args.game:
+        games = [args.game]
+    else:
+        print("Bitte ein Spiel oder --all angeben.", file=sys.stderr)
+        return 2
+    unknown = [game for game in games if game not in core.savegames]
+    if unknown:
+        print(f"Unbekanntes Spiel: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    name = new_backup_name()
+
+    def run(game, names):
+        return lambda progress, cancel: core.run_backup(game, names, name, progress, cancel)
+
+    failed = 0
+    # Threads statt Prozesse: die Arbeit ist I/O-gebunden, hashlib gibt das GIL frei
+    with core.make_scheduler(args.jobs) as scheduler:
+        leaders = {}  # Future -> Spiel, dessen Job den Ordner liest (zusammengelegte Jobs teilen die Future)
+        futures = []
+        for game in games:
+            try:
+                names = args.names if args.names and not args.all else core.all_names(game)
+            except OSError as e:
+                print(f"{game}: Backup fehlgeschlagen: {e}", file=sys.stderr)
+                failed += 1
+                continue
+            future = scheduler.submit("backup", run(game, names), core.game_devices(game),
+                                      key=core.backup_key(game, names), title=game, targets=core.store_devices())
+            futures.append((game, leaders.setdefault(future, game), future))
+        backed_up = []
+        for game, leader, future in futures:
+            try:
+                copied, errors = future.result()
+                if leader != game:
+                    core.share_backup(game, name, leader, name)
+            except Exception as e:
+                print(f"{game}: Backup fehlgeschlagen: {e}", file=sys.stderr)
+                failed += 1
+                continue
+            # Notizen/Katalog nur aus diesem Thread schreiben
+            core.record_backup(game, name, copied)
+            shared = f" (gemeinsam mit {leader})" if leader != game else ""
+            print(f"{game}: Backup {name} mit {len(copied)} Datei(en) erstellt{shared}")
+            for path, e in errors:
+                print(f"{game}: Fehler bei {path}: {e}", file=sys.stderr)
+            failed += bool(errors)
+            backed_up.append(game)
+        # Aufräumen erst, wenn alle Backups fertig sind (gibt Blobs frei, die sie gerade teilen)
+        prunes = [(game, submit_prune(core, scheduler, game)) for game in backed_up]
+        for game, future in prunes:
+            failed += finish_prune(core, game, future)
+    return 1 if failed else 0
+
+
+def submit_prune(core, scheduler, game):
+    """Reiht das Aufräumen laut Aufbewahrungsregel ein; None, wenn nichts zu löschen ist."""
+    names = core.retention_candidates(game)
+    if not names:
+        return None
+    return scheduler.submit("prune", lambda progress, cancel: core.prune_backups(game, names, progress, cancel),
+                            core.store_devices(), title=game)
+
+
+def finish_prune(core, game, future):
+    """Wertet einen Aufräum-Job aus (Katalog nur aus diesem Thread). Gibt 1 bei Fehlern zurück, sonst 0."""
+    if future is None:
+        return 0
+    try:
+        deleted, errors = future.result()
+    except Exception as e:
+        print(f"{game}: Aufräumen fehlgeschlagen: {e}", file=sys.stderr)
+        return 1
+    core.forget_backups(game, deleted)
+    if deleted:
+        print(f"{game}: {len(deleted)} alte(s) Backup(s) gelöscht")
+    for path, e in errors:
+        print(f"{game}: Fehler beim Löschen von {path}: {e}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def cmd_prune(core, args):
+    if args.all:
+        games = [game for game, data in core.savegames.items() if data.get("retention")]
+    elif args.game:
+        games = [args.game]
+    else:
+        print("Bitte ein Spiel oder --all angeben.", file=sys.stderr)
+        return 2
+    if any(game not in core.savegames for game in games):
+        print(f"Unbekanntes Spiel: {args.game}", file=sys.stderr)
+        return 2
+    if args.dry_run:
+        for game in games:
+            for name in core.retention_candidates(game):
+                print(f"{game}: würde {name} löschen")
+        return 0
+    failed = 0
+    with core.make_scheduler(args.jobs) as scheduler:
+        futures = [(game, submit_prune(core, scheduler, game)) for game in games]
+        for game, future in futures:
+            failed += finish_prune(core, game, future)
+    return 1 if failed else 0
+
+
+def cmd_restore(core, args):
+    if args.game not in core.savegames:
+        print(f"Unbekanntes Spiel: {args.game}", file=sys.stderr)
+        return 2
+    if not os.path.exists(backup_path(args.game, args.backup)):
+        print(f"Backup nicht gefunden: {args.game}/{args.backup}", file=sys.stderr)
+        return 2
+    devices, targets = core.game_devices(args.game), core.store_devices()
+    with core.make_scheduler(DEFAULT_JOBS) as scheduler:
+        plan = scheduler.submit("restore", lambda progress, cancel: core.plan_restore(
+            args.game, args.backup, args.paths or None, progress, cancel), devices, title=args.game,
+            targets=targets).result()
+        print(plan.summary())
+        if args.dry_run:
+            for title, paths in (("neu", plan.added), ("geändert", plan.changed), ("nur im Spielordner", plan.removed)):
+                for path in paths:
+                    print(f"  {title}: {path}")
+            return 0
+        errors = scheduler.submit("restore", lambda progress, cancel: core.apply_restore(
+            args.game, plan, args.mirror, progress, cancel), devices, title=args.game, targets=targets).result()
+    for path, e in errors:
+        print(f"Fehler bei {path}: {e}", file=sys.stderr)
+    if errors:
+        print("Nichts wiederhergestellt, der Spielordner ist unverändert.", file=sys.stderr)
+        return 1
+    print(f"Backup {args.backup} wurde wiederhergestellt.")
+    if plan.snapshot:
+        print(f"Vorheriger Stand: {plan.snapshot} (rückgängig: backup_cli.py undo-restore {args.game})")
+    return 0
+
+
+def cmd_undo_restore(core, args):
+    if args.game not in core.savegames:
+        print(f"Unbekanntes Spiel: {args.game}", file=sys.stderr)
+        return 2
+    info = core.undo_restore(args.game)
+    if info is None:
+        print("Kein Restore zum Rückgängigmachen vorhanden.", file=sys.stderr)
+        return 1
+    print(f"Restore von {info['backup']} ({info['created']}) rückgängig gemacht.")
+    return 0
+
+
+def cmd_verify(core, args):
+    unknown = [game for game in args.games if game not in core.savegames]
+    if unknown:
+        print(f"Unbekanntes Spiel: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    targets = core.verify_targets(args.games or None)
+    # ein Job für alle Spiele: verify_backups prüft gemeinsame Blöcke nur einmal
+    with core.make_scheduler(DEFAULT_JOBS) as scheduler:
+        report = scheduler.submit("verify", lambda progress, cancel: core.verify_backups(targets, progress, cancel),
+                                  core.store_devices(), title="verify").result()
+    for game, name, path, problem in report.problems:
+        print(f"{game}/{name}: {path or '-'}: {problem}", file=sys.stderr)
+    print(report.summary())
+    return 0 if report.ok else 1
+
+
+def cmd_find(core, args):
+    if args.game not in core.savegames:
+        print(f"Unbekanntes Spiel: {args.game}", file=sys.stderr)
+        return 2
+    matches = core.search_files(args.game, args.text)
+    if not matches:
+        print(f"Keine gesicherte Datei enthält \"{args.text}\".", file=sys.stderr)
+        return 1
+    for match in matches:
+        history = core.file_history(args.game, match["path"])
+        if args.first_change:
+            first = next((version for version in history if version["changed"]), None)
+            print(f"{match['path']}\t{first['name'] if first else '-'}")
+            continue
+        print(f"{match['path']}  ({match['backups']} Backup(s))")
+        for version in reversed(history):
+            if args.differs and not version["differs_live"]:
+                continue
+            created = datetime.datetime.fromtimestamp(version["created"]).strftime("%Y-%m-%d %H:%M:%S")
+            state = "abweichend" if version["differs_live"] else "= aktuell"
+            changed = "\tgeändert" if version["changed"] else ""
+            print(f"  {version['name']}\t{created}\t{format_size(version['size'])}\t{state}{changed}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="backup_cli", description="Savegame Backup Tool ohne GUI")
+    parser.add_argument("--workers", type=int, help="Kopier-Threads pro Spiel (Standard: copy_workers)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_list = sub.add_parser("list", help="Spiele bzw. Backups eines Spiels anzeigen")
+    p_list.add_argument("game", nargs="?")
+    p_list.set_defaults(func=cmd_list)
+
+    p_backup = sub.add_parser("backup", help="Backup eines oder aller Spiele erstellen")
+    p_backup.add_argument("game", nargs="?")
+    p_backup.add_argument("names", nargs="*", help="nur diese Dateien/Ordner sichern")
+    p_backup.add_argument("--all", action="store_true", help="alle Spiele aus save_paths.json sichern")
+    p_backup.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help="Jobs gleichzeitig (I/O-Limit, pro Platte siehe device_jobs)")
+    p_backup.set_defaults(func=cmd_backup)
+
+    p_restore = sub.add_parser("restore", help="Backup wiederherstellen")
+    p_restore.add_argument("game")
+    p_restore.add_argument("backup")
+    p_restore.add_argument("paths", nargs="*", help="nur diese Dateien/Ordner wiederherstellen")
+    p_restore.add_argument("--mirror", action="store_true", help="Dateien löschen, die im Backup fehlen")
+    p_restore.add_argument("--dry-run", action="store_true", help="nur den Plan anzeigen")
+    p_restore.set_defaults(func=cmd_restore)
+
+    p_undo = sub.add_parser("undo-restore", help="letzten Restore rückgängig machen")
+    p_undo.add_argument("game")
+    p_undo.set_defaults(func=cmd_undo_restore)
+
+    p_prune = sub.add_parser("prune", help="alte Backups laut Aufbewahrungsregel löschen")
+    p_prune.add_argument("game", nargs="?")
+    p_prune.add_argument("--all", action="store_true", help="alle Spiele mit Aufbewahrungsregel")
+    p_prune.add_argument("--dry-run", action="store_true", help="nur anzeigen, was gelöscht würde")
+    p_prune.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help="Jobs gleichzeitig (I/O-Limit)")
+    p_prune.set_defaults(func=cmd_prune)
+
+    p_verify = sub.add_parser("verify", help="Backups gegen ihre Prüfsummen prüfen")
+    p_verify.add_argument("games", nargs="*", help="nur diese Spiele (Standard: alle)")
+    p_verify.set_defaults(func=cmd_verify)
+
+    p_find = sub.add_parser("find", help="Backups suchen, die eine Datei enthalten")
+    p_find.add_argument("game")
+    p_find.add_argument("text", help="Teil des Dateipfads, z.B. SS1_data037Slot.bin")
+    p_find.add_argument("--differs", action="store_true", help="nur Backups, die von der aktuellen Datei abweichen")
+    p_find.add_argument("--first-change", action="store_true", help="nur das erste Backup mit geänderter Datei")
+    p_find.set_defaults(func=cmd_find)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    core = BackupCore()
+    if args.workers:
+        core.store.workers = args.workers
+    try:
+        return args.func(core, args)
+    finally:
+        core.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+"""
+Backup- und Restore-Logik ohne GUI.
+
+Wird von der Qt-Oberfläche (save-backup.py) und dem Kommandozeilen-Tool (backup_cli.py)
+gemeinsam benutzt. Dieses Modul und alles, was es importiert, darf weder PyQt5 noch
+requests laden, damit Skripte/Cron-Jobs schnell starten und auf Servern ohne GUI laufen.
+"""
+import os
+import shutil
+import datetime
+
+from backup_store import BackupStore, Progress
+from backup_archive import archive_path, create_archive_backup, is_archive_backup
+from backup_catalog import BackupCatalog
+from backup_verify import hash_file, verify_backups
+from restore_plan import (
+    KEEP_SNAPSHOTS, apply_plan, list_snapshots, plan_restore, undo_restore, without_restore_area
+)
+from retention import has_policy, select_prune
+from settings import load_settings
+from metadata_journal import MetadataJournal
+from op_log import operation, timed
+from io_throttle import IoThrottle, run_limited
+from job_scheduler import JobScheduler, device_of
+from copy_engine import copy2
+
+SAVE_FILE = "save_paths.json"
+BACKUP_DIR = "Backups"
+ICON_DIR = "icons"
+BACKUP_NAME_FORMAT = "%d.%m.%Y_%H-%M-%S"
+DEFAULT_NOTE_TITLE = "Backed up files:"
+
+
+_metadata = None
+
+
+def metadata():
+    """Gemeinsames Journal für save_paths.json (GUI und Kommandozeile)."""
+    global _metadata
+    if _metadata is None:
+        _metadata = MetadataJournal(SAVE_FILE)
+    return _metadata
+
+
+def load_savegames():
+    return metadata().load()
+
+
+def save_savegames(savegames):
+    """Hängt nur die Änderungen an das Journal an; die Datei wird gesammelt geschrieben."""
+    metadata().save(savegames)
+
+
+def new_backup_name():
+    return datetime.datetime.now().strftime(BACKUP_NAME_FORMAT)
+
+
+def backup_path(game, name):
+    return os.path.join(BACKUP_DIR, game, name)
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _log_throttle(op, throttle):
+    if throttle is not None:
+        op.fields["throttle_wait"] = round(throttle.waited, 2)
+
+
+class BackupCore:
+    """Bündelt Blob-Speicher, Katalog und Spiel-Einträge für Backup/Restore/Löschen."""
+
+    def __init__(self, savegames=None, settings=None):
+        self.savegames = load_savegames() if savegames is None else savegames
+        self.settings = load_settings() if settings is None else settings
+        self.store = BackupStore(BACKUP_DIR, self.settings["copy_workers"])
+        self.catalog = BackupCatalog(BACKUP_DIR)
+
+    def close(self):
+        metadata().close()
+        self.catalog.close()
+
+    # --- Backup
+
+    def run_backup(self, game, names, name, progress=None, cancel=None):
+        """
+        Die eigentliche Kopierarbeit, darf in einem Hintergrund-Thread laufen.
+        Inhalte landen dedupliziert im Blob-Speicher, der Backup-Ordner bekommt nur ein Manifest.
+        Inkrementell: unveränderte Dateien (gleiche Größe/mtime) werden nicht neu gelesen.
+        Mit "archive": "zlib"/"lzma"/"bz2" wird stattdessen ein komprimiertes Archiv geschrieben,
+        mit "delta": true werden große Dateien blockweise abgelegt (nur geänderte Blöcke neu).
+        Gibt (kopierte Namen, Fehler) zurück.
+        """
+        data = self.savegames[game]
+        src_path = data["path"]
+        if not os.path.exists(src_path):
+            raise FileNotFoundError(f"Savegame-Pfad existiert nicht: {src_path}")
+        dst = backup_path(game, name)
+        progress = progress or Progress()
+        mode = f"archive:{data['archive']}" if data.get("archive") else "delta" if data.get("delta") else "store"
+
+        def work(throttle):
+            with operation("backup", progress, game=game, backup=name, mode=mode) as op:
+                if data.get("archive"):
+                    copied, errors = create_archive_backup(src_path, names, dst, data["archive"], progress, cancel)
+                else:
+                    copied, errors = self.store.create_backup(src_path, names, dst, game,
+                                                              data.get("incremental", True), progress, cancel,
+                                                              data.get("delta", False))
+                op.add_errors(errors)
+                _log_throttle(op, throttle)
+            return copied, errors
+        return self._run_limited(game, work)
+
+    def _run_limited(self, game, work):
+        """work(drosselung) mit den I/O-Einstellungen des Spiels ausführen (siehe io_throttle)."""
+        data = self.savegames[game]
+        throttle = IoThrottle.from_settings(data)
+        return run_limited(lambda: work(throttle), throttle, data.get("io_background", False))
+
+    def record_backup(self, game, name, copied_files, note_title=DEFAULT_NOTE_TITLE):
+        """Notiz und Katalog-Eintrag zum fertigen Backup schreiben (nicht thread-sicher)."""
+        if game not in self.savegames:
+            return
+        note = note_title + "\n" + "\n".join(copied_files)
+        notes = self.savegames[game].setdefault("notes", {})
+        notes[name] = note
+        self.savegames[game].setdefault("favorites", [])
+        save_savegames(self.savegames)
+        self.catalog.add_backup(game, name, note)
+
+    def backup_key(self, game, names):
+        """
+        Backups mit gleichem Schlüssel (gleicher Ordner, gleiche Auswahl, gleiches Format) liefern
+        dasselbe Ergebnis und können zusammengelegt werden, siehe share_backup. Drosselung und
+        inkrementeller Modus gehören dazu: der gemeinsame Job läuft mit den Einstellungen des ersten Spiels.
+        """
+        data = self.savegames[game]
+        path = os.path.normcase(os.path.realpath(data["path"]))
+        io_settings = tuple(data.get(setting) for setting in
+                            ("io_max_mb_per_s", "io_max_iops", "io_adaptive", "io_background"))
+        return ("backup", path, tuple(sorted(names)), data.get("archive") or "", bool(data.get("delta")),
+                bool(data.get("incremental", True)), io_settings)
+
+    def share_backup(self, game, name, from_game, from_name):
+        """
+        Übernimmt das gerade erstellte Backup eines anderen Spiels mit demselben Ordner
+        (backup_key gleich), ohne den Ordner noch einmal zu lesen. Danach record_backup aufrufen.
+        """
+        src, dst = backup_path(from_game, from_name), backup_path(game, name)
+        with operation("backup", game=game, backup=name, mode="shared", source=from_game):
+            if is_archive_backup(src):
+                if os.path.exists(dst):
+                    raise FileExistsError(f"Backup {dst} existiert bereits")
+                os.makedirs(dst)
+                copy2(archive_path(src), archive_path(dst))  # auf CoW-Dateisystemen ein Reflink
+            else:
+                self.store.share_backup(src, dst, game)
+
+    def all_names(self, game):
+        """Alle Dateien/Ordner auf oberster Ebene des Savegame-Ordners."""
+        path = self.savegames[game]["path"]
+        return sorted(without_restore_area(path, os.listdir(path)))
+
+    # --- Restore
+
+    def plan_restore(self, game, name, paths=None, progress=None, cancel=None):
+        progress = progress or Progress()
+        with operation("restore_plan", progress, game=game, backup=name):
+            return plan_restore(backup_path(game, name), self.savegames[game]["path"], self.store, paths,
+                                self.store.workers, progress, cancel)
+
+    def apply_restore(self, game, plan, mirror=False, progress=None, cancel=None):
+        """
+        Alles-oder-nichts: bei Fehlern bleibt der Spielordner unverändert (Fehler werden
+        zurückgegeben), sonst liegt der vorherige Stand in plan.snapshot (siehe undo_restore).
+        """
+        progress = progress or Progress()
+        keep = self.savegames[game].get("restore_snapshots", KEEP_SNAPSHOTS)
+
+        def work(throttle):
+            with operation("restore", progress, game=game, backup=plan.backup, mirror=mirror) as op:
+                errors = apply_plan(plan, self.savegames[game]["path"], mirror, self.store.workers, progress,
+                                    cancel, keep)
+                op.add_errors(errors)
+                _log_throttle(op, throttle)
+            return errors
+        return self._run_limited(game, work)
+
+    def restore_snapshots(self, game):
+        """Pre-Restore-Snapshots des Spiels, neueste zuerst: [(pfad, info)]."""
+        return list_snapshots(self.savegames[game]["path"])
+
+    def undo_restore(self, game, snapshot=None):
+        """Macht den letzten (bzw. den angegebenen) Restore rückgängig. Gibt die Snapshot-Info zurück."""
+        if snapshot is None:
+            snapshots = self.restore_snapshots(game)
+            if not snapshots:
+                return None
+            snapshot = snapshots[0][0]
+        with operation("undo_restore", game=game):
+            return undo_restore(self.savegames[game]["path"], snapshot)
+
+    # --- Zeitplanung über mehrere Spiele
+
+    def make_scheduler(self, max_jobs):
+        """JobScheduler mit den Gerätegrenzen aus settings.json ("device_jobs", "device_limits")."""
+        limits = {}
+        for path, jobs in self.settings.get("device_limits", {}).items():
+            device = device_of(path)
+            if device is not None:
+                limits[device] = jobs
+        return JobScheduler(max_jobs, self.settings.get("device_jobs", 1), limits)
+
+    def game_devices(self, game):
+        """Gerät, das Backup/Restore des Spiels belegt (Savegame-Ordner); geschrieben wird nach store_devices."""
+        return {device_of(self.savegames[game]["path"])}
+
+    def store_devices(self):
+        """Backup-Ordner: Ziel (targets) von Backup/Restore, belegt von Prüfen und Aufräumen."""
+        return {device_of(BACKUP_DIR)}
+
+    # --- Prüfen
+
+    def verify_targets(self, games=None):
+        """[(spiel, name, pfad)] aller Backups der Spiele (Standard: alle), aus dem Katalog."""
+        targets = []
+        for game in self.savegames if games is None else games:
+            targets.extend((game, row["name"], backup_path(game, row["name"])) for row in self.list_backups(game))
+        return targets
+
+    def verify_backups(self, targets, progress=None, cancel=None):
+        """Hasht die Backups erneut und vergleicht mit den Manifesten (Hintergrund-Thread)."""
+        with operation("verify", backups=len(targets)) as op:
+            report = verify_backups(targets, self.store, self.store.workers, progress, cancel)
+            op.count(report.bytes, report.files)
+            op.add_errors((f"{game}/{backup}/{rel}", reason) for game, backup, rel, reason in report.problems)
+        return report
+
+    # --- Dateisuche (über den Datei-Index im Katalog, ohne BACKUP_DIR zu durchlaufen)
+
+    def search_files(self, game, text, limit=200):
+        """Gesicherte Pfade eines Spiels, die text enthalten (Zeilen mit path, backups, latest)."""
+        self.list_backups(game)  # Katalog abgleichen
+        self.catalog.index_missing(game)
+        return self.catalog.search_files(game, text.strip().replace("\\", "/"), limit)
+
+    def live_file(self, game, path):
+        """(hash, größe) der aktuellen Datei im Savegame-Ordner, None wenn sie fehlt."""
+        try:
+            return hash_file(os.path.join(self.savegames[game]["path"], path))
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            return None
+
+    def file_history(self, game, path):
+        """
+        Alle Backups mit der Datei path, älteste zuerst, als dicts mit name, created, size, mtime,
+        hash sowie changed (Inhalt anders als im vorherigen Backup mit dieser Datei) und
+        differs_live (anders als die aktuelle Datei im Savegame-Ordner).
+        """
+        self.list_backups(game)
+        self.catalog.index_missing(game)
+        live = self.live_file(game, path)
+        history = []
+        previous = None
+        for row in reversed(self.catalog.file_versions(game, path)):
+            version = dict(row)
+            # Alte Ordnerkopien haben keinen Hash: dann zählt nur die Größe
+            key = version["hash"] or version["size"]
+            version["changed"] = previous is not None and key != previous
+            if live is None:
+                version["differs_live"] = True
+            else:
+                version["differs_live"] = key != (live[0] if version["hash"] else live[1])
+            history.append(version)
+            previous = key
+        return history
+
+    def backups_differing_from_live(self, game, path):
+        """Backups, deren Kopie von path nicht der aktuellen Datei entspricht, neueste zuerst."""
+        return [v for v in reversed(self.file_history(game, path)) if v["differs_live"]]
+
+    def first_change(self, game, path):
+        """Das erste Backup, in dem sich path gegenüber dem Backup davor geändert hat (oder None)."""
+        return next((v for v in self.file_history(game, path) if v["changed"]), None)
+
+    # --- Verwaltung
+
+    def list_backups(self, game):
+        data = self.savegames[game]
+        self.catalog.ensure_synced(game, data.get("notes", {}), data.get("favorites", []))
+        return self.catalog.list_backups(game)
+
+    def delete_backup(self, game, name):
+        with operation("delete", game=game, backups=1) as op:
+            path = backup_path(game, name)
+            if os.path.exists(path):
+                with timed("delete"):
+                    self.store.delete_backup(path)
+                op.count(files_done=1)
+
+            with timed("metadata"):
+                notes = self.savegames[game].get("notes", {})
+                if name in notes:
+                    del notes[name]
+                favorites = self.savegames[game].setdefault("favorites", [])
+                if name in favorites:
+                    favorites.remove(name)
+
+                save_savegames(self.savegames)
+                self.catalog.delete_backups(game, [name])
+
+    # --- Aufbewahrung
+
+    def retention_candidates(self, game):
+        """Backups, die laut "retention"-Regel des Spiels gelöscht werden dürfen (nur Katalog)."""
+        policy = self.savegames[game].get("retention")
+        if not has_policy(policy):
+            return []
+        return select_prune(self.list_backups(game), policy)
+
+    def prune_backups(self, game, names, progress=None, cancel=None):
+        """
+        Löscht die Backup-Ordner stapelweise, darf im Hintergrund-Thread laufen.
+        Notizen/Favoriten/Katalog danach mit forget_backups() aufräumen.
+        Gibt ([gelöschte Namen], [(pfad, Fehler)]) zurück.
+        """
+        paths = {backup_path(game, name): name for name in names}
+        existing = [path for path in paths if os.path.exists(path)]
+        with operation("delete", game=game, backups=len(existing)) as op:
+            deleted, errors = self.store.delete_backups(existing, progress, cancel)
+            op.count(files_done=len(deleted))
+            op.add_errors(errors)
+        missing = [name for path, name in paths.items() if path not in existing]
+        return missing + [paths[path] for path in deleted], errors
+
+    def forget_backups(self, game, names):
+        """Entfernt Notizen, Favoriten und Katalog-Einträge mit einem einzigen Schreibvorgang."""
+        if game not in self.savegames or not names:
+            return
+        names = set(names)
+        data = self.savegames[game]
+        notes = data.get("notes", {})
+        for name in names & set(notes):
+            del notes[name]
+        data["favorites"] = [name for name in data.get("favorites", []) if name not in names]
+        save_savegames(self.savegames)
+        self.catalog.delete_backups(game, list(names))
+
+    def apply_retention(self, game, progress=None, cancel=None):
+        """Regel anwenden ohne Thread-Aufteilung (für die Kommandozeile)."""
+        deleted, errors = self.prune_backups(game, self.retention_candidates(game), progress, cancel)
+        self.forget_backups(game, deleted)
+        return deleted, errors
+
+    def rename_backup(self, game, old_name, new_name):
+        with operation("rename", game=game, backup=new_name):
+            old_path = backup_path(game, old_name)
+            new_path = backup_path(game, new_name)
+            if os.path.exists(new_path):
+                raise FileExistsError("Es existiert bereits ein Backup mit diesem Namen.")
+            with timed("rename"):
+                os.rename(old_path, new_path)
+
+            with timed("metadata"):
+                notes = self.savegames[game].get("notes", {})
+                if old_name in notes:
+                    notes[new_name] = notes.pop(old_name)
+                favorites = self.savegames[game].setdefault("favorites", [])
+                if old_name in favorites:
+                    favorites.remove(old_name)
+                    favorites.append(new_name)
+
+                save_savegames(self.savegames)
+                self.catalog.rename_backup(game, old_name, new_name)
+
+    def delete_game_backups(self, game):
+        """Alle Backups eines Spiels löschen; Blobs werden dabei korrekt freigegeben."""
+        game_dir = os.path.join(BACKUP_DIR, game)
+        with operation("delete_game", game=game) as op:
+            try:
+                if os.path.exists(game_dir):
+                    # Erst die Backups einzeln freigeben, damit die Blob-Zähler stimmen
+                    with timed("delete"):
+                        for name in os.listdir(game_dir):
+                            self.store.delete_backup(os.path.join(game_dir, name))
+                            op.count(files_done=1)
+                        shutil.rmtree(game_dir)
+            finally:
+                with timed("metadata"):
+                    self.store.drop_state(game)
+                    self.catalog.delete_game(game)
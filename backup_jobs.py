@@ -0,0 +1,140 @@
+"""
+Hintergrund-Jobs für Backup und Restore.
+
+Die eigentliche Kopierarbeit läuft in einem QThreadPool, damit das Fenster bedienbar bleibt.
+Jobs werden nacheinander abgearbeitet (weitere Klicks landen in der Warteschlange),
+melden Bytes/Dateien per Signal und können über ein threading.Event abgebrochen werden.
+Das Ergebnis wird im GUI-Thread an den on_done-Callback des Jobs übergeben.
+"""
+import time
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from backup_store import BackupCancelled, Progress
+
+
+class JobSignals(QObject):
+    started = pyqtSignal(object)
+    # Job, Bytes fertig/gesamt, Dateien fertig/gesamt; Bytes als qint64 (int ist in Qt 32 Bit, Saves > 2 GB)
+    progress = pyqtSignal(object, "qint64", "qint64", int, int)
+    finished = pyqtSignal(object, object)  # Job, Ergebnis
+    failed = pyqtSignal(object, str)
+    cancelled = pyqtSignal(object)
+
+
+class SignalProgress(Progress):
+    """Progress, der höchstens alle EMIT_INTERVAL Sekunden ein Qt-Signal sendet."""
+    EMIT_INTERVAL = 0.1
+
+    def __init__(self, job, signals):
+        super().__init__()
+        self.job = job
+        self.signals = signals
+        self._last_emit = 0.0
+
+    def changed(self, force=False):
+        now = time.monotonic()
+        if force or now - self._last_emit >= self.EMIT_INTERVAL:
+            self._last_emit = now
+            self.signals.progress.emit(self.job, self.bytes_done, self.bytes_total,
+                                       self.files_done, self.files_total)
+
+
+class Job(QRunnable):
+    """
+    fn(progress, cancel) erledigt die Arbeit im Hintergrund.
+    on_done(ergebnis) und on_cancel() laufen danach im GUI-Thread.
+    """
+    def __init__(self, title, fn, on_done=None, on_cancel=None):
+        super().__init__()
+        self.setAutoDelete(False)  # Referenz hält die JobQueue
+        self.title = title
+        self.fn = fn
+        self.on_done = on_done
+        self.on_cancel = on_cancel
+        self.cancel_event = threading.Event()
+        self.signals = None
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        self.signals.started.emit(self)
+        progress = SignalProgress(self, self.signals)
+        try:
+            if self.cancel_event.is_set():
+                raise BackupCancelled()
+            result = self.fn(progress, self.cancel_event)
+        except BackupCancelled:
+            self.signals.cancelled.emit(self)
+        except Exception as e:
+            self.signals.failed.emit(self, str(e))
+        else:
+            progress.changed(force=True)
+            self.signals.finished.emit(self, result)
+
+
+class JobQueue(QObject):
+    """Führt Jobs der Reihe nach in einem eigenen Worker-Thread aus."""
+    changed = pyqtSignal()  # Job gestartet/fertig/eingereiht
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = JobSignals()
+        self.jobs = []  # wartende + laufender Job
+        self.current = None
+
+        self.signals.started.connect(self._on_started)
+        self.signals.finished.connect(self._on_finished)
+        self.signals.failed.connect(self._on_failed)
+        self.signals.cancelled.connect(self._on_cancelled)
+
+        # Vom GUI-Code gesetzt
+        self.on_error = None
+
+    def submit(self, job):
+        job.signals = self.signals
+        self.jobs.append(job)
+        self.pool.start(job)
+        self.changed.emit()
+        return job
+
+    def cancel_current(self):
+        if self.current:
+            self.current.cancel()
+
+    def cancel_all(self):
+        for job in self.jobs:
+            job.cancel()
+
+    def pending_count(self):
+        return len(self.jobs) - (1 if self.current else 0)
+
+    def _on_started(self, job):
+        self.current = job
+        self.changed.emit()
+
+    def _done(self, job):
+        if job in self.jobs:
+            self.jobs.remove(job)
+        if self.current is job:
+            self.current = None
+        self.changed.emit()
+
+    def _on_finished(self, job, result):
+        self._done(job)
+        if job.on_done:
+            job.on_done(result)
+
+    def _on_failed(self, job, message):
+        self._done(job)
+        if self.on_error:
+            self.on_error(job, message)
+
+    def _on_cancelled(self, job):
+        self._done(job)
+        if job.on_cancel:
+            job.on_cancel()
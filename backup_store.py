@@ -0,0 +1,572 @@
+"""
+Content-adressierter Backup-Speicher.
+
+Jeder Dateiinhalt liegt genau einmal als Blob unter BACKUP_DIR/.store/objects/<xx>/<hash>.
+Ein Backup ist nur noch ein Ordner mit einer kleinen manifest.json, die auf diese Blobs zeigt.
+refs.json zählt, wie oft jeder Blob referenziert wird, damit beim Löschen eines Backups
+nur die Blobs entfernt werden, die kein anderes Backup mehr braucht.
+
+Inkrementell: Pro Spiel merkt sich .store/state/<spiel>.json Größe, mtime und Hash jeder
+zuletzt gesicherten Datei. Dateien mit unverändertem Stat werden nicht neu gelesen,
+sondern verweisen direkt auf den bekannten Blob.
+
+Blockmodus ("delta": true pro Spiel): große Dateien werden in Blöcke fester Größe zerlegt,
+jeder Block ist ein eigener Blob. Ändert ein Spiel nur einen Bereich einer großen Slot-Datei,
+kommen pro Backup nur die geänderten Blöcke neu hinzu. Da jedes Manifest direkt auf alle
+Blöcke zeigt, gibt es keine Delta-Ketten - jedes Backup ist für sich vollständig.
+"""
+import os
+import json
+import shutil
+import hashlib
+import datetime
+import threading
+
+from copy_engine import (  # BackupCancelled wird von hier aus weiter importiert (backup_jobs)
+    BackupCancelled, CHUNK_SIZE, DEFAULT_WORKERS, check_cancel, copy_files, run_parallel, try_clone
+)
+from op_log import timed
+from app_lock import FileLock
+import io_throttle
+
+STORE_DIR = ".store"
+MANIFEST_FILE = "manifest.json"
+HASH_ALGO = "sha256"
+DELETE_BATCH = 50  # Backups pro refs.json-Schreibvorgang beim Massenlöschen
+DELTA_BLOCK_SIZE = 64 * 1024
+DELTA_MIN_SIZE = 1024 * 1024  # kleinere Dateien bleiben ein einzelner Blob
+RESTORE_AREA_SUFFIX = ".restore"  # Staging und Snapshots eines Restores, siehe restore_plan.restore_area
+REF_RETRIES = 3  # so oft Dateien neu ablegen, deren Blobs ein paralleles Löschen entfernt hat
+
+
+class Progress:
+    """
+    Zählt übertragene Bytes und Dateien eines Jobs. Wird als progress(bytes, dateien)
+    aufgerufen; Unterklassen reagieren in changed() (z.B. Qt-Signal senden).
+    """
+    def __init__(self):
+        self.bytes_total = 0
+        self.files_total = 0
+        self.bytes_done = 0
+        self.files_done = 0
+        self._lock = threading.Lock()
+
+    def total(self, bytes_total, files_total):
+        with self._lock:
+            self.bytes_total += bytes_total
+            self.files_total += files_total
+        self.changed()
+
+    def __call__(self, bytes_done, files_done):
+        with self._lock:
+            self.bytes_done += bytes_done
+            self.files_done += files_done
+        self.changed()
+
+    def changed(self):
+        pass
+
+
+def is_store_backup(backup_path):
+    """True, wenn der Backup-Ordner ein Manifest enthält (statt einer vollen Kopie)."""
+    return os.path.isfile(os.path.join(backup_path, MANIFEST_FILE))
+
+
+def read_manifest(backup_path):
+    with open(os.path.join(backup_path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def entry_blobs(entry):
+    """Alle Blobs, auf die ein Manifest-Eintrag zeigt (Blöcke im Blockmodus, sonst die Datei)."""
+    return entry.get("chunks") or [entry["hash"]]
+
+
+def write_json_atomic(path, data):
+    """Schreibt JSON erst in eine Temp-Datei und ersetzt dann das Ziel in einem Schritt."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        with timed("fsync"):
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class BackupStore:
+    def __init__(self, backup_dir, workers=DEFAULT_WORKERS):
+        self.workers = workers
+        self.root = os.path.join(backup_dir, STORE_DIR)
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.refs_file = os.path.join(self.root, "refs.json")
+        self.state_dir = os.path.join(self.root, "state")
+        self._lock = threading.RLock()  # Jobs laufen im Hintergrund-Thread
+        # GUI und Kommandozeile (Cron) können gleichzeitig sichern/löschen: refs.json nur unter
+        # dieser Sperre und immer frisch von der Platte gelesen ändern
+        self._refs_lock = FileLock(os.path.join(self.root, "refs.lock"))
+        # Neue, noch unreferenzierte Blobs fehlgeschlagener Dateien erst wegräumen, wenn kein
+        # Backup mehr läuft: ein paralleles Backup kann sie schon gefunden, aber noch nicht gezählt haben
+        self._active = 0
+        self._orphans = set()
+
+    # --- Referenzzähler
+
+    @property
+    def refs(self):
+        """Aktueller Stand von der Platte (nur lesen; ändern über add_refs/release_refs)."""
+        if not os.path.exists(self.refs_file):
+            return {}
+        with open(self.refs_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_refs(self, refs):
+        os.makedirs(self.root, exist_ok=True)
+        write_json_atomic(self.refs_file, refs)
+
+    def add_refs(self, digests):
+        with self._refs_lock:
+            refs = self.refs
+            for digest in digests:
+                refs[digest] = refs.get(digest, 0) + 1
+            self._save_refs(refs)
+
+    def _take_refs(self, files):
+        """
+        Zählt die Blobs der Manifest-Einträge, aber nur, wenn noch alle existieren: Prüfen und
+        Zählen passieren unter der refs-Sperre, damit ein paralleles Löschen (release_refs, auch
+        aus einem anderen Prozess) keinen Blob entfernt, den dieses Backup schon gefunden, aber
+        noch nicht gezählt hat. Gibt die Einträge mit fehlenden Blobs zurück (dann wurde nichts gezählt).
+        """
+        with self._refs_lock:
+            missing = [entry for entry in files if not self.has_blobs(entry)]
+            if not missing:
+                self.add_refs(digest for entry in files for digest in entry_blobs(entry))
+        return missing
+
+    def release_refs(self, digests):
+        """Verringert die Zähler und löscht Blobs, die niemand mehr referenziert."""
+        freed = 0
+        with self._refs_lock:
+            refs = self.refs
+            for digest in digests:
+                count = refs.get(digest, 0) - 1
+                if count > 0:
+                    refs[digest] = count
+                    continue
+                refs.pop(digest, None)
+                try:
+                    os.remove(self.object_path(digest))
+                    freed += 1
+                except FileNotFoundError:
+                    pass
+            self._save_refs(refs)
+        return freed
+
+    # --- Stat/Hash-Manifest des letzten Backups pro Spiel
+
+    def state_path(self, game):
+        return os.path.join(self.state_dir, f"{game}.json")
+
+    def load_state(self, game):
+        try:
+            with open(self.state_path(game), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_state(self, game, state):
+        os.makedirs(self.state_dir, exist_ok=True)
+        write_json_atomic(self.state_path(game), state)
+
+    def drop_state(self, game):
+        try:
+            os.remove(self.state_path(game))
+        except FileNotFoundError:
+            pass
+
+    # --- Blobs
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def put_file(self, src_file, progress=None, cancel=None):
+        """
+        Kopiert die Datei in eine Temp-Datei und hasht dabei genau die geschriebenen Bytes
+        (einmal lesen, hashen, schreiben). Auf CoW-Dateisystemen wird stattdessen geklont, ohne
+        Daten zu bewegen, und dann der Klon gehasht - so passt der Hash auch dann zum Blob,
+        wenn das Spiel die Quelle währenddessen überschreibt. Existiert der Blob schon, wird
+        die Temp-Kopie verworfen. Gibt (hash, größe, neu_angelegt) zurück.
+        """
+        os.makedirs(self.objects_dir, exist_ok=True)
+        hasher = hashlib.new(HASH_ALGO)
+        size = 0
+        created = False
+        tmp_path = os.path.join(self.objects_dir, f".incoming-{os.getpid()}-{id(hasher)}")
+        buffer = bytearray(CHUNK_SIZE)
+        view = memoryview(buffer)
+        try:
+            with open(src_file, "rb") as src, open(tmp_path, "wb") as dst:
+                cloned = try_clone(src, dst)
+                if not cloned:
+                    while length := src.readinto(buffer):
+                        check_cancel(cancel)
+                        hasher.update(view[:length])
+                        dst.write(view[:length])
+                        size += length
+                        io_throttle.charge(length, cancel=cancel)
+                        if progress:
+                            progress(length, 0)
+            if cloned:
+                # erst das Hashen liest wirklich von der Platte
+                with open(tmp_path, "rb") as copy:
+                    while length := copy.readinto(buffer):
+                        check_cancel(cancel)
+                        hasher.update(view[:length])
+                        size += length
+                        io_throttle.charge(length, cancel=cancel)
+                        if progress:
+                            progress(length, 0)
+            digest = hasher.hexdigest()
+            obj_path = self.object_path(digest)
+            with self._lock:
+                if os.path.exists(obj_path):
+                    os.remove(tmp_path)
+                else:
+                    os.makedirs(os.path.dirname(obj_path), exist_ok=True)
+                    os.replace(tmp_path, obj_path)
+                    created = True
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return digest, size, created
+
+    def put_chunks(self, src_file, progress=None, cancel=None, created=None):
+        """
+        Wie put_file, legt aber jeden DELTA_BLOCK_SIZE-Block als eigenen Blob ab.
+        Neu angelegte Blobs werden an created angehängt - auch wenn die Datei danach scheitert,
+        damit create_backup sie nach add_refs wegräumen kann (hier nicht löschen: andere Dateien
+        können dieselben Blöcke schon gefunden haben).
+        Gibt (hash der ganzen Datei, größe, [block-hashes]) zurück.
+        """
+        os.makedirs(self.objects_dir, exist_ok=True)
+        file_hasher = hashlib.new(HASH_ALGO)
+        chunks = []
+        created = [] if created is None else created
+        size = 0
+        tmp_path = os.path.join(self.objects_dir, f".incoming-{os.getpid()}-{id(file_hasher)}")
+        try:
+            with open(src_file, "rb") as src:
+                while block := src.read(DELTA_BLOCK_SIZE):
+                    check_cancel(cancel)
+                    file_hasher.update(block)
+                    digest = hashlib.new(HASH_ALGO, block).hexdigest()
+                    obj_path = self.object_path(digest)
+                    if not os.path.exists(obj_path):
+                        with open(tmp_path, "wb") as dst:
+                            dst.write(block)
+                        with self._lock:
+                            if os.path.exists(obj_path):
+                                os.remove(tmp_path)
+                            else:
+                                os.makedirs(os.path.dirname(obj_path), exist_ok=True)
+                                os.replace(tmp_path, obj_path)
+                                created.append(digest)
+                    chunks.append(digest)
+                    size += len(block)
+                    io_throttle.charge(len(block), cancel=cancel)
+                    if progress:
+                        progress(len(block), 0)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return file_hasher.hexdigest(), size, chunks
+
+    def entry_source(self, entry):
+        """Quelle zum Zurückschreiben: Blob-Pfad bzw. Liste der Block-Pfade in Reihenfolge."""
+        if entry.get("chunks"):
+            return [self.object_path(digest) for digest in entry["chunks"]]
+        return self.object_path(entry["hash"])
+
+    def has_blobs(self, entry):
+        return all(os.path.exists(self.object_path(digest)) for digest in entry_blobs(entry))
+
+    # --- Backups
+
+    def create_backup(self, src_root, names, dst, game=None, incremental=True, progress=None, cancel=None,
+                      delta=False):
+        """
+        Legt ein Backup der ausgewählten Dateien/Ordner (names, relativ zu src_root) in dst an.
+        Mit game + incremental werden unveränderte Dateien aus dem letzten Backup übernommen.
+        Mit delta werden Dateien ab DELTA_MIN_SIZE blockweise abgelegt.
+        Die Dateien werden parallel gehasht und abgelegt (self.workers Threads).
+        progress(bytes, dateien) meldet Fortschritt, cancel (threading.Event) bricht ab.
+        Gibt (kopierte Namen, [(name bzw. pfad, Fehler)]) zurück.
+        """
+        if is_store_backup(dst):
+            raise FileExistsError(f"Backup {dst} existiert bereits")
+        with timed("scan"):
+            items, dirs, errors = scan_items(src_root, names)
+        tasks = [(name, rel_path, abs_path, st) for name, entries in items for rel_path, abs_path, st in entries]
+        if progress:
+            progress.total(sum(task[3].st_size for task in tasks), len(tasks))
+
+        state = self.load_state(game) if game and incremental else {}
+        new_blobs = []  # list.append ist thread-sicher
+
+        def store_one(task):
+            _, rel_path, abs_path, st = task
+            check_cancel(cancel)
+            prev = state.get(rel_path)
+            reused = False
+            if prev and prev["size"] == st.st_size and prev["mtime"] == st.st_mtime and self.has_blobs(prev):
+                # Unverändert seit dem letzten Backup: Blob(s) wiederverwenden, nichts lesen
+                entry = {"path": rel_path, "size": prev["size"], "mtime": st.st_mtime, "hash": prev["hash"]}
+                if prev.get("chunks"):
+                    entry["chunks"] = prev["chunks"]
+                reused = True
+                if progress:
+                    progress(entry["size"], 0)
+            elif delta and st.st_size >= DELTA_MIN_SIZE:
+                digest, size, chunks = self.put_chunks(abs_path, progress, cancel, new_blobs)
+                entry = {"path": rel_path, "size": size, "mtime": st.st_mtime, "hash": digest, "chunks": chunks}
+            else:
+                digest, size, created = self.put_file(abs_path, progress, cancel)
+                if created:
+                    new_blobs.append(digest)
+                entry = {"path": rel_path, "size": size, "mtime": st.st_mtime, "hash": digest}
+            if progress:
+                progress(0, 1)
+            return entry, reused
+
+        with self._lock:
+            self._active += 1
+        try:
+            with timed("copy"):
+                results, file_errors = run_parallel(store_one, tasks, self.workers, cancel)
+
+            failed = {task[0] for task, _ in file_errors}
+            errors.extend((task[1], e) for task, e in file_errors)
+            files = [entry for task, (entry, _) in results if task[0] not in failed]
+            reused = sum(1 for task, (_, was_reused) in results if was_reused and task[0] not in failed)
+            copied = [name for name, _ in items if name not in failed]
+
+            with timed("metadata"):
+                files = self._take_backup_refs(files, tasks, state, store_one, cancel)
+            manifest = {
+                "version": 1,
+                "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                "hash": HASH_ALGO,
+                "items": copied,
+                "dirs": dirs,
+                "files": files,
+                "reused": reused,
+            }
+            with timed("metadata"):
+                self._write_backup_metadata(dst, manifest, files, game, incremental, state, copied)
+        finally:
+            # Neue Blobs aus fehlgeschlagenen Ordnern bzw. eines abgebrochenen Backups sind nirgends
+            # eingetragen -> wegräumen (erst nach add_refs, siehe _finish_backup)
+            self._finish_backup(new_blobs)
+        return copied, errors
+
+    def _take_backup_refs(self, files, tasks, state, store_one, cancel):
+        """
+        _take_refs für create_backup: Dateien, deren Blobs zwischen Ablegen und Zählen gelöscht
+        wurden, ohne den alten Stand neu ablegen. Gibt die (ggf. ersetzten) Einträge zurück.
+        """
+        by_path = {task[1]: task for task in tasks}
+        for _ in range(REF_RETRIES):
+            missing = self._take_refs(files)
+            if not missing:
+                return files
+            redo = []
+            for entry in missing:
+                state.pop(entry["path"], None)  # nicht wieder den gelöschten Blob übernehmen
+                redo.append(by_path[entry["path"]])
+            results, errors = run_parallel(store_one, redo, self.workers, cancel)
+            if errors:
+                raise errors[0][1]
+            fresh = {entry["path"]: entry for _, (entry, _) in results}
+            files = [fresh.get(entry["path"], entry) for entry in files]
+        raise RuntimeError("Blobs wurden während des Backups wiederholt gelöscht")
+
+    def share_backup(self, src_backup, dst, game=None):
+        """
+        Übernimmt ein fertiges Backup (z.B. eines anderen Spiels mit demselben Savegame-Ordner)
+        als neues Backup dst: gleiches Manifest, die Blobs bekommen nur eine Referenz mehr,
+        gelesen wird nichts. Der Stand für inkrementelle Backups von game wird mitgeführt.
+        """
+        if is_store_backup(dst):
+            raise FileExistsError(f"Backup {dst} existiert bereits")
+        manifest = dict(read_manifest(src_backup), created=datetime.datetime.now().isoformat(timespec="seconds"))
+        with timed("metadata"):
+            if self._take_refs(manifest["files"]):
+                raise FileNotFoundError(f"Blobs von {src_backup} fehlen (Backup inzwischen gelöscht?)")
+            self._write_backup_metadata(dst, manifest, manifest["files"], game, True,
+                                        self.load_state(game) if game else {}, manifest["items"])
+
+    def _write_backup_metadata(self, dst, manifest, files, game, incremental, state, copied):
+        """Schreibt Manifest und Stand; die Blobs sind schon gezählt (_take_refs), bei Fehlern wieder freigeben."""
+        try:
+            os.makedirs(dst, exist_ok=True)
+            write_json_atomic(os.path.join(dst, MANIFEST_FILE), manifest)
+        except BaseException:
+            self.release_refs([digest for entry in files for digest in entry_blobs(entry)])
+            raise
+
+        if game:
+            state = self.load_state(game) if not incremental else state
+            # Gesicherte Namen komplett ersetzen, damit gelöschte Dateien nicht im Manifest bleiben
+            backed_up = set(copied)
+            for path in [p for p in state if p.split("/", 1)[0] in backed_up]:
+                del state[path]
+            for entry in files:
+                state[entry["path"]] = {key: entry[key] for key in ("size", "mtime", "hash", "chunks") if key in entry}
+            self.save_state(game, state)
+
+    def _finish_backup(self, new_blobs):
+        """Backup fertig (oder gescheitert): unreferenzierte neue Blobs wegräumen, sobald keins mehr läuft."""
+        with self._lock:
+            self._active -= 1
+            self._orphans.update(new_blobs)
+            if self._active:
+                return
+            orphans, self._orphans = self._orphans, set()
+            self._remove_unreferenced(orphans)
+
+    def _remove_unreferenced(self, digests):
+        with self._lock, self._refs_lock:
+            refs = self.refs
+            for digest in digests:
+                if digest not in refs:
+                    try:
+                        os.remove(self.object_path(digest))
+                    except FileNotFoundError:
+                        pass
+
+    def restore_backup(self, backup_path, target_root, progress=None, cancel=None, paths=None):
+        """
+        Schreibt alle Dateien aus dem Manifest (oder nur die in paths) parallel zurück
+        in den Savegame-Ordner. Gibt die Liste [(zieldatei, Fehler)] zurück.
+        """
+        manifest = read_manifest(backup_path)
+        entries = manifest["files"]
+        if paths is not None:
+            wanted = set(paths)
+            entries = [e for e in entries if e["path"] in wanted or e["path"].split("/", 1)[0] in wanted]
+        else:
+            for rel_dir in manifest.get("dirs", []):
+                os.makedirs(os.path.join(target_root, rel_dir), exist_ok=True)
+        if progress:
+            progress.total(sum(entry["size"] for entry in entries), len(entries))
+
+        jobs = [(self.entry_source(entry), os.path.join(target_root, entry["path"]), entry["mtime"])
+                for entry in entries]
+        return copy_files(jobs, self.workers, progress, cancel)
+
+    def delete_backup(self, backup_path):
+        """Entfernt den Backup-Ordner und gibt alle nur von ihm genutzten Blobs frei."""
+        digests = []
+        if is_store_backup(backup_path):
+            digests = [digest for entry in read_manifest(backup_path)["files"] for digest in entry_blobs(entry)]
+        shutil.rmtree(backup_path)
+        if digests:
+            self.release_refs(digests)
+
+    def delete_backups(self, backup_paths, progress=None, cancel=None, batch_size=DELETE_BATCH):
+        """
+        Löscht viele Backups auf einmal. Die Blob-Zähler werden pro Stapel nur einmal
+        freigegeben und gespeichert statt einmal pro Backup.
+        Gibt ([gelöschte Pfade], [(pfad, Fehler)]) zurück.
+        """
+        deleted = []
+        errors = []
+        if progress:
+            progress.total(0, len(backup_paths))
+        for start in range(0, len(backup_paths), batch_size):
+            if cancel is not None and cancel.is_set():
+                break  # Bereits Gelöschtes trotzdem melden, damit Notizen bereinigt werden
+            digests = []
+            for path in backup_paths[start:start + batch_size]:
+                try:
+                    if is_store_backup(path):
+                        digests.extend(digest for entry in read_manifest(path)["files"] for digest in entry_blobs(entry))
+                    with timed("delete"):
+                        shutil.rmtree(path)
+                    deleted.append(path)
+                except Exception as e:
+                    errors.append((path, e))
+                if progress:
+                    progress(0, 1)
+            if digests:
+                with timed("metadata"):
+                    self.release_refs(digests)
+        return deleted, errors
+
+
+def is_restore_area(parent, name):
+    """
+    True, wenn der Ordner parent/name der Restore-Bereich eines Savegame-Ordners ist: <ordner>.restore
+    neben dem Ordner oder .restore darin (Mountpunkt). Er gehört nicht zu den Saves - auch nicht
+    zu denen eines anderen Spiels, dessen Pfad der übergeordnete Ordner ist.
+    """
+    if not name.endswith(RESTORE_AREA_SUFFIX):
+        return False
+    base = name[:-len(RESTORE_AREA_SUFFIX)]
+    return (not base or os.path.isdir(os.path.join(parent, base))) and os.path.isdir(os.path.join(parent, name))
+
+
+def scan_items(src_root, names):
+    """
+    Sammelt für jeden ausgewählten Namen alle Dateien samt Stat.
+    Gibt ([(name, [(rel_pfad, abs_pfad, stat)])], [rel_ordner], [(name, Fehler)]) zurück.
+    """
+    items = []
+    dirs = []
+    errors = []
+    for name in names:
+        src = os.path.join(src_root, name)
+        try:
+            entries = []
+            if os.path.isfile(src):
+                entries.append((name, src, os.stat(src)))
+            elif os.path.isdir(src):
+                dirs.append(name)
+                for root, sub_dirs, sub_files in os.walk(src):
+                    sub_dirs[:] = [d for d in sub_dirs if not is_restore_area(root, d)]
+                    rel_root = os.path.relpath(root, src_root)
+                    dirs.extend(os.path.join(rel_root, d).replace(os.sep, "/") for d in sub_dirs)
+                    for f in sub_files:
+                        abs_path = os.path.join(root, f)
+                        entries.append((os.path.join(rel_root, f).replace(os.sep, "/"), abs_path, os.stat(abs_path)))
+            else:
+                raise FileNotFoundError(src)
+            items.append((name, entries))
+        except Exception as e:
+            errors.append((name, e))
+    return items, dirs, errors
+
+
+def restore_directory(backup_path, target_root, progress=None, cancel=None, workers=DEFAULT_WORKERS):
+    """
+    Alte Backups (volle Ordnerkopien ohne Manifest) parallel zurückkopieren.
+    Gibt die Liste [(zieldatei, Fehler)] zurück.
+    """
+    if progress:
+        total_bytes = total_files = 0
+        for root, _, files in os.walk(backup_path):
+            total_files += len(files)
+            total_bytes += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+        progress.total(total_bytes, total_files)
+
+    jobs = []
+    for root, dirs, files in os.walk(backup_path):
+        # Zielverzeichnis entsprechend der Struktur ermitteln
+        relative_path = os.path.relpath(root, backup_path)
+        target_dir = os.path.join(target_root, relative_path)
+        os.makedirs(target_dir, exist_ok=True)
+        # überschreibt automatisch, falls Datei existiert; Metadaten wie copy2
+        jobs.extend((os.path.join(root, file), os.path.join(target_dir, file), None) for file in files)
+    return copy_files(jobs, workers, progress, cancel)
@@ -0,0 +1,173 @@
+"""
+Integritätsprüfung von Backups.
+
+Blob-Backups und Archive enthalten bereits beim Kopieren berechnete SHA-256-Hashes
+(manifest.json bzw. Archiv-Index). Die Prüfung liest die Daten erneut und vergleicht:
+Blobs werden über alle geprüften Backups hinweg nur einmal gehasht, auch wenn viele Backups
+auf denselben Inhalt zeigen. Große Dateien werden per mmap gelesen, kleinere mit großem
+Puffer; hashlib gibt dabei das GIL frei, sodass mehrere Threads eine schnelle Platte auslasten.
+Alte Ordnerkopien haben kein Manifest und werden nur als "nicht prüfbar" gemeldet.
+"""
+import os
+import mmap
+import lzma
+import zlib
+import hashlib
+
+from copy_engine import DEFAULT_WORKERS, check_cancel, run_parallel
+from backup_store import HASH_ALGO, is_store_backup, read_manifest
+from backup_archive import CODECS, ArchiveError, archive_path, is_archive_backup, iter_entry, read_index
+
+VERIFY_BUFFER = 8 * 1024 * 1024
+MMAP_MIN_SIZE = 16 * 1024 * 1024  # darunter lohnt sich mmap nicht
+
+
+class VerifyReport:
+    def __init__(self):
+        self.problems = []  # [(spiel, backup, rel_pfad, grund)]
+        self.unverifiable = []  # [(spiel, backup)] ohne Manifest
+        self.backups = 0
+        self.files = 0
+        self.bytes = 0
+
+    @property
+    def ok(self):
+        return not self.problems
+
+    def summary(self):
+        text = (f"{self.backups} Backup(s), {self.files} Datei(en), {self.bytes / 1048576:.1f} MB geprüft: "
+                f"{len(self.problems)} Problem(e)")
+        if self.unverifiable:
+            text += f", {len(self.unverifiable)} alte(s) Backup(s) ohne Prüfsummen"
+        return text
+
+
+def hash_file(path, progress=None, cancel=None):
+    """Gibt (hash, größe) zurück; liest per mmap bzw. mit VERIFY_BUFFER großen Blöcken."""
+    hasher = hashlib.new(HASH_ALGO)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_MIN_SIZE:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    for offset in range(0, size, VERIFY_BUFFER):
+                        check_cancel(cancel)
+                        chunk = view[offset:offset + VERIFY_BUFFER]
+                        hasher.update(chunk)
+                        if progress:
+                            progress(len(chunk), 0)
+                        chunk.release()
+                finally:
+                    view.release()
+        else:
+            buffer = bytearray(min(max(size, 1), VERIFY_BUFFER))  # kleine Blöcke: kein 8-MB-Puffer
+            view = memoryview(buffer)
+            while length := f.readinto(buffer):
+                check_cancel(cancel)
+                hasher.update(view[:length])
+                if progress:
+                    progress(length, 0)
+    return hasher.hexdigest(), size
+
+
+def verify_backups(targets, store, workers=DEFAULT_WORKERS, progress=None, cancel=None):
+    """
+    Prüft die Backups in targets ([(spiel, name, backup_pfad)]) parallel.
+    Gibt einen VerifyReport zurück.
+    """
+    report = VerifyReport()
+    blobs = {}  # hash -> (größe bzw. None bei Blöcken, [(spiel, backup, rel_pfad)])
+    archives = []  # [(spiel, backup, archivdatei, index)]
+
+    for game, name, path in targets:
+        check_cancel(cancel)
+        try:
+            if is_archive_backup(path):
+                archive = archive_path(path)
+                archives.append((game, name, archive, read_index(archive)))
+            elif is_store_backup(path):
+                files = read_manifest(path)["files"]
+                for entry in files:
+                    ref = (game, name, entry["path"])
+                    if entry.get("chunks"):
+                        for digest in set(entry["chunks"]):
+                            blobs.setdefault(digest, (None, []))[1].append(ref)
+                    else:
+                        blobs.setdefault(entry["hash"], (entry["size"], []))[1].append(ref)
+                report.files += len(files)
+            elif os.path.isdir(path):
+                report.unverifiable.append((game, name))
+                continue
+            else:
+                report.problems.append((game, name, "", "Backup-Ordner fehlt"))
+                continue
+        except (OSError, ValueError, KeyError, ArchiveError, zlib.error) as e:
+            report.problems.append((game, name, "", f"Manifest unlesbar: {e}"))
+            continue
+        report.backups += 1
+
+    if progress:
+        progress.total(sum(size or 0 for size, _ in blobs.values())
+                       + sum(e["size"] for *_, index in archives for e in index["files"]),
+                       len(blobs) + sum(len(index["files"]) for *_, index in archives))
+
+    def check_blob(digest):
+        expected_size = blobs[digest][0]
+        try:
+            actual, size = hash_file(store.object_path(digest), progress, cancel)
+        except FileNotFoundError:
+            return "Blob fehlt", 0
+        finally:
+            if progress:
+                progress(0, 1)
+        if expected_size is not None and size != expected_size:
+            return f"Größe {size} statt {expected_size} Bytes", size
+        if actual != digest:
+            return "Prüfsumme stimmt nicht (beschädigt)", size
+        return None, size
+
+    def check_archive(archive):
+        game, name, path, index = archive
+        _, decompress = CODECS[index["codec"]]
+        problems = []
+        with open(path, "rb") as f:
+            for entry in index["files"]:
+                hasher = hashlib.new(HASH_ALGO)
+                size = 0
+                try:
+                    for data in iter_entry(f, entry, decompress):
+                        check_cancel(cancel)
+                        hasher.update(data)
+                        size += len(data)
+                        if progress:
+                            progress(len(data), 0)
+                    if size != entry["size"] or hasher.hexdigest() != entry["hash"]:
+                        problems.append((game, name, entry["path"], "Prüfsumme stimmt nicht (beschädigt)"))
+                except (OSError, ArchiveError, zlib.error, lzma.LZMAError, ValueError) as e:
+                    problems.append((game, name, entry["path"], f"unlesbar: {e}"))
+                if progress:
+                    progress(0, 1)
+        return problems
+
+    results, errors = run_parallel(check_blob, list(blobs), workers, cancel)
+    broken = {}  # (spiel, backup, rel_pfad) -> grund; ein Eintrag pro Datei, auch bei vielen Blöcken
+    for digest, (problem, size) in results:
+        report.bytes += size
+        if problem:
+            broken.update((ref, problem) for ref in blobs[digest][1])
+    for digest, e in errors:
+        broken.update((ref, f"unlesbar: {e}") for ref in blobs[digest][1])
+    report.problems.extend(ref + (problem,) for ref, problem in broken.items())
+
+    # Archive parallel zueinander, innerhalb eines Archivs sequentiell (ein Dateizeiger)
+    results, errors = run_parallel(check_archive, archives, workers, cancel)
+    for (_, _, _, index), problems in results:
+        report.files += len(index["files"])
+        report.bytes += sum(entry["size"] for entry in index["files"])
+        report.problems.extend(problems)
+    for (game, name, _, _), e in errors:
+        report.problems.append((game, name, "", f"Archiv unlesbar: {e}"))
+
+    report.problems.sort()
+    return report
@@ -0,0 +1,371 @@
+"""
+Benchmarks für Backup, Restore, Listen und Metadaten mit künstlichen Savegame-Ordnern.
+
+    python benchmark.py                      # alle Szenarien, Ergebnis nach benchmark_results.jsonl
+    python benchmark.py --scale 0.2 --only tiny,metadata
+    python benchmark.py --compare 1.0.0      # mit dem letzten Lauf dieser Version vergleichen
+
+Gemessen werden die echten Code-Pfade aus backup_core/stat_cache/backup_catalog (dieselben wie
+hinter "→ Backup", "← Restore" und refresh_lists). Die Qt-Modelle werden nur mit
+QT_QPA_PLATFORM=offscreen gemessen, wenn PyQt5 installiert ist. Alles läuft in einem
+temporären Arbeitsordner; jede Zeile in der Ergebnisdatei ist ein Lauf (Version, Zeit,
+Maschine und pro Messung Sekunden, MB/s und Dateien/s).
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import datetime
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = os.path.join(HERE, "benchmark_results.jsonl")
+SCENARIOS = ("tiny", "huge", "deep", "many_backups", "metadata", "qt_models")
+
+
+# --- Generatoren
+
+def make_tiny(root, count, rng):
+    """Viele kleine Dateien (Einstellungen, Thumbnails) in einigen Unterordnern."""
+    for i in range(count):
+        folder = os.path.join(root, "profile", f"slot{i % 50:02d}")
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"file{i:06d}.dat"), "wb") as f:
+            f.write(os.urandom(rng.randint(64, 4096)))
+
+
+def make_huge(root, count, size):
+    """Wenige große Binär-Slots wie SS1_data*Slot.bin."""
+    os.makedirs(root, exist_ok=True)
+    for i in range(count):
+        with open(os.path.join(root, f"SS1_data{i}Slot.bin"), "wb") as f:
+            remaining = size
+            while remaining:
+                chunk = min(remaining, 4 * 1024 * 1024)
+                f.write(os.urandom(chunk))
+                remaining -= chunk
+
+
+def make_deep(root, depth, width, files_per_dir, rng):
+    """Tief verschachtelter Baum (Mods, Cloud-Ordner)."""
+    def fill(folder, level):
+        os.makedirs(folder, exist_ok=True)
+        for i in range(files_per_dir):
+            with open(os.path.join(folder, f"f{i}.json"), "wb") as f:
+                f.write(os.urandom(rng.randint(100, 2000)))
+        if level < depth:
+            for w in range(width):
+                fill(os.path.join(folder, f"d{w}"), level + 1)
+    fill(os.path.join(root, "tree"), 1)
+
+
+def modify_region(path, offset, length):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(os.urandom(length))
+
+
+def tree_size(root):
+    size = count = 0
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            size += os.path.getsize(os.path.join(dirpath, name))
+            count += 1
+    return size, count
+
+
+# --- Messen
+
+class Runner:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = {}
+
+    def measure(self, name, func, size=0, files=0, setup=None):
+        """Bester von repeat Läufen; setup() läuft vor jedem Lauf und wird nicht mitgemessen."""
+        best = None
+        for _ in range(self.repeat):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        result = {"seconds": round(best, 4)}
+        if size:
+            result["mb_per_s"] = round(size / 1048576 / best, 1) if best else None
+        if files:
+            result["files_per_s"] = round(files / best, 1) if best else None
+        self.results[name] = result
+        rates = "  ".join(f"{key}={value}" for key, value in result.items() if key != "seconds")
+        print(f"  {name:<36} {best * 1000:9.1f} ms  {rates}")
+        return result
+
+
+def fresh_core(games):
+    import backup_core
+    from backup_core import BackupCore
+
+    for path in (backup_core.BACKUP_DIR, backup_core.SAVE_FILE, backup_core.SAVE_FILE + ".journal"):
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+    backup_core._metadata = None  # Journal gehört zum vorherigen Durchlauf
+    return BackupCore(games, {"copy_workers": 4})
+
+
+def bench_backup_restore(runner, label, path, names=None, delta=False, modify=None):
+    """Voll-Backup, inkrementelles Backup, Restore-Plan und Restore eines Ordners."""
+    size, count = tree_size(path)
+    game = f"bench_{label}"
+    core = fresh_core({game: {"path": path, "delta": delta}})
+    names = names or sorted(os.listdir(path))
+    counter = iter(range(10 ** 6))
+
+    def new_name():
+        return f"{label}-{next(counter):06d}"
+
+    def reset_store():
+        shutil.rmtree(core.store.root, ignore_errors=True)
+        shutil.rmtree(os.path.join("Backups", game), ignore_errors=True)
+
+    runner.measure(f"{label}.backup_full", lambda: core.run_backup(game, names, new_name()),
+                   size, count, setup=reset_store)
+    runner.measure(f"{label}.backup_unchanged", lambda: core.run_backup(game, names, new_name()), 0, count)
+    if modify:
+        runner.measure(f"{label}.backup_after_change", lambda: core.run_backup(game, names, new_name()),
+                       size, count, setup=modify)
+
+    backup = new_name()
+    core.run_backup(game, names, backup)
+    core.catalog.add_backup(game, backup)
+    runner.measure(f"{label}.restore_plan_unchanged", lambda: core.plan_restore(game, backup), size, count)
+
+    target = path + "_restore"
+    core.savegames[game]["path"] = target
+
+    def clear_target():
+        shutil.rmtree(target, ignore_errors=True)
+        os.makedirs(target)
+
+    def restore():
+        core.apply_restore(game, core.plan_restore(game, backup))
+
+    runner.measure(f"{label}.restore_full", restore, size, count, setup=clear_target)
+    shutil.rmtree(target, ignore_errors=True)
+    core.savegames[game]["path"] = path
+
+    from stat_cache import StatCache
+    cache = StatCache()
+
+    def listing():
+        for entry in cache.list_dir(path, restat_files=True):
+            if entry.is_dir:
+                cache.tree_info(os.path.join(path, entry.name))
+
+    runner.measure(f"{label}.list_cold", listing, 0, count, setup=lambda: cache.invalidate(path))
+    runner.measure(f"{label}.list_warm", listing, 0, count)
+    core.close()
+
+
+def bench_many_backups(runner, work, count):
+    """Katalog-Abfrage und Sortierung mit vielen vorhandenen Backups (refresh_lists)."""
+    from backup_catalog import CATALOG_FILE, BackupCatalog
+
+    path = os.path.join(work, "many")
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "save.dat"), "wb") as f:
+        f.write(os.urandom(1024))
+    game = "bench_many"
+    core = fresh_core({game: {"path": path, "notes": {}, "favorites": []}})
+    start = datetime.datetime(2024, 1, 1)
+    for i in range(count):
+        name = (start + datetime.timedelta(minutes=37 * i)).strftime("%d.%m.%Y_%H-%M-%S")
+        core.run_backup(game, ["save.dat"], name)
+        core.savegames[game]["notes"][name] = f"Backed up files:\nsave.dat ({i})"
+    core.close()
+
+    def rescan():
+        catalog = BackupCatalog("Backups")
+        data = core.savegames[game]
+        catalog.ensure_synced(game, data["notes"], data["favorites"])
+        catalog.close()
+
+    def drop_catalog():
+        if os.path.exists(catalog_file):
+            os.remove(catalog_file)
+
+    catalog_file = os.path.join("Backups", CATALOG_FILE)
+    runner.measure("many_backups.catalog_rescan", rescan, 0, count, setup=drop_catalog)
+    catalog = BackupCatalog("Backups")
+    data = core.savegames[game]
+    catalog.ensure_synced(game, data["notes"], data["favorites"])
+    runner.measure("many_backups.list_sorted", lambda: (catalog.ensure_synced(game, data["notes"], data["favorites"]),
+                                                        catalog.list_backups(game)), 0, count)
+    catalog.close()
+
+
+def bench_metadata(runner, games_count, notes_per_game):
+    """save_savegames/load_savegames mit vielen Notizen (Journal + Kompaktierung)."""
+    import backup_core
+
+    games = {f"game{g}": {"path": f"/saves/game{g}", "favorites": [],
+                          "notes": {f"{n:06d}": "Backed up files:\nslot.bin" for n in range(notes_per_game)}}
+             for g in range(games_count)}
+    fresh_core({})
+    backup_core.save_savegames(games)
+    backup_core.metadata().close()
+    edits = 200
+
+    def edit_notes():
+        for i in range(edits):
+            games["game0"]["notes"][f"{i:06d}"] = f"Notiz {time.perf_counter()}"
+            backup_core.save_savegames(games)
+        backup_core.metadata().flush()
+
+    runner.measure("metadata.save_single_edits", edit_notes, 0, edits)
+    backup_core.metadata().close()
+    total = games_count * notes_per_game
+    runner.measure("metadata.load", backup_core.load_savegames, os.path.getsize(backup_core.SAVE_FILE), total)
+
+
+def bench_qt_models(runner, work, count):
+    """SaveFileModel/BackupListModel mit offscreen-Plattform (nur wenn PyQt5 installiert ist)."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt5.QtWidgets import QApplication
+    except ImportError:
+        print("  qt_models: PyQt5 nicht installiert, übersprungen")
+        return
+    from list_models import BackupListModel, SaveFileModel
+    from stat_cache import StatCache
+
+    app = QApplication.instance() or QApplication([])
+    path = os.path.join(work, "qt")
+    os.makedirs(path, exist_ok=True)
+    for i in range(count):
+        open(os.path.join(path, f"slot{i:06d}.bin"), "wb").close()
+    save_model = SaveFileModel(StatCache())
+    runner.measure("qt_models.save_list_load", lambda: save_model.load(path), 0, count)
+    rows = [{"name": f"{i:06d}", "note": "", "favorite": i % 10 == 0} for i in range(count)]
+    backup_model = BackupListModel()
+    runner.measure("qt_models.backup_list_set_rows", lambda: backup_model.set_rows(rows), 0, count)
+    runner.measure("qt_models.favorite_toggle", lambda: backup_model.update_backup(f"{count // 2:06d}", favorite=1))
+    app.processEvents()
+
+
+# --- Ergebnisse
+
+def load_runs(path):
+    runs = []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    runs.append(json.loads(line))
+                except ValueError:
+                    continue
+    return runs
+
+
+def compare(results, previous):
+    print(f"\nVergleich mit {previous['version']} vom {previous['time']}:")
+    for name, result in results.items():
+        old = previous["results"].get(name)
+        if not old or not old["seconds"]:
+            continue
+        change = (result["seconds"] - old["seconds"]) / old["seconds"] * 100
+        marker = "  <-- langsamer" if change > 10 else ""
+        print(f"  {name:<36} {old['seconds'] * 1000:9.1f} -> {result['seconds'] * 1000:9.1f} ms ({change:+.0f} %){marker}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks mit künstlichen Savegame-Ordnern")
+    parser.add_argument("--scale", type=float, default=1.0, help="Größe der Testdaten (1.0 = Standard)")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen, gemeldet wird der beste Lauf")
+    parser.add_argument("--only", help=f"nur diese Szenarien ({', '.join(SCENARIOS)})")
+    parser.add_argument("--label", help="Version/Bezeichnung des Laufs (Standard: version.txt)")
+    parser.add_argument("--results", default=RESULTS_FILE, help="JSON-Lines-Datei für die Ergebnisse")
+    parser.add_argument("--compare", help="mit dem letzten Lauf dieser Bezeichnung vergleichen")
+    parser.add_argument("--no-save", action="store_true", help="Ergebnis nicht speichern")
+    args = parser.parse_args(argv)
+
+    selected = args.only.split(",") if args.only else list(SCENARIOS)
+    unknown = [name for name in selected if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unbekanntes Szenario: {', '.join(unknown)}")
+    label = args.label
+    if not label:
+        try:
+            with open(os.path.join(HERE, "version.txt"), "r", encoding="utf-8") as f:
+                label = f.read().strip()
+        except OSError:
+            label = "unbekannt"
+
+    sys.path.insert(0, HERE)
+    rng = random.Random(42)
+    scale = args.scale
+    runner = Runner(max(1, args.repeat))
+    old_cwd = os.getcwd()
+    work = tempfile.mkdtemp(prefix="savebackup-bench-")
+    try:
+        os.chdir(work)
+        if "tiny" in selected:
+            print("tiny: viele kleine Dateien")
+            path = os.path.join(work, "tiny")
+            make_tiny(path, int(5000 * scale), rng)
+            touched = os.path.join(path, "profile", "slot00", "file000000.dat")
+            bench_backup_restore(runner, "tiny", path, modify=lambda: modify_region(touched, 0, 16))
+        if "huge" in selected:
+            print("huge: wenige große Slots (Blockmodus)")
+            path = os.path.join(work, "huge")
+            slot_size = max(1, int(64 * scale)) * 1024 * 1024
+            make_huge(path, 3, slot_size)
+            slot = os.path.join(path, "SS1_data0Slot.bin")
+            bench_backup_restore(runner, "huge", path, delta=True,
+                                 modify=lambda: modify_region(slot, slot_size // 2, 4096))
+        if "deep" in selected:
+            print("deep: tiefer Ordnerbaum")
+            path = os.path.join(work, "deep")
+            make_deep(path, max(2, int(8 * min(scale, 1))), 2, 3, rng)
+            bench_backup_restore(runner, "deep", path)
+        if "many_backups" in selected:
+            print("many_backups: viele vorhandene Backups")
+            bench_many_backups(runner, work, int(1000 * scale))
+        if "metadata" in selected:
+            print("metadata: save_paths.json mit vielen Notizen")
+            bench_metadata(runner, 20, int(500 * scale))
+        if "qt_models" in selected:
+            print("qt_models: Listenmodelle (offscreen)")
+            bench_qt_models(runner, work, int(20000 * scale))
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(work, ignore_errors=True)
+
+    run = {
+        "version": label,
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "machine": f"{platform.system()} {platform.machine()} Python {platform.python_version()}",
+        "scale": scale,
+        "results": runner.results,
+    }
+    if args.compare:
+        previous = [r for r in load_runs(args.results) if r["version"] == args.compare and r["scale"] == scale]
+        if previous:
+            compare(runner.results, previous[-1])
+        else:
+            print(f"\nKein gespeicherter Lauf für {args.compare} mit scale={scale}.")
+    if not args.no_save:
+        with open(args.results, "a", encoding="utf-8") as f:
+            f.write(json.dumps(run, ensure_ascii=False) + "\n")
+        print(f"\nErgebnis gespeichert in {args.results}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
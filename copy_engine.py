@@ -0,0 +1,266 @@
+"""
+Paralleler Kopier-Motor für Backup und Restore.
+
+Viele Dateien werden gleichzeitig über einen begrenzten Thread-Pool kopiert, weil SSDs/NVMe
+erst mit mehreren offenen Anfragen ihren Durchsatz erreichen. Zielordner werden vorab
+angelegt, Fehler pro Datei gesammelt und am Ende als ein Bericht zurückgegeben.
+
+Der Inhalt selbst wird auf dem schnellsten verfügbaren Weg kopiert (copy_data):
+    clone            FICLONE-Reflink (Btrfs, XFS, ...): keine Daten bewegt, kein Platz belegt,
+                     bis sich eine der beiden Dateien ändert
+    copy_file_range  Kopie im Kernel, auf manchen Dateisystemen/NFS serverseitig
+    sendfile         Kopie im Kernel (ältere Linux-Kernel)
+    buffered         readinto/write mit CHUNK_SIZE-Puffer (Windows, alles andere)
+Was ein Paar von Dateisystemen (st_dev von Quelle und Ziel) nicht kann, wird beim ersten
+Fehlschlag gemerkt und danach nicht mehr versucht.
+
+Jeder kopierte Block wird bei der Drosselung des Jobs abgebucht (io_throttle.charge); ist eine
+gesetzt, kopiert der Kernel in CHUNK_SIZE- statt KERNEL_COPY_CHUNK-Stücken.
+"""
+import os
+import errno
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import io_throttle
+from op_log import profile_workers
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DEFAULT_WORKERS = 4
+CHUNK_SIZE = 1024 * 1024  # 1 MB Lesepuffer
+KERNEL_COPY_CHUNK = 64 * 1024 * 1024  # pro Kernel-Aufruf, damit Fortschritt/Abbruch möglich bleiben
+FICLONE = 0x40049409  # _IOW(0x94, 9, int), Linux
+
+COPY_METHODS = ("clone", "copy_file_range", "sendfile", "buffered")
+# Fehler, mit denen Kernel/Dateisystem "kann ich nicht" melden (statt eines echten I/O-Fehlers)
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTTY,
+                       getattr(errno, "ENOTSUP", errno.EOPNOTSUPP), getattr(errno, "ENOTSOCK", errno.EINVAL)}
+_unsupported = {}  # (st_dev quelle, st_dev ziel) -> {methoden}
+_unsupported_lock = threading.Lock()
+
+
+class BackupCancelled(Exception):
+    """Wird geworfen, wenn ein laufender Backup-/Restore-Job abgebrochen wurde."""
+
+
+def check_cancel(cancel):
+    if cancel is not None and cancel.is_set():
+        raise BackupCancelled()
+
+
+def run_parallel(func, items, workers=DEFAULT_WORKERS, cancel=None):
+    """
+    Ruft func(item) für alle items mit höchstens `workers` Threads auf.
+    Es sind nie mehr als 2 * workers Aufgaben gleichzeitig eingereiht, damit auch
+    sehr große Dateilisten nicht komplett als Futures im Speicher liegen.
+    Gibt ([(item, ergebnis)] in Eingabereihenfolge, [(item, Fehler)]) zurück.
+    """
+    items = list(items)
+    results = [None] * len(items)
+    errors = []
+    cancelled = False
+    workers = max(1, int(workers))
+    throttle = io_throttle.current()
+    if throttle is not None:
+        func = throttle.bind(func)  # Kopier-Threads buchen beim selben Eimer ab
+    func = profile_workers(func)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        index = 0
+        while index < len(items) or running:
+            while index < len(items) and len(running) < workers * 2 and not cancelled:
+                running[pool.submit(func, items[index])] = index
+                index += 1
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                try:
+                    results[i] = (items[i], future.result())
+                except BackupCancelled:
+                    cancelled = True
+                except Exception as e:
+                    errors.append((items[i], e))
+            if cancel is not None and cancel.is_set():
+                cancelled = True
+            if cancelled:
+                index = len(items)  # nichts Neues mehr einreihen, laufende auslaufen lassen
+
+    if cancelled:
+        raise BackupCancelled()
+    return [r for r in results if r is not None], errors
+
+
+class _Unsupported(Exception):
+    """Die Methode geht für dieses Paar von Dateisystemen nicht; nichts wurde geschrieben."""
+
+
+def _available(method):
+    if method == "clone":
+        return fcntl is not None and hasattr(fcntl, "ioctl") and os.name == "posix"
+    if method == "copy_file_range":
+        return hasattr(os, "copy_file_range")
+    if method == "sendfile":
+        return hasattr(os, "sendfile") and os.name == "posix"
+    return True
+
+
+def copy_capabilities():
+    """{(st_dev quelle, st_dev ziel): [nicht unterstützte Methoden]} - zur Diagnose."""
+    with _unsupported_lock:
+        return {key: sorted(methods) for key, methods in _unsupported.items()}
+
+
+def _clone(src, dst, remaining, progress, cancel):
+    try:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError as e:
+        if e.errno in _UNSUPPORTED_ERRNOS:
+            raise _Unsupported() from e
+        raise
+    io_throttle.charge(0, cancel=cancel)  # keine Daten bewegt, nur ein Vorgang
+    if progress:
+        progress(remaining, 0)
+
+
+def _kernel_copy(call, remaining, progress, cancel):
+    copied = 0
+    chunk = KERNEL_COPY_CHUNK if io_throttle.current() is None else CHUNK_SIZE
+    while True:
+        check_cancel(cancel)
+        try:
+            n = call(chunk)
+        except OSError as e:
+            if copied == 0 and e.errno in _UNSUPPORTED_ERRNOS:
+                raise _Unsupported() from e
+            raise
+        if n == 0:
+            if copied == 0 and remaining > 0:
+                raise _Unsupported()  # z.B. procfs/overlay: meldet 0 statt eines Fehlers
+            return
+        copied += n
+        io_throttle.charge(n, cancel=cancel)
+        if progress:
+            progress(n, 0)
+
+
+def _buffered(src, dst, progress, cancel):
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    while length := src.readinto(buffer):
+        check_cancel(cancel)
+        dst.write(view[:length])
+        io_throttle.charge(length, cancel=cancel)
+        if progress:
+            progress(length, 0)
+    dst.flush()  # nachfolgende Kernel-Kopien schreiben direkt auf den Dateideskriptor
+
+
+def try_clone(src, dst):
+    """
+    Reflink der ganzen Datei src nach dst (beide binär geöffnet, Position 0), wenn das Paar von
+    Dateisystemen es kann. Gibt True zurück, sonst False (dann wurde nichts geschrieben).
+    """
+    if not _available("clone"):
+        return False
+    key = (os.fstat(src.fileno()).st_dev, os.fstat(dst.fileno()).st_dev)
+    with _unsupported_lock:
+        if "clone" in _unsupported.get(key, ()):
+            return False
+    try:
+        _clone(src, dst, 0, None, None)
+    except _Unsupported:
+        with _unsupported_lock:
+            _unsupported.setdefault(key, set()).add("clone")
+        return False
+    return True
+
+
+def copy_data(src, dst, progress=None, cancel=None, allow_clone=True):
+    """
+    Kopiert von der aktuellen Position von src bis zum Ende an die aktuelle Position von dst
+    (beide binär geöffnet). Clone nur, wenn ganze Dateien kopiert werden (allow_clone und
+    beide Positionen 0). Gibt die benutzte Methode zurück.
+    """
+    src_stat, dst_stat = os.fstat(src.fileno()), os.fstat(dst.fileno())
+    key = (src_stat.st_dev, dst_stat.st_dev)
+    remaining = max(0, src_stat.st_size - src.tell())
+    with _unsupported_lock:
+        skip = set(_unsupported.get(key, ()))
+    if not allow_clone or src.tell() or dst.tell():
+        skip.add("clone")
+    src_fd, dst_fd = src.fileno(), dst.fileno()
+
+    for method in COPY_METHODS:
+        if method in skip or not _available(method):
+            continue
+        try:
+            if method == "clone":
+                _clone(src, dst, remaining, progress, cancel)
+            elif method == "copy_file_range":
+                _kernel_copy(lambda n: os.copy_file_range(src_fd, dst_fd, n), remaining, progress, cancel)
+            elif method == "sendfile":
+                _kernel_copy(lambda n: os.sendfile(dst_fd, src_fd, None, n), remaining, progress, cancel)
+            else:
+                _buffered(src, dst, progress, cancel)
+            return method
+        except _Unsupported:
+            with _unsupported_lock:
+                _unsupported.setdefault(key, set()).add(method)
+    raise AssertionError("buffered ist immer verfügbar")
+
+
+def copy_file(src_file, dst_file, progress=None, cancel=None):
+    """
+    Kopiert den Inhalt über copy_data (Reflink/Kernel-Kopie, sonst blockweise), mit Fortschritt
+    und Abbruch. src_file darf auch eine Liste sein (Blöcke aus dem Blockmodus), die
+    aneinandergehängt wird; dann wird nicht geklont.
+    """
+    sources = src_file if isinstance(src_file, list) else [src_file]
+    with open(dst_file, "wb") as dst:
+        for source in sources:
+            with open(source, "rb") as src:
+                copy_data(src, dst, progress, cancel, allow_clone=len(sources) == 1)
+    if progress:
+        progress(0, 1)
+
+
+def copy2(src_file, dst_file, progress=None, cancel=None):
+    """Wie shutil.copy2 (Inhalt, Zeiten, Rechte), aber über den schnellsten Kopierweg."""
+    copy_file(src_file, dst_file, progress, cancel)
+    shutil.copystat(src_file, dst_file)
+
+
+def make_dirs(dirs):
+    """Legt alle Zielordner vorab an (kürzeste zuerst), damit die Worker nicht darum konkurrieren."""
+    for path in sorted(set(dirs), key=len):
+        os.makedirs(path, exist_ok=True)
+
+
+def copy_files(jobs, workers=DEFAULT_WORKERS, progress=None, cancel=None):
+    """
+    Kopiert [(quelle, ziel, mtime)] parallel. Metadaten wie bei shutil.copy2:
+    ist mtime None, werden Zeiten/Rechte der Quelle übernommen, sonst wird mtime gesetzt.
+    Gibt die Liste [(ziel, Fehler)] zurück.
+    """
+    jobs = list(jobs)
+    make_dirs(os.path.dirname(dst) for _, dst, _ in jobs)
+
+    def copy_one(job):
+        src, dst, mtime = job
+        check_cancel(cancel)
+        if mtime is None:
+            copy2(src, dst, progress, cancel)
+        else:
+            copy_file(src, dst, progress, cancel)
+            os.utime(dst, (mtime, mtime))
+
+    _, errors = run_parallel(copy_one, jobs, workers, cancel)
+    return [(job[1], e) for job, e in errors]
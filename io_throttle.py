@@ -0,0 +1,221 @@
+"""
+Drosselung von Backup/Restore, damit ein laufendes Spiel nicht ruckelt.
+
+Einstellungen pro Spiel in save_paths.json:
+    "io_max_mb_per_s": 20     höchstens so viele MB/s lesen/schreiben (0 = unbegrenzt)
+    "io_max_iops": 200        höchstens so viele Lese-/Schreibvorgänge pro Sekunde (0 = unbegrenzt)
+    "io_adaptive": true       zurückfahren, sobald die Latenz der Kopiervorgänge deutlich steigt
+                              (die Platte ist ausgelastet), danach langsam wieder hochfahren
+    "io_background": true     Job mit niedriger CPU- und I/O-Priorität ausführen (nur Linux)
+
+Beide Grenzen sind Token-Buckets: jeder kopierte Block bucht seine Bytes und einen Vorgang ab,
+ist der Eimer leer, schläft der Thread, bis wieder genug nachgelaufen ist. Die Drosselung gilt
+Thread-lokal (wie die Phasen in op_log) und wird von copy_engine.run_parallel an die
+Kopier-Threads weitergegeben, muss also nicht durch alle Funktionen gereicht werden.
+"""
+import os
+import sys
+import time
+import ctypes
+import platform
+import threading
+
+MB = 1024 * 1024
+BURST_SECONDS = 0.25  # so viel Vorrat darf sich ansammeln
+SLEEP_SLICE = 0.1  # längstes Schlafstück, damit Abbrechen schnell wirkt
+
+ADAPTIVE_INTERVAL = 0.5  # Sekunden zwischen zwei Anpassungen
+ADAPTIVE_WARMUP = 8  # Messwerte, bevor zurückgefahren wird
+ADAPTIVE_SLOWDOWN = 2.0  # Latenz > Basis * Faktor -> Rate halbieren
+ADAPTIVE_RECOVER = 1.25  # Latenz wieder normal -> Rate um diesen Faktor erhöhen
+ADAPTIVE_MIN_RATE = 1 * MB
+EWMA_WEIGHT = 0.2
+
+BACKGROUND_NICE = 10
+IOPRIO_CLASS_BE = 2  # best effort; "idle" könnte ein Backup während des Spielens ganz aushungern
+IOPRIO_LOWEST = 7
+IOPRIO_WHO_PROCESS = 1  # mit who=0 der aufrufende Thread
+_IOPRIO_SET = {"x86_64": 251, "i386": 289, "i686": 289, "aarch64": 30, "armv7l": 314, "armv6l": 314}
+
+_local = threading.local()
+
+
+class IoThrottle:
+    def __init__(self, bytes_per_s=0, iops=0, adaptive=False):
+        self.bytes_per_s = bytes_per_s
+        self.iops = iops
+        self.adaptive = adaptive
+        self.waited = 0.0  # insgesamt geschlafene Sekunden (für das Protokoll)
+        self._lock = threading.Lock()
+        self._rate = 0  # aktuelle adaptive Grenze in Bytes/s, 0 = keine
+        self._last = time.monotonic()
+        self._byte_tokens = self._byte_capacity()
+        self._op_tokens = self._op_capacity()
+        # adaptiv
+        self._timing = threading.local()
+        self._samples = 0
+        self._ewma = None
+        self._baseline = None
+        self._peak = 0.0
+        self._interval_start = self._last
+        self._interval_bytes = 0
+
+    @classmethod
+    def from_settings(cls, data):
+        """Drosselung aus den Spiel-Einstellungen, None wenn nichts davon gesetzt ist."""
+        bytes_per_s = int(float(data.get("io_max_mb_per_s") or 0) * MB)
+        iops = int(data.get("io_max_iops") or 0)
+        adaptive = bool(data.get("io_adaptive"))
+        if not (bytes_per_s or iops or adaptive):
+            return None
+        return cls(bytes_per_s, iops, adaptive)
+
+    def rate(self):
+        """Aktuell geltende Grenze in Bytes/s (0 = unbegrenzt)."""
+        limits = [r for r in (self.bytes_per_s, self._rate) if r]
+        return min(limits) if limits else 0
+
+    def _byte_capacity(self):
+        return self.rate() * BURST_SECONDS
+
+    def _op_capacity(self):
+        return max(1.0, self.iops * BURST_SECONDS)
+
+    def charge(self, nbytes, ops=1, cancel=None):
+        """Bucht einen erledigten Vorgang ab und schläft, falls eine Grenze überschritten ist."""
+        now = time.monotonic()
+        if self.adaptive and nbytes:
+            last = getattr(self._timing, "last", None)
+            if last is not None:
+                self._observe(nbytes, now - last, now)
+        with self._lock:
+            elapsed = now - self._last
+            self._last = now
+            wait = 0.0
+            rate = self.rate()
+            if rate:
+                self._byte_tokens = min(self._byte_capacity(), self._byte_tokens + elapsed * rate) - nbytes
+                if self._byte_tokens < 0:
+                    wait = -self._byte_tokens / rate
+            if self.iops:
+                self._op_tokens = min(self._op_capacity(), self._op_tokens + elapsed * self.iops) - ops
+                if self._op_tokens < 0:
+                    wait = max(wait, -self._op_tokens / self.iops)
+        if wait > 0:
+            self._sleep(wait, cancel)
+        self._timing.last = time.monotonic()  # Schlafen zählt nicht als Latenz
+
+    def _sleep(self, seconds, cancel):
+        start = time.monotonic()
+        end = start + seconds
+        while (remaining := end - time.monotonic()) > 0:
+            if cancel is not None and cancel.is_set():
+                break  # der Aufrufer bricht beim nächsten check_cancel ab
+            time.sleep(min(remaining, SLEEP_SLICE))
+        with self._lock:
+            self.waited += time.monotonic() - start
+
+    def _observe(self, nbytes, latency, now):
+        """Adaptiv: Latenz pro Vorgang glätten und die Rate danach anpassen (AIMD)."""
+        with self._lock:
+            self._ewma = latency if self._ewma is None else (1 - EWMA_WEIGHT) * self._ewma + EWMA_WEIGHT * latency
+            self._samples += 1
+            self._interval_bytes += nbytes
+            if self._samples < ADAPTIVE_WARMUP:
+                return
+            # Basis = schnellste geglättete Latenz; folgt langsameren Messungen nur zögerlich (s.u.)
+            self._baseline = self._ewma if self._baseline is None else min(self._baseline, self._ewma)
+            span = now - self._interval_start
+            if span < ADAPTIVE_INTERVAL:
+                return
+            throughput = self._interval_bytes / span
+            self._interval_start = now
+            self._interval_bytes = 0
+            if self._ewma > self._baseline * ADAPTIVE_SLOWDOWN:
+                current = self._rate or throughput
+                self._rate = max(ADAPTIVE_MIN_RATE, current / 2)
+            else:
+                self._peak = max(self._peak, throughput)
+                if self._rate:
+                    self._rate *= ADAPTIVE_RECOVER
+                    ceiling = self.bytes_per_s or self._peak
+                    if ceiling and self._rate >= ceiling:
+                        self._rate = 0  # wieder bei der festen Grenze bzw. ungedrosselt
+            self._baseline *= 1.02  # dauerhaft langsamere Platte nicht ewig als Überlast werten
+
+    def bind(self, func):
+        """func so verpacken, dass sie in einem anderen Thread unter dieser Drosselung läuft."""
+        def bound(*args, **kwargs):
+            previous = getattr(_local, "throttle", None)
+            _local.throttle = self
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _local.throttle = previous
+        return bound
+
+
+def current():
+    """Drosselung des aufrufenden Threads oder None."""
+    return getattr(_local, "throttle", None)
+
+
+def charge(nbytes, ops=1, cancel=None):
+    """Bucht bei der Drosselung des aufrufenden Threads ab; ohne Drosselung ein No-op."""
+    throttle = getattr(_local, "throttle", None)
+    if throttle is not None:
+        throttle.charge(nbytes, ops, cancel)
+
+
+def lower_priority():
+    """
+    Senkt CPU-Priorität (nice) und I/O-Priorität des aufrufenden Threads. Unter Linux gelten
+    beide pro Thread und werden an neu gestartete Threads vererbt. Gibt True zurück, wenn
+    mindestens eins geklappt hat; auf anderen Systemen passiert nichts.
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    lowered = False
+    try:
+        # mit who=0 nur dieser Thread; nie höher stellen, als er schon ist
+        os.setpriority(os.PRIO_PROCESS, 0, max(os.getpriority(os.PRIO_PROCESS, 0), BACKGROUND_NICE))
+        lowered = True
+    except OSError:
+        pass
+    number = _IOPRIO_SET.get(platform.machine())
+    if number is not None:
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            if libc.syscall(number, IOPRIO_WHO_PROCESS, 0, (IOPRIO_CLASS_BE << 13) | IOPRIO_LOWEST) == 0:
+                lowered = True
+        except (OSError, AttributeError):
+            pass
+    return lowered
+
+
+def run_limited(fn, throttle=None, background=False):
+    """
+    Führt fn() unter der Drosselung aus. Mit background in einem eigenen Thread mit niedriger
+    Priorität (unter Linux kann ein Thread seine Priorität nicht wieder anheben, deshalb nicht
+    im wiederverwendeten Job-Thread). Gibt das Ergebnis von fn zurück bzw. wirft dessen Fehler.
+    """
+    if throttle is not None:
+        fn = throttle.bind(fn)
+    if not background:
+        return fn()
+
+    outcome = {}
+
+    def target():
+        lower_priority()
+        try:
+            outcome["result"] = fn()
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, name="io-background", daemon=True)
+    thread.start()
+    thread.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
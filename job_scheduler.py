@@ -0,0 +1,168 @@
+"""
+Warteschlange für Backup-, Restore-, Prüf- und Aufräum-Jobs mehrerer Spiele.
+
+Jeder Job nennt die Geräte (st_dev), die er belegt (devices, z.B. den Savegame-Ordner), und
+die Ziele, in die alle Jobs schreiben (targets, der Backup-Ordner). Pro Gerät laufen höchstens
+`device_jobs` Jobs gleichzeitig (einzeln einstellbar über device_limits), pro Ziel höchstens
+`max_jobs` (bzw. device_limits), insgesamt höchstens `max_jobs`. So laufen Spiele auf
+verschiedenen Platten parallel, obwohl alle in denselben Backup-Ordner schreiben, während sich
+Spiele auf derselben Platte nicht gegenseitig ausbremsen. Zähler für Geräte und Ziele sind
+getrennt. Ein Job startet erst, wenn alle seine Geräte und Ziele frei sind; unter den startbereiten
+gewinnt die kleinste Priorität (Restore vor Backup vor Prüfen vor Aufräumen), bei Gleichstand
+der ältere.
+
+Jobs mit demselben key (z.B. Backups mehrerer Spiele desselben Ordners) werden
+zusammengelegt, solange der erste noch wartet oder läuft: submit gibt dann dessen Future
+zurück, die Arbeit passiert nur einmal.
+
+Lädt kein PyQt5; die Jobs bekommen wie backup_jobs.Job fn(progress, cancel).
+"""
+import os
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from backup_store import Progress
+
+DEFAULT_MAX_JOBS = 2
+DEFAULT_DEVICE_JOBS = 1
+PRIORITIES = {"restore": 0, "backup": 1, "verify": 2, "prune": 3}
+
+
+def device_of(path):
+    """st_dev des Pfads bzw. des nächsten existierenden übergeordneten Ordners (None, falls keiner)."""
+    path = os.path.abspath(path)
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+
+
+class _Entry:
+    def __init__(self, kind, title, fn, devices, targets, priority, seq, key):
+        self.kind = kind
+        self.title = title
+        self.fn = fn
+        self.devices = frozenset(d for d in devices if d is not None)
+        self.targets = frozenset(d for d in targets if d is not None)
+        self.priority = priority
+        self.seq = seq
+        self.key = key
+        self.future = Future()
+
+
+class JobScheduler:
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS, device_jobs=DEFAULT_DEVICE_JOBS, device_limits=None):
+        self.max_jobs = max(1, int(max_jobs))
+        self.device_jobs = max(1, int(device_jobs))
+        self.device_limits = dict(device_limits or {})  # st_dev -> Jobs gleichzeitig
+        self.cancel_event = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_jobs)
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._pending = []
+        self._by_key = {}  # key -> wartender oder laufender Job
+        self._busy = {}  # st_dev -> laufende Jobs
+        self._writing = {}  # st_dev -> laufende Jobs, die dorthin schreiben (targets)
+        self._running = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def limit(self, device):
+        # 0 oder Unsinn in device_limits würde Jobs auf diesem Gerät für immer warten lassen
+        return max(1, int(self.device_limits.get(device, self.device_jobs)))
+
+    def target_limit(self, device):
+        return max(1, int(self.device_limits.get(device, self.max_jobs)))
+
+    def submit(self, kind, fn, devices=(), priority=None, key=None, title="", targets=()):
+        """
+        Reiht fn(progress, cancel) ein und gibt eine concurrent.futures.Future zurück.
+        devices werden mit device_jobs begrenzt, targets (gemeinsames Ziel aller Jobs) mit max_jobs.
+        Gibt es schon einen wartenden/laufenden Job mit demselben key, wird dessen Future
+        zurückgegeben (zusammengelegt, fn wird nicht ausgeführt).
+        """
+        with self._lock:
+            if key is not None and key in self._by_key:
+                return self._by_key[key].future
+            entry = _Entry(kind, title, fn, devices, targets, PRIORITIES.get(kind, len(PRIORITIES))
+                           if priority is None else priority, next(self._seq), key)
+            self._pending.append(entry)
+            if key is not None:
+                self._by_key[key] = entry
+        self._dispatch()
+        return entry.future
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def cancel(self):
+        """Bricht laufende Jobs ab (über cancel) und verwirft alle wartenden."""
+        self.cancel_event.set()
+        with self._lock:
+            pending, self._pending = self._pending, []
+            for entry in pending:
+                self._by_key.pop(entry.key, None)
+        for entry in pending:
+            entry.future.cancel()
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+    def _fits(self, entry):
+        return (all(self._busy.get(device, 0) < self.limit(device) for device in entry.devices)
+                and all(self._writing.get(device, 0) < self.target_limit(device) for device in entry.targets))
+
+    def _dispatch(self):
+        """Startet so viele wartende Jobs, wie Gesamt- und Gerätegrenzen erlauben."""
+        while True:
+            with self._lock:
+                if self._running >= self.max_jobs:
+                    return
+                ready = [entry for entry in self._pending if self._fits(entry)]
+                if not ready:
+                    return
+                entry = min(ready, key=lambda e: (e.priority, e.seq))
+                self._pending.remove(entry)
+                for device in entry.devices:
+                    self._busy[device] = self._busy.get(device, 0) + 1
+                for device in entry.targets:
+                    self._writing[device] = self._writing.get(device, 0) + 1
+                self._running += 1
+            self._pool.submit(self._run, entry)
+
+    def _run(self, entry):
+        outcome = None
+        if entry.future.set_running_or_notify_cancel():  # sonst vom Aufrufer abgesagt
+            try:
+                outcome = (True, entry.fn(Progress(), self.cancel_event))
+            except BaseException as e:
+                outcome = (False, e)
+        self._release(entry)
+        if outcome is not None:
+            ok, value = outcome
+            if ok:
+                entry.future.set_result(value)
+            else:
+                entry.future.set_exception(value)
+        self._dispatch()
+
+    def _release(self, entry):
+        """Vor dem Ergebnis austragen: wer danach einreicht, bekommt einen neuen Job."""
+        with self._lock:
+            if self._by_key.get(entry.key) is entry:
+                del self._by_key[entry.key]
+            for device in entry.devices:
+                self._busy[device] -= 1
+            for device in entry.targets:
+                self._writing[device] -= 1
+            self._running -= 1
@@ -0,0 +1,239 @@
+"""
+Listenmodelle für die Savegame- und Backup-Liste.
+
+Statt pro Eintrag ein QListWidgetItem zu bauen, liegen die Daten in schlanken Modellen.
+Die Views holen Zeilen stapelweise über canFetchMore/fetchMore nach, sobald gescrollt wird,
+und Änderungen an einem Backup (Favorit, Notiz) aktualisieren nur diese eine Zeile.
+Icons kommen aus einem gemeinsamen Cache (Pfad + mtime), damit nicht jedes Neuladen
+die Bilddatei erneut von der Platte liest.
+
+Die Savegame-Liste zeigt zusätzlich Größe, Änderungszeit und den Status seit dem letzten
+Backup. Dateien kommen sofort aus dem Stat-Cache, Ordnergrößen und Status werden in einem
+Hintergrund-Thread berechnet und zeilenweise nachgetragen.
+"""
+import os
+import datetime
+import threading
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QIcon
+
+from backup_core import format_size
+from backup_store import is_restore_area
+from stat_cache import STATUS_CHANGED, STATUS_NEW, backup_status
+
+FETCH_BATCH = 200  # Zeilen pro fetchMore
+TIME_FORMAT = "%d.%m.%Y %H:%M"
+
+
+class IconCache:
+    def __init__(self):
+        self._icons = {}  # pfad -> (mtime_ns, QIcon)
+        self._empty = QIcon()
+
+    def icon(self, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns if path else None
+        except OSError:
+            mtime = None
+        if mtime is None:
+            return self._empty
+        cached = self._icons.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        icon = QIcon(path)
+        self._icons[path] = (mtime, icon)
+        return icon
+
+
+class LazyModel(QAbstractTableModel):
+    """Hält alle Einträge, gibt der View aber nur die bereits nachgeladenen Zeilen bekannt."""
+    COLUMNS = ("Name",)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._loaded = 0
+        self.icon = QIcon()
+
+    def set_rows(self, rows, icon=None):
+        self.beginResetModel()
+        self._rows = list(rows)
+        self._loaded = min(len(self._rows), FETCH_BATCH)
+        self.icon = icon if icon is not None else QIcon()
+        self.endResetModel()
+
+    def clear(self):
+        self.set_rows([])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._rows)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(FETCH_BATCH, len(self._rows) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def row(self, index):
+        return self._rows[index.row()] if index.isValid() and index.row() < self._loaded else None
+
+    def row_changed(self, row):
+        if row < self._loaded:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+
+class SaveFileModel(LazyModel):
+    """Dateien/Ordner im Savegame-Ordner mit Größe, Änderungszeit und Backup-Status."""
+    COLUMNS = ("Name", "Größe", "Geändert", "Status")
+    _info_ready = pyqtSignal(int, list)  # generation, [(zeile, größe, mtime, status)]
+
+    def __init__(self, stat_cache, parent=None):
+        super().__init__(parent)
+        self.stat_cache = stat_cache
+        self._generation = 0
+        self._info_ready.connect(self._apply_info)
+
+    def load(self, path, icon=None, load_state=None):
+        """
+        Liest den Ordner über den Stat-Cache. load_state liefert das Stat-Manifest des letzten
+        Backups; es wird wie die Ordnergrößen erst im Hintergrund gelesen.
+        """
+        self._generation += 1
+        try:
+            entries = [e for e in self.stat_cache.list_dir(path, restat_files=True)
+                       if not (e.is_dir and is_restore_area(path, e.name))]
+        except OSError:
+            entries = []
+        rows = [{"entry": e, "size": e.size, "mtime": e.mtime, "status": None} for e in entries]
+        self.set_rows(rows, icon)
+        if rows:
+            threading.Thread(target=self._compute, args=(self._generation, path, entries, load_state),
+                             name="save-info", daemon=True).start()
+
+    def clear(self):
+        self._generation += 1
+        super().clear()
+
+    def name(self, index):
+        row = self.row(index)
+        return row["entry"].name if row else None
+
+    def _compute(self, generation, path, entries, load_state):
+        try:
+            state = load_state() if load_state else {}
+        except Exception:
+            state = {}
+        batch = []
+        for row, entry in enumerate(entries):
+            if generation != self._generation:
+                return  # anderes Spiel gewählt
+            info = None
+            if entry.is_dir:
+                info = self.stat_cache.tree_info(os.path.join(path, entry.name))
+                size, mtime = info.size, info.mtime
+            else:
+                size, mtime = entry.size, entry.mtime
+            batch.append((row, size, mtime, backup_status(entry, state, info)))
+            # Ordner einzeln melden (können dauern), Dateien gesammelt
+            if entry.is_dir or len(batch) >= FETCH_BATCH:
+                self._info_ready.emit(generation, batch)
+                batch = []
+        if batch:
+            self._info_ready.emit(generation, batch)
+
+    def _apply_info(self, generation, batch):
+        if generation != self._generation:
+            return
+        for row, size, mtime, status in batch:
+            self._rows[row].update(size=size, mtime=mtime, status=status)
+            self.row_changed(row)
+
+    def data(self, index, role=Qt.DisplayRole):
+        row = self.row(index)
+        if row is None:
+            return None
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return row["entry"].name
+            if column == 1:
+                return "…" if row["size"] is None else format_size(row["size"])
+            if column == 2:
+                return "" if row["mtime"] is None else datetime.datetime.fromtimestamp(row["mtime"]).strftime(TIME_FORMAT)
+            if column == 3:
+                return row["status"] or ""
+        if role == Qt.DecorationRole and column == 0:
+            return self.icon
+        if role == Qt.TextAlignmentRole and column == 1:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role == Qt.ForegroundRole and column == 3:
+            if row["status"] == STATUS_CHANGED:
+                return QColor(Qt.darkYellow)
+            if row["status"] == STATUS_NEW:
+                return QColor(Qt.cyan)
+        return None
+
+
+class BackupListModel(LazyModel):
+    """Backups aus dem Katalog (dicts mit name, note, favorite, ...), neueste zuerst."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._bold = QFont()
+        self._bold.setBold(True)
+        self._favorite_color = QColor(Qt.darkYellow)
+
+    def data(self, index, role=Qt.DisplayRole):
+        backup = self.row(index)
+        if backup is None:
+            return None
+        if role == Qt.DisplayRole:
+            # Favorit: Sternsymbol + gelbe Farbe + fett
+            return f"⭐ {backup['name']}" if backup["favorite"] else backup["name"]
+        if role == Qt.DecorationRole:
+            return self.icon
+        if role == Qt.ToolTipRole:
+            return backup["note"] or None
+        if role == Qt.ForegroundRole and backup["favorite"]:
+            return self._favorite_color
+        if role == Qt.FontRole and backup["favorite"]:
+            return self._bold
+        return None
+
+    def name(self, index):
+        backup = self.row(index)
+        return backup["name"] if backup else None
+
+    def index_of(self, name):
+        """Index des Backups name; lädt Zeilen bei Bedarf nach, damit die View es anzeigen kann."""
+        for row, backup in enumerate(self._rows):
+            if backup["name"] == name:
+                while self._loaded <= row:
+                    self.fetchMore()
+                return self.index(row, 0)
+        return QModelIndex()
+
+    def update_backup(self, name, **changes):
+        """Ändert Felder eines Backups und zeichnet nur dessen Zeile neu."""
+        for row, backup in enumerate(self._rows):
+            if backup["name"] == name:
+                self._rows[row] = dict(backup, **changes)
+                self.row_changed(row)
+                return True
+        return False
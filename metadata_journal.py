@@ -0,0 +1,167 @@
+"""
+Journal für save_paths.json.
+
+Statt bei jeder Notiz/Favoriten-Änderung die ganze Datei neu zu schreiben, wird nur die
+Differenz zum zuletzt gespeicherten Stand als JSON-Zeilen an save_paths.json.journal angehängt:
+    {"op": "set", "path": ["MhRise", "notes", "09.06.2025_18-02-34"], "value": "..."}
+    {"op": "del", "path": ["MhRise", "favorites"]}
+Schreibvorgänge werden kurz gesammelt (FLUSH_DELAY) und mit einem einzigen fsync angehängt.
+Wird das Journal zu groß, wird save_paths.json atomar neu geschrieben (Temp-Datei + os.replace)
+und das Journal geleert. Beim Laden wird die Basisdatei gelesen und das Journal darauf
+angewendet; eine abgeschnittene letzte Zeile (Absturz beim Schreiben) wird verworfen.
+
+GUI und Kommandozeile können gleichzeitig schreiben: Anhängen und Zusammenführen laufen unter
+einer Dateisperre (save_paths.json.lock), und zusammengeführt wird der Stand von der Platte
+(Basis + Journal aller Prozesse), nicht der eigene Stand im Speicher.
+"""
+import os
+import json
+import atexit
+import threading
+
+from backup_store import write_json_atomic
+from app_lock import FileLock
+
+JOURNAL_SUFFIX = ".journal"
+FLUSH_DELAY = 1.0  # Sekunden sammeln, bevor das Journal geschrieben wird
+COMPACT_RECORDS = 500
+COMPACT_BYTES = 256 * 1024
+
+
+def diff_records(old, new, path=()):
+    """Änderungs-Datensätze, die old in new überführen (rekursiv nur für Dicts)."""
+    records = []
+    for key, value in new.items():
+        if key not in old:
+            records.append({"op": "set", "path": list(path) + [key], "value": value})
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            records.extend(diff_records(old[key], value, path + (key,)))
+        elif old[key] != value:
+            records.append({"op": "set", "path": list(path) + [key], "value": value})
+    for key in old:
+        if key not in new:
+            records.append({"op": "del", "path": list(path) + [key]})
+    return records
+
+
+def apply_record(data, record):
+    *parents, key = record["path"]
+    target = data
+    for parent in parents:
+        child = target.get(parent)
+        if not isinstance(child, dict):
+            child = target[parent] = {}
+        target = child
+    if record["op"] == "set":
+        target[key] = record["value"]
+    else:
+        target.pop(key, None)
+
+
+def _copy(data):
+    return json.loads(json.dumps(data))
+
+
+class MetadataJournal:
+    def __init__(self, path, flush_delay=FLUSH_DELAY):
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.flush_delay = flush_delay
+        self._persisted = None  # Stand, der in Basis + Journal steht
+        self._pending = []
+        self._records = 0
+        self._timer = None
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(path + ".lock")
+        atexit.register(self.close)
+
+    def _read(self):
+        """Basis + Journal von der Platte. Gibt (daten, anzahl datensätze, abgeschnitten) zurück."""
+        data = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        records = 0
+        torn = False
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        torn = True  # Absturz mitten im Anhängen: Rest verwerfen
+                        break
+                    apply_record(data, record)
+                    records += 1
+        return data, records, torn
+
+    def load(self):
+        with self._lock:
+            self.flush()  # noch nicht geschriebene Änderungen nicht verlieren
+            with self._file_lock:
+                data, self._records, torn = self._read()
+                self._persisted = _copy(data)
+                self._pending = []
+                if torn:
+                    self.compact()
+            return data
+
+    def save(self, data):
+        """Merkt die Änderungen seit dem letzten Aufruf vor; geschrieben wird verzögert."""
+        with self._lock:
+            if self._persisted is None:
+                self.load()
+            records = diff_records(self._persisted, data)
+            if not records:
+                return
+            self._pending.extend(_copy(records))
+            self._persisted = _copy(data)
+            if self.flush_delay <= 0:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in self._pending)
+            with self._file_lock:
+                with open(self.journal_path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._records += len(self._pending)
+                self._pending = []
+                if self._records >= COMPACT_RECORDS or os.path.getsize(self.journal_path) >= COMPACT_BYTES:
+                    self.compact()
+
+    def compact(self):
+        """
+        Führt Basis und Journal atomar in save_paths.json zusammen und leert das Journal.
+        Gelesen wird unter der Sperre von der Platte, damit Einträge anderer Prozesse erhalten
+        bleiben; der eigene Stand (_persisted) bleibt, wie er ist, damit save() weiter nur die
+        eigenen Änderungen anhängt.
+        """
+        with self._lock, self._file_lock:
+            if self._persisted is None:
+                return
+            data, _, _ = self._read()
+            write_json_atomic(self.path, data)
+            self._records = 0
+            try:
+                os.remove(self.journal_path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        """Beim Beenden: Ausstehendes schreiben und alles in save_paths.json zusammenführen."""
+        with self._lock:
+            self.flush()
+            if self._records or os.path.exists(self.journal_path):
+                self.compact()
@@ -0,0 +1,245 @@
+"""
+Protokoll der Datei-Operationen (Backup, Restore, Löschen, ...) als JSON-Zeilen.
+
+Jede Operation schreibt beim Ende eine Zeile nach operations.log (rotierend, OPS_LOG_MAX_BYTES,
+OPS_LOG_BACKUPS alte Dateien):
+    {"time": ..., "op": "backup", "game": "MhRise", "status": "ok", "duration": 1.23,
+     "bytes": ..., "files": ..., "mb_per_s": ..., "phases": {"scan": 0.01, "copy": 1.1, ...},
+     "errors": 0}
+Phasen werden mit `with timed("copy"):` gemessen, auch tief im Code (Thread-lokal, ohne dass
+die Operation durchgereicht werden muss). Verschachtelte Phasen zählen exklusiv, die Summe
+der Phasen ist also nie größer als die Dauer.
+
+Mit SAVEBACKUP_PROFILE=<op> (oder "all") wird die nächste passende Operation mit cProfile
+aufgezeichnet und nach profiles/<op>-<zeit>.prof geschrieben. Die Kopier-/Hash-Threads von
+copy_engine.run_parallel werden über profile_workers() mit aufgezeichnet (ein Profiler pro
+Thread, am Ende zusammengeführt).
+"""
+import os
+import json
+import time
+import logging
+import datetime
+import threading
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+OPS_LOG = "operations.log"
+OPS_LOG_MAX_BYTES = 1024 * 1024
+OPS_LOG_BACKUPS = 3
+PROFILE_ENV = "SAVEBACKUP_PROFILE"
+PROFILE_DIR = "profiles"
+MAX_ERROR_SAMPLES = 5
+
+_local = threading.local()
+_logger = None
+_logger_lock = threading.Lock()
+_profiled = set()  # pro Prozess nur eine Aufzeichnung je Operation
+
+
+def _get_logger():
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            logger = logging.getLogger("savebackup.ops")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(OPS_LOG, maxBytes=OPS_LOG_MAX_BYTES,
+                                          backupCount=OPS_LOG_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            _logger = logger
+        return _logger
+
+
+class Operation:
+    def __init__(self, name, **fields):
+        self.name = name
+        self.fields = fields
+        self.bytes = 0
+        self.files = 0
+        self.errors = []
+        self.phases = {}
+        self._stack = []  # [(phase, start)]
+        self._profile = None
+        self._worker_profiles = {}  # Thread-ID -> cProfile.Profile der Worker-Threads
+        self._worker_lock = threading.Lock()
+
+    def count(self, bytes_done=0, files_done=0):
+        self.bytes += bytes_done
+        self.files += files_done
+
+    def add_errors(self, errors):
+        """errors: [(pfad, Fehler)] wie von copy_files/create_backup zurückgegeben."""
+        self.errors.extend(errors)
+
+    def enter_phase(self, phase):
+        now = time.perf_counter()
+        if self._stack:
+            outer, start = self._stack[-1]
+            self.phases[outer] = self.phases.get(outer, 0.0) + now - start
+        self._stack.append((phase, now))
+
+    def exit_phase(self):
+        now = time.perf_counter()
+        phase, start = self._stack.pop()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - start
+        if self._stack:
+            self._stack[-1] = (self._stack[-1][0], now)  # äußere Phase läuft weiter
+
+    def _start_profile(self):
+        wanted = os.environ.get(PROFILE_ENV, "")
+        if not wanted or self.name in _profiled or wanted not in ("all", "1", self.name):
+            return
+        import cProfile
+
+        try:
+            profile = cProfile.Profile()
+            profile.enable()
+        except ValueError:
+            return  # anderer Profiler aktiv (parallele Operation)
+        _profiled.add(self.name)
+        self._profile = profile
+
+    def _stop_profile(self):
+        if self._profile is None:
+            return None
+        import pstats
+
+        self._profile.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{self.name}-{datetime.datetime.now():%Y%m%d-%H%M%S}.prof")
+        stats = pstats.Stats(self._profile)
+        with self._worker_lock:
+            for profile in self._worker_profiles.values():
+                stats.add(profile)
+        stats.dump_stats(path)
+        return path
+
+    def _worker_profile(self):
+        import cProfile
+
+        with self._worker_lock:
+            return self._worker_profiles.setdefault(threading.get_ident(), cProfile.Profile())
+
+    def record(self, status, duration, error=None):
+        entry = {
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "op": self.name,
+            **self.fields,
+            "status": status,
+            "duration": round(duration, 4),
+            "bytes": self.bytes,
+            "files": self.files,
+            "mb_per_s": round(self.bytes / 1048576 / duration, 2) if duration > 0 and self.bytes else None,
+            "phases": {phase: round(seconds, 4) for phase, seconds in self.phases.items()},
+            "errors": len(self.errors),
+        }
+        if self.errors:
+            entry["error_samples"] = [f"{path}: {e}" for path, e in self.errors[:MAX_ERROR_SAMPLES]]
+        if error is not None:
+            entry["error"] = f"{type(error).__name__}: {error}"
+        return entry
+
+
+@contextmanager
+def operation(name, progress=None, **fields):
+    """
+    Misst eine Operation im aktuellen Thread und schreibt sie am Ende ins Protokoll.
+    Bytes/Dateien werden am Ende aus progress (backup_store.Progress) übernommen.
+    """
+    op = Operation(name, **fields)
+    outer = getattr(_local, "op", None)
+    _local.op = op
+    op._start_profile()
+    start = time.perf_counter()
+    status, error = "ok", None
+    try:
+        yield op
+    except BaseException as e:
+        # BackupCancelled ohne Import aus copy_engine erkennen (kein Zyklus)
+        status = "cancelled" if type(e).__name__ == "BackupCancelled" else "failed"
+        error = None if status == "cancelled" else e
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        if progress is not None:
+            op.count(progress.bytes_done, progress.files_done)
+        profile_path = op._stop_profile()
+        _local.op = outer
+        entry = op.record(status if status != "ok" or not op.errors else "errors", duration, error)
+        if profile_path:
+            entry["profile"] = profile_path
+        try:
+            _get_logger().info(json.dumps(entry, ensure_ascii=False, default=str))
+        except OSError:
+            pass  # Protokoll ist nie wichtiger als die Operation selbst
+
+
+def log_failure(name, error, **fields):
+    """Schreibt einen Fehler außerhalb einer Operation ins Protokoll (z.B. aus dem Watcher-Thread)."""
+    entry = Operation(name, **fields).record("failed", 0.0, error)
+    try:
+        _get_logger().info(json.dumps(entry, ensure_ascii=False, default=str))
+    except OSError:
+        pass
+
+
+def current():
+    return getattr(_local, "op", None)
+
+
+def profile_workers(func):
+    """
+    Verpackt func für Worker-Threads (run_parallel), damit sie mit aufgezeichnet wird, wenn die
+    Operation dieses Threads gerade profiliert wird. Sonst wird func unverändert zurückgegeben.
+    """
+    op = current()
+    if op is None or op._profile is None:
+        return func
+
+    def profiled(*args, **kwargs):
+        profile = op._worker_profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return func(*args, **kwargs)  # Profiler erfasst schon alle Threads (ab Python 3.12)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+    return profiled
+
+
+@contextmanager
+def timed(phase):
+    """Misst eine Phase der laufenden Operation dieses Threads (ohne Operation: nichts)."""
+    op = current()
+    if op is None:
+        yield
+        return
+    op.enter_phase(phase)
+    try:
+        yield
+    finally:
+        op.exit_phase()
+
+
+def read_recent(limit=100):
+    """Die letzten Einträge (neueste zuerst) aus operations.log und den rotierten Dateien."""
+    entries = []
+    paths = [OPS_LOG] + [f"{OPS_LOG}.{i}" for i in range(1, OPS_LOG_BACKUPS + 1)]
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            continue
+        for line in reversed(lines):
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+            if len(entries) >= limit:
+                return entries
+    return entries
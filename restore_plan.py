@@ -0,0 +1,352 @@
+"""
+Differenzielles Wiederherstellen.
+
+Vor dem Restore wird das Backup mit dem aktuellen Savegame-Ordner verglichen: erst über
+Größe und mtime, nur bei Zweifel über den Hash (bzw. Byte-Vergleich bei alten Ordnerkopien).
+Geschrieben werden danach nur neue und geänderte Dateien - unveränderte behalten ihre mtime,
+was u.a. Steam Cloud nicht unnötig zum Synchronisieren bringt. Im Spiegel-Modus werden
+zusätzlich Dateien gelöscht, die im Backup fehlen (nur innerhalb der gesicherten Ordner).
+
+Geschrieben wird alles-oder-nichts: die Dateien landen zuerst in einem Staging-Ordner neben
+dem Savegame-Ordner (<ordner>.restore, gleiches Dateisystem) und werden erst getauscht, wenn
+alle fehlerfrei geschrieben sind. Der Tausch besteht nur aus os.replace-Aufrufen; die
+ersetzten bzw. gespiegelt entfernten Dateien werden dabei in einen Pre-Restore-Snapshot
+verschoben (nicht kopiert), den undo_restore wieder zurückspielt.
+"""
+import os
+import shutil
+import json
+import hashlib
+import datetime
+
+from copy_engine import DEFAULT_WORKERS, check_cancel, copy_files, make_dirs, run_parallel
+from backup_store import RESTORE_AREA_SUFFIX, is_restore_area, is_store_backup, read_manifest, write_json_atomic
+from backup_archive import archive_path, extract_archive, is_archive_backup, read_index
+from op_log import timed
+
+CHUNK_SIZE = 1024 * 1024
+# Nur Float-Rundung tolerieren; gröbere Zeitstempel (FAT) landen sicher beim Hash-Vergleich
+MTIME_TOLERANCE = 1e-6
+
+STAGING_PREFIX = "staging-"
+SNAPSHOT_PREFIX = "pre-restore-"
+SNAPSHOT_FILE = "snapshot.json"
+SNAPSHOT_FILES = "files"
+KEEP_SNAPSHOTS = 3
+
+
+class RestorePlan:
+    def __init__(self, kind, source, items, dirs, backup=None):
+        self.kind = kind  # "archive", "store" oder "folder"
+        self.source = source  # Archivdatei bzw. Backup-Ordner
+        self.backup = backup  # Name des Backups (für den Snapshot)
+        self.items = items  # gesicherte Namen auf oberster Ebene
+        self.dirs = dirs
+        self.snapshot = None  # Pre-Restore-Snapshot nach apply_plan
+        self.added = []
+        self.changed = []
+        self.unchanged = []
+        self.removed = []  # nur im Spiegel-Modus relevant
+        self.entries = {}  # rel_pfad -> Eintrag aus dem Backup
+
+    @property
+    def to_write(self):
+        return self.added + self.changed
+
+    def write_bytes(self):
+        return sum(self.entries[path]["size"] for path in self.to_write)
+
+    def summary(self):
+        return (f"{len(self.added)} neu, {len(self.changed)} geändert, "
+                f"{len(self.unchanged)} unverändert, {len(self.removed)} nur im Spielordner")
+
+
+def backup_entries(backup_path, store=None):
+    """
+    Gibt (art, quelle, items, dirs, [eintrag]) zurück. Ein Eintrag hat path, size, mtime,
+    hash (None bei alten Ordnerkopien) und src (Blob- bzw. Dateipfad, Liste der Blöcke im
+    Blockmodus, None beim Archiv).
+    """
+    if is_archive_backup(backup_path):
+        path = archive_path(backup_path)
+        index = read_index(path)
+        entries = [dict(e, src=None) for e in index["files"]]
+        return "archive", path, index.get("items", []), index.get("dirs", []), entries
+    if is_store_backup(backup_path):
+        manifest = read_manifest(backup_path)
+        entries = [dict(e, src=store.entry_source(e)) for e in manifest["files"]]
+        return "store", backup_path, manifest.get("items", []), manifest.get("dirs", []), entries
+
+    entries = []
+    dirs = []
+    for root, sub_dirs, files in os.walk(backup_path):
+        rel_root = os.path.relpath(root, backup_path)
+        dirs.extend(os.path.normpath(os.path.join(rel_root, d)).replace(os.sep, "/") for d in sub_dirs)
+        for f in files:
+            abs_path = os.path.join(root, f)
+            st = os.stat(abs_path)
+            entries.append({
+                "path": os.path.normpath(os.path.join(rel_root, f)).replace(os.sep, "/"),
+                "size": st.st_size,
+                "mtime": st.st_mtime,
+                "hash": None,
+                "src": abs_path,
+            })
+    return "folder", backup_path, sorted(os.listdir(backup_path)), dirs, entries
+
+
+def file_hash(path, cancel=None):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            check_cancel(cancel)
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def same_content(path_a, path_b, cancel=None):
+    with open(path_a, "rb") as a, open(path_b, "rb") as b:
+        while True:
+            check_cancel(cancel)
+            chunk_a = a.read(CHUNK_SIZE)
+            if chunk_a != b.read(CHUNK_SIZE):
+                return False
+            if not chunk_a:
+                return True
+
+
+def plan_restore(backup_path, target_root, store=None, paths=None, workers=DEFAULT_WORKERS,
+                 progress=None, cancel=None):
+    """Vergleicht Backup und Savegame-Ordner und erstellt einen RestorePlan."""
+    with timed("scan"):
+        kind, source, items, dirs, entries = backup_entries(backup_path, store)
+    if paths is not None:
+        wanted = set(paths)
+        entries = [e for e in entries if e["path"] in wanted or e["path"].split("/", 1)[0] in wanted]
+        items = [i for i in items if i in wanted]
+        dirs = []
+    plan = RestorePlan(kind, source, items, dirs, os.path.basename(os.path.normpath(backup_path)))
+    plan.entries = {e["path"]: e for e in entries}
+    if progress:
+        progress.total(0, len(entries))
+
+    def classify(entry):
+        check_cancel(cancel)
+        live = os.path.join(target_root, entry["path"])
+        try:
+            st = os.stat(live)
+        except FileNotFoundError:
+            return "added"
+        if st.st_size != entry["size"]:
+            return "changed"
+        if abs(st.st_mtime - entry["mtime"]) <= MTIME_TOLERANCE:
+            return "unchanged"
+        # Gleiche Größe, andere mtime: erst jetzt den Inhalt anschauen
+        if entry["hash"]:
+            return "unchanged" if file_hash(live, cancel) == entry["hash"] else "changed"
+        return "unchanged" if same_content(live, entry["src"], cancel) else "changed"
+
+    def classify_one(entry):
+        state = classify(entry)
+        if progress:
+            progress(0, 1)
+        return state
+
+    with timed("compare"):
+        results, errors = run_parallel(classify_one, entries, workers, cancel)
+    for entry, state in results:
+        getattr(plan, state).append(entry["path"])
+    # Nicht lesbare Live-Dateien sicherheitshalber überschreiben
+    plan.changed.extend(entry["path"] for entry, _ in errors)
+
+    # Spiegel-Kandidaten: nur innerhalb gesicherter Ordner, nie andere Slots im Spielordner
+    for item in items:
+        live_dir = os.path.join(target_root, item)
+        if not os.path.isdir(live_dir):
+            continue
+        for root, dirs, files in os.walk(live_dir):
+            dirs[:] = [d for d in dirs if not is_restore_area(root, d)]  # nie Staging/Snapshots spiegeln
+            rel_root = os.path.relpath(root, target_root)
+            for f in files:
+                rel_path = os.path.normpath(os.path.join(rel_root, f)).replace(os.sep, "/")
+                if rel_path not in plan.entries:
+                    plan.removed.append(rel_path)
+
+    for name in ("added", "changed", "unchanged", "removed"):
+        getattr(plan, name).sort()
+    return plan
+
+
+def without_restore_area(root, names):
+    """
+    Namen im Ordner root ohne Restore-Bereiche: bei Mountpunkten liegt .restore im Savegame-Ordner
+    selbst, sonst <ordner>.restore in dessen übergeordnetem Ordner, der der Pfad eines anderen
+    Spiels sein kann. Beides darf weder gesichert noch überwacht werden.
+    """
+    return [name for name in names if not is_restore_area(root, name)]
+
+
+def restore_area(target_root):
+    """Ordner für Staging und Snapshots; neben dem Savegame-Ordner, damit rename genügt."""
+    target_root = os.path.normpath(os.path.abspath(target_root))
+    try:
+        if os.stat(os.path.dirname(target_root)).st_dev != os.stat(target_root).st_dev:
+            return os.path.join(target_root, RESTORE_AREA_SUFFIX)  # Mountpunkt: nur innen gleiches FS
+    except FileNotFoundError:
+        pass
+    return target_root + RESTORE_AREA_SUFFIX
+
+
+def _move(src, dst):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    os.replace(src, dst)
+
+
+def _write_staging(plan, staging, workers, progress, cancel):
+    if plan.kind == "archive":
+        if not plan.to_write:
+            return []
+        return extract_archive(plan.source, staging, plan.to_write, cancel=cancel,
+                               progress=_NoTotal(progress) if progress else None)
+    jobs = []
+    for path in plan.to_write:
+        entry = plan.entries[path]
+        # Ordnerkopien: Metadaten wie copy2 übernehmen, Blobs: mtime aus dem Manifest
+        mtime = None if plan.kind == "folder" else entry["mtime"]
+        jobs.append((entry["src"], os.path.join(staging, path), mtime))
+    return copy_files(jobs, workers, progress, cancel)
+
+
+def _swap(plan, target_root, staging, snapshot, removed):
+    """Nur Umbenennungen: Live-Dateien in den Snapshot, dann Staging-Dateien an ihre Stelle."""
+    replaced = [path for path in plan.to_write if os.path.lexists(os.path.join(target_root, path))]
+    replaced_set = set(replaced)
+    os.makedirs(snapshot)
+    # Vor dem ersten rename schreiben, damit undo_restore auch nach einem Absturz mitten im Tausch geht
+    write_json_atomic(os.path.join(snapshot, SNAPSHOT_FILE), {
+        "backup": plan.backup,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "replaced": replaced,
+        "added": [path for path in plan.to_write if path not in replaced_set],
+        "removed": list(removed),
+    })
+    files = os.path.join(snapshot, SNAPSHOT_FILES)
+    done = []  # [(von, nach)] zum Zurückrollen
+    try:
+        for path in list(removed) + replaced:
+            _move(os.path.join(target_root, path), os.path.join(files, path))
+            done.append((os.path.join(target_root, path), os.path.join(files, path)))
+        for path in plan.to_write:
+            _move(os.path.join(staging, path), os.path.join(target_root, path))
+            done.append((os.path.join(staging, path), os.path.join(target_root, path)))
+    except BaseException:
+        for src, dst in reversed(done):
+            os.replace(dst, src)
+        shutil.rmtree(snapshot, ignore_errors=True)
+        raise
+
+
+def apply_plan(plan, target_root, mirror=False, workers=DEFAULT_WORKERS, progress=None, cancel=None,
+               keep_snapshots=KEEP_SNAPSHOTS):
+    """
+    Schreibt neue/geänderte Dateien (mit mirror: entfernt überzählige) alles-oder-nichts über
+    einen Staging-Ordner. Gibt es beim Schreiben Fehler, bleibt der Spielordner unverändert und
+    die Fehler [(pfad, Fehler)] werden zurückgegeben. Sonst steht der Pre-Restore-Snapshot
+    danach in plan.snapshot (None, wenn nichts zu tun war).
+    """
+    plan.snapshot = None
+    removed = plan.removed if mirror else []
+    if progress:
+        progress.total(plan.write_bytes(), len(plan.to_write))
+    os.makedirs(target_root, exist_ok=True)
+    make_dirs(os.path.join(target_root, d) for d in plan.dirs)
+    if not plan.to_write and not removed:
+        return []
+
+    area = restore_area(target_root)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    staging = os.path.join(area, STAGING_PREFIX + stamp)
+    os.makedirs(staging)
+    try:
+        with timed("copy"):
+            errors = _write_staging(plan, staging, workers, progress, cancel)
+        if errors:
+            # Fehler mit den Pfaden im Spielordner melden, nicht mit denen im Staging-Ordner
+            prefix = os.path.join(staging, "")
+            return [(os.path.join(target_root, path[len(prefix):]) if path.startswith(prefix) else path, e)
+                    for path, e in errors]
+        check_cancel(cancel)
+        snapshot = os.path.join(area, SNAPSHOT_PREFIX + stamp)
+        with timed("swap"):
+            _swap(plan, target_root, staging, snapshot, removed)
+        plan.snapshot = snapshot
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+        prune_snapshots(target_root, keep_snapshots)  # räumt auch den leeren Bereich weg
+    return []
+
+
+def list_snapshots(target_root):
+    """Pre-Restore-Snapshots des Savegame-Ordners, neueste zuerst: [(pfad, info)]."""
+    area = restore_area(target_root)
+    try:
+        names = sorted((n for n in os.listdir(area) if n.startswith(SNAPSHOT_PREFIX)), reverse=True)
+    except FileNotFoundError:
+        return []
+    snapshots = []
+    for name in names:
+        path = os.path.join(area, name)
+        try:
+            with open(os.path.join(path, SNAPSHOT_FILE), "r", encoding="utf-8") as f:
+                snapshots.append((path, json.load(f)))
+        except (OSError, ValueError):
+            continue  # unvollständig (Absturz vor dem Tausch)
+    return snapshots
+
+
+def prune_snapshots(target_root, keep=KEEP_SNAPSHOTS):
+    for path, _ in list_snapshots(target_root)[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+    _remove_empty_area(target_root)
+
+
+def _remove_empty_area(target_root):
+    """Restore-Bereich ohne Snapshots/Staging nicht liegen lassen."""
+    try:
+        os.rmdir(restore_area(target_root))
+    except OSError:
+        pass  # fehlt oder nicht leer
+
+
+def undo_restore(target_root, snapshot):
+    """
+    Spielt einen Pre-Restore-Snapshot zurück (nur Umbenennungen): durch den Restore neu
+    angelegte Dateien werden gelöscht, ersetzte und gespiegelt entfernte zurückverschoben.
+    Gibt die Snapshot-Info zurück.
+    """
+    with open(os.path.join(snapshot, SNAPSHOT_FILE), "r", encoding="utf-8") as f:
+        info = json.load(f)
+    files = os.path.join(snapshot, SNAPSHOT_FILES)
+    for path in info["added"]:
+        try:
+            os.remove(os.path.join(target_root, path))
+        except FileNotFoundError:
+            pass
+    for path in info["replaced"] + info["removed"]:
+        if os.path.lexists(os.path.join(files, path)):
+            _move(os.path.join(files, path), os.path.join(target_root, path))
+    shutil.rmtree(snapshot)
+    _remove_empty_area(target_root)
+    return info
+
+
+class _NoTotal:
+    """Reicht Fortschritt durch, ignoriert aber die zweite Gesamtmengen-Meldung von extract_archive."""
+    def __init__(self, progress):
+        self.progress = progress
+
+    def total(self, bytes_total, files_total):
+        pass
+
+    def __call__(self, bytes_done, files_done):
+        self.progress(bytes_done, files_done)
@@ -0,0 +1,55 @@
+"""
+Aufbewahrungsregeln (Retention) für Backups.
+
+Die Regel steht pro Spiel in save_paths.json, z.B.
+    "retention": {"keep_last": 10, "hourly": 24, "daily": 7, "weekly": 4, "keep_favorites": true}
+
+keep_last behält die N neuesten Backups, hourly/daily/weekly jeweils das neueste Backup der
+letzten N Stunden/Tage/Wochen, in denen es Backups gibt. Favoriten bleiben immer erhalten
+(außer keep_favorites ist false). Berechnet wird nur aus den Katalog-Daten (Name, Erstellzeit,
+Favorit) - die Backup-Ordner selbst werden dafür nicht gelesen.
+"""
+import datetime
+
+TIERS = (
+    ("hourly", "%Y-%m-%d %H"),
+    ("daily", "%Y-%m-%d"),
+    ("weekly", "%G-W%V"),
+)
+POLICY_KEYS = ("keep_last",) + tuple(tier for tier, _ in TIERS)
+
+
+def has_policy(policy):
+    return bool(policy) and any(policy.get(key) for key in POLICY_KEYS)
+
+
+def select_prune(backups, policy):
+    """
+    backups: Katalog-Zeilen (name, created, favorite). Gibt die Namen zurück, die gelöscht
+    werden dürfen. Ohne Regel wird nichts gelöscht, das neueste Backup bleibt immer.
+    """
+    if not has_policy(policy):
+        return []
+    backups = sorted(backups, key=lambda b: b["created"], reverse=True)
+    keep = set()
+    if backups:
+        keep.add(backups[0]["name"])
+    if policy.get("keep_favorites", True):
+        keep.update(b["name"] for b in backups if b["favorite"])
+    keep.update(b["name"] for b in backups[:policy.get("keep_last", 0)])
+
+    for tier, fmt in TIERS:
+        limit = policy.get(tier, 0)
+        if not limit:
+            continue
+        buckets = set()
+        for b in backups:
+            key = datetime.datetime.fromtimestamp(b["created"]).strftime(fmt)
+            if key in buckets:
+                continue
+            if len(buckets) >= limit:
+                break
+            buckets.add(key)
+            keep.add(b["name"])  # neuestes Backup dieses Zeitraums
+
+    return [b["name"] for b in backups if b["name"] not in keep]
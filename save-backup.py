@@ -1,104 +1,134 @@
+import time
+_START_TIME = time.perf_counter()  # für die Messung Kaltstart -> erstes Zeichnen
+
 import os
-import json
+import sys
 import shutil
 import datetime
-import subprocess
-import requests
+import threading
 from PyQt5 import sip
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout,
     QListWidget, QPushButton, QFileDialog, QComboBox,
-    QLabel, QListWidgetItem, QInputDialog, QMessageBox,
+    QLabel, QInputDialog, QMessageBox,
     QMenu
 )
 from PyQt5.QtGui import QIcon
-from PyQt5.QtCore import QSize, Qt, QPoint
+from PyQt5.QtCore import QSize, Qt, QPoint, QTimer, pyqtSignal
 from PyQt5.QtWidgets import (
-    QGroupBox, QSizePolicy, QScrollArea, QAbstractItemView
+    QGroupBox, QSizePolicy, QScrollArea, QAbstractItemView, QProgressBar, QListView, QTreeView, QHeaderView,
+    QDialog, QDialogButtonBox, QFormLayout, QSpinBox, QCheckBox, QTableWidget, QTableWidgetItem,
+    QLineEdit
 )
+import backup_core
+from backup_core import ICON_DIR, BackupCore, new_backup_name
+from restore_plan import backup_entries
+from backup_jobs import Job, JobQueue
+from settings import load_settings
+from update_check import UpdateCheck, read_local_version
+from save_watcher import DEFAULT_DEBOUNCE, SaveWatcher
+from list_models import BackupListModel, IconCache, SaveFileModel
+from stat_cache import StatCache
+import op_log
+from app_lock import AppLock
+from copy_engine import copy2
 
 __version__ = "1.0.0"  # aktuelle Script-Version
 
-SAVE_FILE = "save_paths.json"
-BACKUP_DIR = "Backups"
-ICON_DIR = "icons"
+STARTUP_LOG = "startup_times.log"
+APP_LOCK_TIMEOUT = 5  # Sekunden: beim Neustart nach einem Update gibt die alte Instanz die Sperre gerade frei
+AUTO_BACKUP_MERGE_MS = 1000  # so lange auf Meldungen weiterer Spiele mit demselben Ordner warten
 
 class BackupApp(QWidget):
-    def __init__(self):
+    # Vom Watcher-Thread gesendet: Spiel, Änderungen, Snapshot (für watcher.confirm)
+    auto_backup_requested = pyqtSignal(str, object, object)
+
+    def __init__(self, app_lock):
         super().__init__()
         self.setWindowTitle("Savegame Backup Tool")
         self.setWindowIcon(QIcon("icons/saveicon.png"))
         self.setGeometry(100, 100, 800, 400)
 
+        # Gesperrt, solange die App läuft (siehe __main__); der Updater wartet beim Update auf die Freigabe
+        self.app_lock = app_lock
+
         self.savegames = self.load_savegames()
         self.selected_game = None
+        self.settings = load_settings()
+        self.core = BackupCore(self.savegames, self.settings)
+        self.store = self.core.store
+        self.catalog = self.core.catalog
+        self.icons = IconCache()
+        self.stat_cache = StatCache()
+        self.jobs = JobQueue(self)
+        self.jobs.signals.progress.connect(self.on_job_progress)
+        self.jobs.changed.connect(self.update_job_status)
+        self.jobs.on_error = self.on_job_error
+        self.auto_backups = {}  # backup_key -> noch nicht gestartetes Auto-Backup (siehe auto_backup)
+        self.auto_lock = threading.Lock()  # started wird im Job-Thread gesetzt
+
+        # Automatische Backups für Spiele mit "watch": true
+        self.watcher = SaveWatcher(self.auto_backup_requested.emit)
+        self.auto_backup_requested.connect(self.auto_backup)
+        self.update_watches()
+        self.watcher.start()
 
         self.setup_ui()
         self.save_list.setContextMenuPolicy(Qt.CustomContextMenu)
         self.save_list.customContextMenuRequested.connect(self.savefile_context_menu)
 
-        # Versionscheck beim Start
-        self.check_for_update()
+        # Versionscheck läuft im Hintergrund, erst wenn die Event-Loop steht
+        self.startup_ms = None
+        self.update_check = UpdateCheck(read_local_version(__version__), self)
+        self.update_check.update_available.connect(self.on_update_available)
+        QTimer.singleShot(0, self.update_check.start)
 
-    def check_for_update(self):
-        """
-        Vergleicht lokale version.txt (optional) und Online-Version auf GitHub.
-        Wenn Update verfügbar: fragt Benutzer.
-        Startet updater.exe bei Zustimmung und beendet Programm.
-        """
-        local_version = __version__
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.startup_ms is None:
+            self.startup_ms = (time.perf_counter() - _START_TIME) * 1000
+            self.log_startup_time()
 
-        # Versuch, lokale version.txt zu lesen, falls vorhanden
-        local_version_file = "version.txt"
-        if os.path.exists(local_version_file):
-            try:
-                with open(local_version_file, "r", encoding="utf-8") as f:
-                    local_version = f.read().strip()
-            except Exception:
-                pass  # fallback auf __version__
-
-        # Online-Version von GitHub holen
-        github_version_url = 'https://raw.githubusercontent.com/Verestrasz2/SaveFile-Backup-Tool/master/version.txt'
+    def log_startup_time(self):
+        """Hängt die Zeit vom Kaltstart bis zum ersten Zeichnen an STARTUP_LOG an."""
         try:
-            resp = requests.get(github_version_url, timeout=5)
-            if resp.status_code == 200:
-                online_version = resp.text.strip()
-                if self.is_newer_version(online_version, local_version):
-                    # Frage zum Update
-                    res = QMessageBox.question(
-                        self,
-                        "Update verfügbar",
-                        f"Eine neue Version {online_version} ist verfügbar.\n"
-                        f"Du hast Version {local_version}.\n"
-                        "Möchtest du jetzt updaten?",
-                        QMessageBox.Yes | QMessageBox.No
-                    )
-                    if res == QMessageBox.Yes:
-                        self.run_updater()
-        except Exception:
-            # Online-Version nicht erreichbar - ignoriere
+            with open(STARTUP_LOG, "a", encoding="utf-8") as f:
+                f.write(f"{datetime.datetime.now().isoformat(timespec='seconds')}\t"
+                        f"{__version__}\t{self.startup_ms:.1f}\n")
+        except OSError:
             pass
 
-    def is_newer_version(self, online, local):
-        """Vergleicht Versionsstrings, Return True wenn online > local"""
-        def to_tuple(v):
-            return tuple(int(x) for x in v.split(".") if x.isdigit())
-        try:
-            return to_tuple(online) > to_tuple(local)
-        except Exception:
-            return False
+    def on_update_available(self, online_version, local_version):
+        """
+        Wird vom Versionscheck gemeldet, wenn online eine neuere Version liegt.
+        Fragt Benutzer, startet updater.exe bei Zustimmung und beendet Programm.
+        """
+        res = QMessageBox.question(
+            self,
+            "Update verfügbar",
+            f"Eine neue Version {online_version} ist verfügbar.\n"
+            f"Du hast Version {local_version}.\n"
+            "Möchtest du jetzt updaten?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if res == QMessageBox.Yes:
+            self.run_updater()
 
     def run_updater(self):
         """
-        Startet updater.exe und beendet das Hauptprogramm.
+        Startet updater.exe mit PID und Lockdatei und beendet das Hauptprogramm.
+        Der Updater lädt sofort und tauscht die exe, sobald die Sperre in closeEvent frei wird.
         """
+        import subprocess  # nur für den Updater gebraucht
+
         updater_path = "updater.exe"  # Pfad zur updater.exe, ggf. anpassen
         try:
-            subprocess.Popen([updater_path])
+            subprocess.Popen([updater_path, "--pid", str(os.getpid()),
+                              "--lock", os.path.abspath(self.app_lock.path)])
         except Exception as e:
             QMessageBox.warning(self, "Update-Fehler", f"Updater konnte nicht gestartet werden:\n{e}")
             return
-        QApplication.quit()
+        self.close()  # über closeEvent: Jobs abbrechen, Daten schreiben, Sperre freigeben
 
     def setup_ui(self):
         self.setMinimumSize(900, 500)
@@ -119,7 +149,7 @@ class BackupApp(QWidget):
             QPushButton:hover {
                 background-color: #4e5254;
             }
-            QComboBox, QListWidget {
+            QComboBox, QListWidget, QListView, QTreeView {
                 background-color: #3c3f41;
                 border: 1px solid #555;
             }
@@ -148,8 +178,12 @@ class BackupApp(QWidget):
         self.help_btn.clicked.connect(self.show_help_dialog)
         self.add_ext_save_btn = QPushButton("+ Add ext. Save")
         self.add_ext_save_btn.clicked.connect(self.add_external_save_files)
+        self.history_btn = QPushButton("Verlauf")
+        self.history_btn.setToolTip("Letzte Operationen mit Dauer und Durchsatz")
+        self.history_btn.clicked.connect(self.show_operations_dialog)
         top_layout.addWidget(self.help_btn)
         top_layout.addWidget(self.add_ext_save_btn)
+        top_layout.addWidget(self.history_btn)
         # Neuer Button: Externe Saves hinzufügen
 
 
@@ -170,9 +204,18 @@ class BackupApp(QWidget):
         save_group = QGroupBox("Savegame Files")
         save_layout = QVBoxLayout()
 
-        self.save_list = QListWidget()
+        self.save_model = SaveFileModel(self.stat_cache, self)
+        self.save_list = QTreeView()
+        self.save_list.setModel(self.save_model)
+        self.save_list.setRootIsDecorated(False)
+        self.save_list.setUniformRowHeights(True)
         self.save_list.setIconSize(QSize(32, 32))
-        self.save_list.setSelectionMode(QListWidget.ExtendedSelection)
+        header = self.save_list.header()
+        header.setStretchLastSection(False)
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        for column in (1, 2, 3):
+            header.setSectionResizeMode(column, QHeaderView.ResizeToContents)
+        self.save_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.save_list.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
         save_layout.addWidget(self.save_list)
 
@@ -198,19 +241,42 @@ class BackupApp(QWidget):
         backup_group = QGroupBox("Backups")
         backup_layout = QVBoxLayout()
 
-        self.backup_list = QListWidget()
+        self.backup_model = BackupListModel(self)
+        self.backup_list = QListView()
+        self.backup_list.setModel(self.backup_model)
+        self.backup_list.setUniformItemSizes(True)
         self.backup_list.setIconSize(QSize(32, 32))
-        self.backup_list.setSelectionMode(QListWidget.SingleSelection)
+        self.backup_list.setSelectionMode(QAbstractItemView.SingleSelection)
         self.backup_list.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
         self.backup_list.setContextMenuPolicy(Qt.CustomContextMenu)
         self.backup_list.customContextMenuRequested.connect(self.backup_context_menu)
-        self.backup_list.itemDoubleClicked.connect(self.edit_note)
+        self.backup_list.doubleClicked.connect(self.edit_note)
+
+        self.file_search = QLineEdit()
+        self.file_search.setPlaceholderText("🔎 Datei in Backups suchen (Enter)")
+        self.file_search.setClearButtonEnabled(True)
+        self.file_search.returnPressed.connect(self.search_backups)
 
+        backup_layout.addWidget(self.file_search)
         backup_layout.addWidget(self.backup_list)
         backup_group.setLayout(backup_layout)
         list_layout.addWidget(backup_group, 4)
 
         main_layout.addLayout(list_layout)
+
+        # Fortschritt der Hintergrund-Jobs
+        job_layout = QHBoxLayout()
+        self.job_label = QLabel("")
+        self.job_progress = QProgressBar()
+        self.job_progress.setTextVisible(True)
+        self.job_cancel_btn = QPushButton("Abbrechen")
+        self.job_cancel_btn.clicked.connect(self.jobs.cancel_current)
+        job_layout.addWidget(self.job_label, 2)
+        job_layout.addWidget(self.job_progress, 3)
+        job_layout.addWidget(self.job_cancel_btn)
+        main_layout.addLayout(job_layout)
+        self.update_job_status()
+
         self.setLayout(main_layout)
 
         self.refresh_game_dropdown()
@@ -245,6 +311,8 @@ class BackupApp(QWidget):
         target_dir = self.savegames[self.selected_game]["path"]
         added_count = 0
 
+        # Erst alle Rückfragen, damit die Messung nur das Kopieren enthält
+        copies = []
         for file_path in files:
             filename = os.path.basename(file_path)
             target_path = os.path.join(target_dir, filename)
@@ -258,12 +326,21 @@ class BackupApp(QWidget):
                 )
                 if reply != QMessageBox.Yes:
                     continue
+            copies.append((file_path, target_path))
 
-            try:
-                shutil.copy2(file_path, target_path)
-                added_count += 1
-            except Exception as e:
-                QMessageBox.warning(self, "Fehler", f"Konnte {filename} nicht kopieren: {e}")
+        failed = []
+        with op_log.operation("add_external", game=self.selected_game) as op:
+            for file_path, target_path in copies:
+                try:
+                    with op_log.timed("copy"):
+                        copy2(file_path, target_path)
+                    op.count(os.path.getsize(target_path), 1)
+                    added_count += 1
+                except Exception as e:
+                    failed.append((file_path, e))
+            op.add_errors(failed)
+        for file_path, e in failed:
+            QMessageBox.warning(self, "Fehler", f"Konnte {os.path.basename(file_path)} nicht kopieren: {e}")
 
         if added_count:
             QMessageBox.information(self, "Dateien hinzugefügt", f"{added_count} Datei(en) wurden erfolgreich kopiert.")
@@ -302,6 +379,14 @@ class BackupApp(QWidget):
 
         action_icon = menu.addAction("🖼 Icon ändern")
         action_path = menu.addAction("📁 Pfad ändern")
+        watching = self.savegames[self.selected_game].get("watch", False)
+        action_watch = menu.addAction("👁 Auto-Backup ausschalten" if watching else "👁 Auto-Backup einschalten")
+        action_retention = menu.addAction("🗂 Aufbewahrung festlegen")
+        action_prune = menu.addAction("🧹 Alte Backups aufräumen")
+        action_verify = menu.addAction("🔍 Backups prüfen")
+        action_verify_all = menu.addAction("🔍 Backups aller Spiele prüfen")
+        action_undo_restore = menu.addAction("↩ Letzten Restore rückgängig machen")
+        action_undo_restore.setEnabled(bool(self.core.restore_snapshots(self.selected_game)))
         action_delete = menu.addAction("🗑 Spiel löschen")
 
         action = menu.exec_(self.edit_game_btn.mapToGlobal(self.edit_game_btn.rect().bottomLeft()))
@@ -320,25 +405,60 @@ class BackupApp(QWidget):
             new_path = QFileDialog.getExistingDirectory(self, "Neuer Savegame-Pfad")
             if new_path:
                 self.savegames[game]["path"] = new_path
+                self.store.drop_state(game)  # Stat-Manifest gehört zum alten Pfad
                 self.save_savegames()
+                self.update_watches()
                 self.refresh_lists()
 
+        elif action == action_watch:
+            self.savegames[game]["watch"] = not watching
+            self.save_savegames()
+            self.update_watches()
+
+        elif action == action_retention:
+            policy = self.edit_retention(game)
+            if policy is not None:
+                self.savegames[game]["retention"] = policy
+                self.save_savegames()
+
+        elif action == action_prune:
+            names = self.core.retention_candidates(game)
+            if not self.savegames[game].get("retention"):
+                QMessageBox.information(self, "Keine Regel", "Bitte zuerst eine Aufbewahrung festlegen.")
+            elif not names:
+                QMessageBox.information(self, "Nichts zu tun", "Es gibt keine Backups, die gelöscht werden müssten.")
+            else:
+                confirm = QMessageBox.question(self, "Aufräumen bestätigen",
+                                               f"{len(names)} alte(s) Backup(s) von {game} löschen?\n\n"
+                                               + "\n".join(names[:20]) + ("\n..." if len(names) > 20 else ""),
+                                               QMessageBox.Yes | QMessageBox.No)
+                if confirm == QMessageBox.Yes:
+                    self.start_prune(game, names)
+
+        elif action == action_verify:
+            self.start_verify(self.core.verify_targets([game]), game)
+
+        elif action == action_verify_all:
+            self.start_verify(self.core.verify_targets(), "alle Spiele")
+
+        elif action == action_undo_restore:
+            self.confirm_undo_restore(game)
+
         elif action == action_delete:
             confirm = QMessageBox.question(self, "Löschen bestätigen", f"{game} wirklich löschen?", QMessageBox.Yes | QMessageBox.No)
             if confirm == QMessageBox.Yes:
                 self.savegames.pop(game)
                 # Backup-Ordner löschen
-                backup_path = os.path.join(BACKUP_DIR, game)
-                if os.path.exists(backup_path):
-                    try:
-                        shutil.rmtree(backup_path)
-                    except Exception as e:
-                        QMessageBox.warning(self, "Fehler", f"Backup-Ordner konnte nicht gelöscht werden:\n{e}")
+                try:
+                    self.core.delete_game_backups(game)
+                except Exception as e:
+                    QMessageBox.warning(self, "Fehler", f"Backup-Ordner konnte nicht gelöscht werden:\n{e}")
+                self.watcher.unwatch(game)
 
                 self.save_savegames()
                 self.refresh_game_dropdown()
-                self.save_list.clear()
-                self.backup_list.clear()
+                self.save_model.clear()
+                self.backup_model.clear()
                 self.selected_game = None
 
     def change_game(self, index):
@@ -353,62 +473,33 @@ class BackupApp(QWidget):
         self.game_dropdown.addItems(self.savegames.keys())
 
     def refresh_lists(self):
-        self.save_list.clear()
-        self.backup_list.clear()
         if not self.selected_game:
+            self.save_model.clear()
+            self.backup_model.clear()
             return
 
         data = self.savegames[self.selected_game]
         path = data["path"]
-        icon_path = data.get("icon", "")
-        icon = QIcon(icon_path) if os.path.exists(icon_path) else QIcon()
-
-        # Savegames anzeigen (Dateien/Ordner im Savegame-Ordner)
-        if os.path.exists(path):
-            for fname in os.listdir(path):
-                item = QListWidgetItem(fname)
-                item.setIcon(icon)
-                self.save_list.addItem(item)
-
-        # Backups sortiert anzeigen
-        b_path = os.path.join(BACKUP_DIR, self.selected_game)
-        if os.path.exists(b_path):
-            backups = os.listdir(b_path)
-
-            def parse_date(name):
-                try:
-                    return datetime.datetime.strptime(name, "%d.%m.%Y_%H-%M-%S")
-                except ValueError:
-                    return datetime.datetime.min
-
-            backups.sort(key=parse_date, reverse=True)  # Neueste zuerst
-
-            notes = self.savegames[self.selected_game].get("notes", {})
-            favorites = self.savegames[self.selected_game].get("favorites", {})
-
-            for date in backups:
-                item = QListWidgetItem(date)
-                item.setIcon(icon)
+        icon = self.icons.icon(data.get("icon", ""))
 
-                # Tooltip mit Notiz anzeigen, falls vorhanden
-                if note := notes.get(date):
-                    item.setToolTip(note)
+        # Savegames anzeigen (Dateien/Ordner im Savegame-Ordner), Zeilen werden beim Scrollen nachgeladen;
+        # Ordnergrößen und "geändert seit dem letzten Backup" kommen im Hintergrund dazu
+        game = self.selected_game
+        self.save_model.load(path, icon, lambda: self.store.load_state(game))
 
-                # Falls Favorit: Sternsymbol + gelbe Farbe + fett
-                if date in favorites:
-                    item.setText(f"⭐ {date}")
-                    item.setForeground(Qt.darkYellow)
-                    font = item.font()
-                    font.setBold(True)
-                    item.setFont(font)
+        # Backups sortiert anzeigen (Neueste zuerst) - kommt aus dem Katalog, der Ordner wird
+        # nur neu eingelesen, wenn sich seine mtime seit dem letzten Abgleich geändert hat
+        self.catalog.ensure_synced(self.selected_game, data.get("notes", {}), data.get("favorites", []))
+        self.backup_model.set_rows(self.catalog.list_backups(self.selected_game), icon)
 
-                self.backup_list.addItem(item)
+    def selected_save_names(self):
+        return [self.save_model.name(index) for index in self.save_list.selectionModel().selectedRows()]
 
     def backup_savegame(self):
         if not self.selected_game:
             return
 
-        selected_files = self.save_list.selectedItems()
+        selected_files = self.selected_save_names()
         if not selected_files:
             QMessageBox.warning(self, "Keine Dateien ausgewählt", "Bitte wähle mindestens eine Datei links aus.")
             return
@@ -418,78 +509,418 @@ class BackupApp(QWidget):
             QMessageBox.warning(self, "Pfad nicht gefunden", "Savegame-Pfad existiert nicht.")
             return
 
-        now = datetime.datetime.now().strftime("%d.%m.%Y_%H-%M-%S")
-        dst = os.path.join(BACKUP_DIR, self.selected_game, now)
-        os.makedirs(dst, exist_ok=True)
+        self.start_backup(self.selected_game, selected_files)
 
-        copied_files = []
+    def start_backup(self, game, names, note_title="Backed up files:"):
+        """Reiht ein Backup der Namen ein (Auto-Backups siehe start_auto_backup)."""
+        now = new_backup_name()
 
-        for item in selected_files:
-            filename = item.text()
-            src_file = os.path.join(src_path, filename)
-            dst_file = os.path.join(dst, filename)
+        def work(progress, cancel):
+            return self.core.run_backup(game, names, now, progress, cancel)
 
-            try:
-                if os.path.isfile(src_file):
-                    shutil.copy2(src_file, dst_file)
-                elif os.path.isdir(src_file):
-                    shutil.copytree(src_file, dst_file)
-                copied_files.append(filename)  # Datei wurde kopiert
-            except Exception as e:
-                QMessageBox.warning(self, "Fehler", f"Fehler beim Kopieren von {filename}: {e}")
+        def done(result):
+            copied_files, errors = result
+            self.show_error_report("Fehler beim Kopieren", errors)
 
-        # Speichere die Liste der Dateien als Notiz zum Backup
-        notes = self.savegames[self.selected_game].setdefault("notes", {})
-        notes[now] = "Backed up files:\n" + "\n".join(copied_files)
-        self.savegames[self.selected_game].setdefault("favorites", [])
-        self.save_savegames()
+            # Speichere die Liste der Dateien als Notiz zum Backup
+            self.core.record_backup(game, now, copied_files, note_title)
 
-        QMessageBox.information(self, "Backup erstellt", f"Backup mit {len(copied_files)} Datei(en) wurde erstellt.")
-        self.refresh_lists()
+            QMessageBox.information(self, "Backup erstellt", f"Backup mit {len(copied_files)} Datei(en) wurde erstellt.")
+            if game == self.selected_game:
+                self.refresh_lists()
+            self.apply_retention(game)
+
+        self.jobs.submit(Job(f"Backup {game}", work, done, self.on_job_cancelled))
+
+    def apply_retention(self, game):
+        """Nach einem Backup die Aufbewahrungsregel des Spiels still im Hintergrund anwenden."""
+        names = self.core.retention_candidates(game)
+        if names:
+            self.start_prune(game, names, quiet=True)
+
+    def start_prune(self, game, names, quiet=False):
+        """Löscht Backups stapelweise im Hintergrund; Notizen/Favoriten danach in einem Schritt."""
+        def work(progress, cancel):
+            return self.core.prune_backups(game, names, progress, cancel)
+
+        def done(result):
+            deleted, errors = result
+            self.core.forget_backups(game, deleted)
+            self.show_error_report("Fehler beim Löschen", errors)
+            if quiet:
+                self.job_label.setText(f"{len(deleted)} alte(s) Backup(s) von {game} gelöscht")
+            if game == self.selected_game:
+                self.refresh_lists()
+
+        self.jobs.submit(Job(f"Backups löschen {game}", work, done, None if quiet else self.on_job_cancelled))
+
+    def start_verify(self, targets, title):
+        """Prüft Backups im Hintergrund und zeigt beschädigte/fehlende Dateien an."""
+        def work(progress, cancel):
+            return self.core.verify_backups(targets, progress, cancel)
+
+        def done(report):
+            box = QMessageBox(self)
+            box.setWindowTitle("Prüfung abgeschlossen")
+            box.setIcon(QMessageBox.Information if report.ok else QMessageBox.Warning)
+            box.setText(f"Prüfung ({title}):\n{report.summary()}")
+            details = [f"{game}/{name}: {path or '-'}: {problem}" for game, name, path, problem in report.problems]
+            details += [f"{game}/{name}: keine Prüfsummen (alte Ordnerkopie)" for game, name in report.unverifiable]
+            if details:
+                box.setDetailedText("\n".join(details))
+            box.exec_()
+
+        self.jobs.submit(Job(f"Prüfen {title}", work, done, self.on_job_cancelled))
+
+    def show_operations_dialog(self):
+        """Die letzten Einträge aus operations.log (neueste zuerst)."""
+        entries = op_log.read_recent()
+        columns = ("Zeit", "Operation", "Spiel", "Status", "Dauer", "Daten", "MB/s", "Dateien", "Phasen", "Fehler")
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Letzte Operationen")
+        dialog.resize(900, 400)
+        layout = QVBoxLayout(dialog)
+        table = QTableWidget(len(entries), len(columns))
+        table.setHorizontalHeaderLabels(columns)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+        for row, entry in enumerate(entries):
+            phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in entry.get("phases", {}).items())
+            values = (
+                entry.get("time", "").replace("T", " "),
+                entry.get("op", ""),
+                entry.get("game", ""),
+                entry.get("status", ""),
+                f"{entry.get('duration', 0):.2f}s",
+                backup_core.format_size(entry.get("bytes", 0)),
+                "" if entry.get("mb_per_s") is None else f"{entry['mb_per_s']:.1f}",
+                str(entry.get("files", 0)),
+                phases,
+                str(entry.get("errors", 0)),
+            )
+            tooltip = "\n".join(entry.get("error_samples", []) + ([entry["error"]] if "error" in entry else []))
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if tooltip:
+                    item.setToolTip(tooltip)
+                table.setItem(row, column, item)
+        table.resizeColumnsToContents()
+        table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(QLabel(f"Protokoll: {os.path.abspath(op_log.OPS_LOG)}"
+                                if entries else "Noch keine Operationen protokolliert."))
+        layout.addWidget(table)
+        buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        dialog.exec_()
+
+    def edit_retention(self, game):
+        """Dialog für die Aufbewahrungsregel. Gibt die neue Regel oder None (Abbruch) zurück."""
+        policy = self.savegames[game].get("retention", {})
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"Aufbewahrung - {game}")
+        form = QFormLayout(dialog)
+        form.addRow(QLabel("0 = Regel nicht verwenden. Sind alle Werte 0, wird nichts gelöscht."))
+
+        spins = {}
+        for key, label in (("keep_last", "Neueste Backups behalten:"), ("hourly", "Stündliche Backups:"),
+                           ("daily", "Tägliche Backups:"), ("weekly", "Wöchentliche Backups:")):
+            spin = QSpinBox()
+            spin.setRange(0, 9999)
+            spin.setValue(policy.get(key, 0))
+            form.addRow(label, spin)
+            spins[key] = spin
+        keep_favorites = QCheckBox("Favoriten immer behalten")
+        keep_favorites.setChecked(policy.get("keep_favorites", True))
+        form.addRow(keep_favorites)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        form.addRow(buttons)
+        if dialog.exec_() != QDialog.Accepted:
+            return None
+        policy = {key: spin.value() for key, spin in spins.items()}
+        policy["keep_favorites"] = keep_favorites.isChecked()
+        return policy
+
+    def update_watches(self):
+        """Gleicht die überwachten Ordner mit den "watch"-Einstellungen in save_paths.json ab."""
+        for game, data in self.savegames.items():
+            wanted = data.get("watch") and os.path.isdir(data["path"])
+            current = self.watcher.config(game)
+            if wanted:
+                debounce = data.get("watch_debounce", DEFAULT_DEBOUNCE)
+                if current != (data["path"], debounce):
+                    self.watcher.watch(game, data["path"], debounce)
+            elif current:
+                self.watcher.unwatch(game)
+
+    def auto_backup(self, game, changes, snapshot):
+        """Vom Watcher gemeldete Änderungen: ganzen Savegame-Ordner sichern (inkrementell)."""
+        if game not in self.savegames or not self.savegames[game].get("watch"):
+            return
+        path = self.savegames[game]["path"]
+        self.stat_cache.invalidate(path)  # der Watcher hat Änderungen gesehen
+        try:
+            names = self.core.all_names(game)
+        except OSError:
+            return
+        if not names:
+            return
+        changed = len(changes.get("added", [])) + len(changes.get("changed", [])) + len(changes.get("removed", []))
+        # Spiele mit demselben Ordner (z.B. MhRise, world, AUgust-Test) melden sich einzeln: solange
+        # das Auto-Backup noch nicht liest, schließen sie sich an und lesen den Ordner nicht erneut
+        key = self.core.backup_key(game, names)
+        with self.auto_lock:
+            group = self.auto_backups.get(key)
+            if group is not None and not group["started"]:
+                group["games"][game] = group["games"].get(game, 0) + changed
+                group["snapshots"][game] = snapshot
+                return
+            group = self.auto_backups[key] = {"games": {game: changed}, "snapshots": {game: snapshot},
+                                              "started": False}
+        QTimer.singleShot(AUTO_BACKUP_MERGE_MS, lambda: self.start_auto_backup(key, group, names))
+
+    def start_auto_backup(self, key, group, names):
+        """Ein Backup für alle gesammelten Spiele; das erste liest, die übrigen übernehmen es (share_backup)."""
+        now = new_backup_name()
+        leader = next(iter(group["games"]))
+
+        def close_group():
+            with self.auto_lock:
+                group["started"] = True  # ab jetzt kommt niemand mehr dazu
+                if self.auto_backups.get(key) is group:
+                    del self.auto_backups[key]
+
+        def retry(games):
+            # der Watcher meldet die Änderungen später erneut (Baseline bleibt stehen)
+            for game in games:
+                self.watcher.retry(game)
+
+        def work(progress, cancel):
+            close_group()
+            try:
+                return self.core.run_backup(leader, names, now, progress, cancel)
+            except BaseException:
+                retry(group["games"])  # watcher.retry ist thread-sicher
+                raise
+
+        def cancelled():
+            close_group()
+            retry(group["games"])
+
+        def done(result):
+            copied_files, errors = result
+            self.show_error_report("Fehler beim Kopieren", errors)
+            for game, changed in group["games"].items():
+                if game not in self.savegames:
+                    continue  # inzwischen gelöscht
+                if game != leader:
+                    try:
+                        self.core.share_backup(game, now, leader, now)
+                    except OSError as e:
+                        self.show_error_report(f"Auto-Backup {game} fehlgeschlagen", [(leader, e)])
+                        retry([game])
+                        continue
+                self.core.record_backup(game, now, copied_files, f"Auto-Backup ({changed} Änderung(en)):")
+                if errors:
+                    retry([game])  # fehlende Dateien beim nächsten Versuch mitsichern
+                else:
+                    self.watcher.confirm(game, group["snapshots"][game])
+                self.apply_retention(game)
+            self.job_label.setText(f"Auto-Backup {', '.join(group['games'])}: {now}")
+            if self.selected_game in group["games"]:
+                self.refresh_lists()
+
+        # abgebrochen, bevor work lief: sonst würden sich spätere Meldungen an einen toten Job hängen
+        self.jobs.submit(Job(f"Auto-Backup {', '.join(group['games'])}", work, done, cancelled))
 
     def restore_savegame(self):
         if not self.selected_game:
             return
 
-        selected_backup = self.backup_list.currentItem()
-        if not selected_backup:
+        backup_date = self.backup_model.name(self.backup_list.currentIndex())
+        if not backup_date:
             QMessageBox.warning(self, "Kein Backup ausgewählt", "Bitte wähle ein Backup aus der rechten Liste.")
             return
 
-        backup_date = selected_backup.text()
-        backup_path = os.path.join(BACKUP_DIR, self.selected_game, backup_date)
-        savegame_path = self.savegames[self.selected_game]["path"]
-
-        if not os.path.exists(backup_path):
+        game = self.selected_game
+        if not os.path.exists(backup_core.backup_path(game, backup_date)):
             QMessageBox.warning(self, "Backup nicht gefunden", "Backup-Ordner existiert nicht.")
             return
 
-        # Statt komplettes Verzeichnis zu löschen, Dateien einzeln kopieren / überschreiben
+        self.start_restore(game, backup_date)
+
+    def start_restore(self, game, backup_date, paths=None):
+        savegame_path = self.savegames[game]["path"]
+
+        # Erst vergleichen, dann nur neue/geänderte Dateien schreiben (Plan wird vorher angezeigt)
+        def plan_work(progress, cancel):
+            return self.core.plan_restore(game, backup_date, paths, progress, cancel)
+
+        def planned(plan):
+            if not plan.to_write and not plan.removed:
+                QMessageBox.information(self, "Nichts zu tun",
+                                        f"Der Spielordner entspricht bereits Backup {backup_date}.")
+                return
+            mirror = self.confirm_restore_plan(backup_date, plan)
+            if mirror is None:
+                return
+
+            def apply_work(progress, cancel):
+                return self.core.apply_restore(game, plan, mirror, progress, cancel)
+
+            self.jobs.submit(Job(f"Restore {game}", apply_work, lambda errors: done(errors, plan),
+                                 self.on_job_cancelled))
+
+        def done(errors, plan):
+            self.stat_cache.invalidate(savegame_path)
+            # Eigener Restore soll kein Auto-Backup auslösen (auch nicht bei Spielen mit gleichem Ordner)
+            for watched, (path, _) in list(self.watcher.games.items()):
+                if path == savegame_path:
+                    self.watcher.rebaseline(watched)
+            if errors:
+                # Alles-oder-nichts: bei Fehlern wurde nichts getauscht
+                self.show_error_report("Fehler beim Wiederherstellen - Spielordner unverändert", errors)
+                return
+            if game == self.selected_game:
+                self.refresh_lists()
+            box = QMessageBox(self)
+            box.setWindowTitle("Wiederhergestellt")
+            box.setIcon(QMessageBox.Information)
+            box.setText(f"Backup {backup_date} wurde wiederhergestellt.")
+            undo_btn = None
+            if plan.snapshot:
+                box.setInformativeText("Der vorherige Stand wurde aufgehoben und kann wiederhergestellt werden.")
+                undo_btn = box.addButton("↩ Rückgängig", QMessageBox.ActionRole)
+            box.addButton(QMessageBox.Ok)
+            box.exec_()
+            if undo_btn is not None and box.clickedButton() == undo_btn:
+                self.undo_restore(game, plan.snapshot)
+
+        self.jobs.submit(Job(f"Restore planen {game}", plan_work, planned, self.on_job_cancelled))
+
+    def confirm_undo_restore(self, game):
+        snapshots = self.core.restore_snapshots(game)
+        if not snapshots:
+            return
+        path, info = snapshots[0]
+        count = len(info["replaced"]) + len(info["removed"]) + len(info["added"])
+        confirm = QMessageBox.question(
+            self, "Restore rückgängig machen",
+            f"Restore von Backup {info['backup']} ({info['created'].replace('T', ' ')}) rückgängig machen?\n"
+            f"{count} Datei(en) werden auf den Stand davor zurückgesetzt. Änderungen seitdem gehen verloren.",
+            QMessageBox.Yes | QMessageBox.No)
+        if confirm == QMessageBox.Yes:
+            self.undo_restore(game, path)
+
+    def undo_restore(self, game, snapshot):
+        """Nur Umbenennungen, daher direkt im GUI-Thread."""
+        savegame_path = self.savegames[game]["path"]
         try:
-            for root, dirs, files in os.walk(backup_path):
-                # Zielverzeichnis entsprechend der Struktur ermitteln
-                relative_path = os.path.relpath(root, backup_path)
-                target_dir = os.path.join(savegame_path, relative_path)
-                os.makedirs(target_dir, exist_ok=True)
-
-                for file in files:
-                    src_file = os.path.join(root, file)
-                    dst_file = os.path.join(target_dir, file)
-                    shutil.copy2(src_file, dst_file)  # überschreibt automatisch, falls Datei existiert
-
+            self.core.undo_restore(game, snapshot)
         except Exception as e:
-            QMessageBox.warning(self, "Fehler", f"Fehler beim Wiederherstellen: {e}")
+            QMessageBox.warning(self, "Fehler", f"Restore konnte nicht rückgängig gemacht werden:\n{e}")
             return
+        self.stat_cache.invalidate(savegame_path)
+        for watched, (path, _) in list(self.watcher.games.items()):
+            if path == savegame_path:
+                self.watcher.rebaseline(watched)
+        if game == self.selected_game:
+            self.refresh_lists()
 
-        QMessageBox.information(self, "Wiederhergestellt", f"Backup {backup_date} wurde wiederhergestellt.")
-        self.refresh_lists()
+    def confirm_restore_plan(self, backup_date, plan):
+        """Zeigt den Restore-Plan. Gibt False (normal), True (spiegeln) oder None (Abbruch) zurück."""
+        box = QMessageBox(self)
+        box.setWindowTitle("Restore-Plan")
+        box.setText(f"Backup {backup_date} wiederherstellen?\n\n{plan.summary()}\n"
+                    f"Zu schreiben: {plan.write_bytes() / 1048576:.1f} MB")
+        details = []
+        for title, paths in (("Neu", plan.added), ("Geändert", plan.changed),
+                             ("Unverändert", plan.unchanged), ("Nur im Spielordner", plan.removed)):
+            if paths:
+                details.append(f"{title}:\n" + "\n".join(f"  {p}" for p in paths))
+        box.setDetailedText("\n\n".join(details))
+        restore_btn = box.addButton("Wiederherstellen", QMessageBox.AcceptRole)
+        mirror_btn = None
+        if plan.removed:
+            mirror_btn = box.addButton("Spiegeln (überzählige löschen)", QMessageBox.DestructiveRole)
+        box.addButton("Abbrechen", QMessageBox.RejectRole)
+        box.exec_()
+        clicked = box.clickedButton()
+        if clicked == restore_btn:
+            return False
+        if mirror_btn is not None and clicked == mirror_btn:
+            return True
+        return None
+
+    def backup_paths(self, backup_path):
+        """Relative Pfade aller Dateien eines Backups (Archiv, Manifest oder Ordnerkopie)."""
+        return [entry["path"] for entry in backup_entries(backup_path, self.store)[4]]
+
+    def choose_entries(self, title, entries):
+        """Mehrfachauswahl aus einer Liste von Pfaden. Gibt None bei Abbruch zurück."""
+        dialog = QDialog(self)
+        dialog.setWindowTitle(title)
+        dialog.resize(500, 400)
+        layout = QVBoxLayout(dialog)
+        entry_list = QListWidget()
+        entry_list.setSelectionMode(QListWidget.ExtendedSelection)
+        entry_list.addItems(sorted(entries))
+        layout.addWidget(entry_list)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        if dialog.exec_() != QDialog.Accepted:
+            return None
+        return [item.text() for item in entry_list.selectedItems()]
+
+    def show_error_report(self, title, errors, limit=20):
+        """Ein gesammelter Fehlerbericht statt einer Meldung pro Datei."""
+        if not errors:
+            return
+        lines = [f"{path}: {e}" for path, e in errors[:limit]]
+        if len(errors) > limit:
+            lines.append(f"... und {len(errors) - limit} weitere")
+        QMessageBox.warning(self, "Fehler", f"{title} ({len(errors)} Fehler):\n" + "\n".join(lines))
+
+    def update_job_status(self, *_):
+        running = self.jobs.current
+        pending = self.jobs.pending_count()
+        if not running and not pending:
+            self.job_label.setText("")
+            self.job_progress.reset()
+            self.job_progress.setVisible(False)
+            self.job_cancel_btn.setVisible(False)
+            return
+
+        text = running.title if running else "Warte..."
+        if pending:
+            text += f" (+{pending} in Warteschlange)"
+        self.job_label.setText(text)
+        self.job_progress.setVisible(True)
+        self.job_cancel_btn.setVisible(True)
+
+    def on_job_progress(self, job, bytes_done, bytes_total, files_done, files_total):
+        # Prozent über Bytes, damit große Einzeldateien nicht stehen bleiben
+        self.job_progress.setMaximum(max(bytes_total, 1) // 1024)
+        self.job_progress.setValue(bytes_done // 1024)
+        self.job_progress.setFormat(f"%p%  –  {files_done}/{files_total} Dateien, "
+                                    f"{bytes_done / 1048576:.1f}/{bytes_total / 1048576:.1f} MB")
+
+    def on_job_cancelled(self):
+        QMessageBox.information(self, "Abgebrochen", "Der Vorgang wurde abgebrochen.")
+
+    def on_job_error(self, job, message):
+        QMessageBox.warning(self, "Fehler", f"{job.title} fehlgeschlagen: {message}")
 
     def savefile_context_menu(self, pos: QPoint):
-        item = self.save_list.itemAt(pos)
-        if not item or not self.selected_game:
+        filename = self.save_model.name(self.save_list.indexAt(pos))
+        if not filename or not self.selected_game:
             return
 
-        filename = item.text()
         game_path = self.savegames[self.selected_game]["path"]
         full_path = os.path.join(game_path, filename)
 
@@ -525,31 +956,107 @@ class BackupApp(QWidget):
                 except Exception as e:
                     QMessageBox.warning(self, "Fehler", f"Umbenennen fehlgeschlagen: {e}")
 
-    def edit_note(self, item):
-        if not self.selected_game:
+    def search_backups(self):
+        """Sucht die eingegebene Datei im Datei-Index aller Backups des Spiels."""
+        text = self.file_search.text().strip()
+        if not self.selected_game or not text:
+            return
+        matches = self.core.search_files(self.selected_game, text)
+        if not matches:
+            QMessageBox.information(self, "Dateisuche", f"Keine gesicherte Datei enthält \"{text}\".")
+            return
+        path = matches[0]["path"]
+        if len(matches) > 1:
+            labels = [f"{row['path']}  ({row['backups']} Backups)" for row in matches]
+            label, ok = QInputDialog.getItem(self, "Dateisuche", "Datei auswählen:", labels, 0, False)
+            if not ok:
+                return
+            path = matches[labels.index(label)]["path"]
+        self.show_file_history(self.selected_game, path)
+
+    def show_file_history(self, game, path):
+        """Alle Backups mit der Datei: Stand gegenüber der aktuellen Datei und wo sie sich geändert hat."""
+        history = self.core.file_history(game, path)
+        differing = sum(1 for version in history if version["differs_live"])
+        first = next((version for version in history if version["changed"]), None)
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"Datei in Backups - {path}")
+        dialog.resize(700, 400)
+        layout = QVBoxLayout(dialog)
+        summary = f"In {len(history)} Backup(s), {differing} davon anders als die aktuelle Datei."
+        summary += f"\nErste Änderung in: {first['name']}" if first else "\nIn keinem Backup geändert."
+        layout.addWidget(QLabel(summary))
+        only_differing = QCheckBox("Nur Backups, die von der aktuellen Datei abweichen")
+        layout.addWidget(only_differing)
+
+        columns = ("Backup", "Datum", "Größe", "Stand", "Änderung")
+        versions = list(reversed(history))  # neueste zuerst wie in der Backup-Liste
+        table = QTableWidget(len(versions), len(columns))
+        table.setHorizontalHeaderLabels(columns)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table.verticalHeader().setVisible(False)
+        for row, version in enumerate(versions):
+            values = (
+                version["name"],
+                datetime.datetime.fromtimestamp(version["created"]).strftime("%d.%m.%Y %H:%M"),
+                backup_core.format_size(version["size"]),
+                "abweichend" if version["differs_live"] else "= aktuell",
+                "geändert" if version["changed"] else "",
+            )
+            for column, value in enumerate(values):
+                table.setItem(row, column, QTableWidgetItem(value))
+        table.resizeColumnsToContents()
+        table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(table)
+
+        def filter_rows(checked):
+            for row, version in enumerate(versions):
+                table.setRowHidden(row, checked and not version["differs_live"])
+
+        def select_backup(index):
+            # Doppelklick: Backup in der Hauptliste markieren (z.B. zum Wiederherstellen)
+            model_index = self.backup_model.index_of(versions[index.row()]["name"])
+            if model_index.isValid():
+                self.backup_list.setCurrentIndex(model_index)
+                self.backup_list.scrollTo(model_index)
+            dialog.accept()
+
+        only_differing.toggled.connect(filter_rows)
+        table.doubleClicked.connect(select_backup)
+        buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        dialog.exec_()
+
+    def edit_note(self, index):
+        backup = self.backup_model.row(index)
+        if not self.selected_game or not backup:
             return
 
-        text, ok = QInputDialog.getMultiLineText(self, "Notiz bearbeiten", f"Notiz zu Backup {item.text()}:", item.toolTip())
+        backup_name = backup["name"]
+        text, ok = QInputDialog.getMultiLineText(self, "Notiz bearbeiten", f"Notiz zu Backup {backup_name}:",
+                                                 backup["note"] or "")
         if ok:
             notes = self.savegames[self.selected_game].setdefault("notes", {})
-            notes[item.text()] = text
+            notes[backup_name] = text
             self.save_savegames()
-            item.setToolTip(text)
+            self.catalog.set_note(self.selected_game, backup_name, text)
+            self.backup_model.update_backup(backup_name, note=text)
 
     def backup_context_menu(self, pos: QPoint):
-        item = self.backup_list.itemAt(pos)
-        if not item:
+        backup_name = self.backup_model.name(self.backup_list.indexAt(pos))
+        if not backup_name:
             return
 
-        raw_backup_name = item.text()
-        # Entferne Sternsymbol bei Favoriten
-        backup_name = raw_backup_name.replace("⭐ ", "").strip()
-
         menu = QMenu()
         delete_action = menu.addAction("🗑 Backup löschen")
         rename_action = menu.addAction("✏️ Backup umbenennen")
+        partial_action = menu.addAction("📦 Einzelne Dateien wiederherstellen")
+        verify_action = menu.addAction("🔍 Backup prüfen")
 
-        favorites = self.savegames[self.selected_game].get("favorites", [])
+        favorites = self.savegames[self.selected_game].setdefault("favorites", [])
         is_favorite = backup_name in favorites
 
         if is_favorite:
@@ -563,70 +1070,69 @@ class BackupApp(QWidget):
             reply = QMessageBox.question(self, "Backup löschen", f"Backup '{backup_name}' wirklich löschen?",
                                          QMessageBox.Yes | QMessageBox.No)
             if reply == QMessageBox.Yes:
-                backup_path = os.path.join(BACKUP_DIR, self.selected_game, backup_name)
-                try:
-                    if os.path.exists(backup_path):
-                        shutil.rmtree(backup_path)
-
-                    notes = self.savegames[self.selected_game].get("notes", {})
-                    if backup_name in notes:
-                        del notes[backup_name]
-
-                    if backup_name in favorites:
-                        favorites.remove(backup_name)
-
-                    self.save_savegames()
-                    self.refresh_lists()
-                except Exception as e:
-                    QMessageBox.warning(self, "Fehler", f"Löschen fehlgeschlagen: {e}")
+                self.start_prune(self.selected_game, [backup_name])
 
         elif action == rename_action:
             new_name, ok = QInputDialog.getText(self, "Backup umbenennen", "Neuer Name:", text=backup_name)
             if ok and new_name and new_name != backup_name:
-                old_path = os.path.join(BACKUP_DIR, self.selected_game, backup_name)
-                new_path = os.path.join(BACKUP_DIR, self.selected_game, new_name)
-                if os.path.exists(new_path):
+                if os.path.exists(backup_core.backup_path(self.selected_game, new_name)):
                     QMessageBox.warning(self, "Fehler", "Es existiert bereits ein Backup mit diesem Namen.")
                     return
 
                 try:
-                    os.rename(old_path, new_path)
-
-                    notes = self.savegames[self.selected_game].get("notes", {})
-                    if backup_name in notes:
-                        notes[new_name] = notes.pop(backup_name)
-
-                    if backup_name in favorites:
-                        favorites.remove(backup_name)
-                        favorites.append(new_name)
-
-                    self.save_savegames()
+                    self.core.rename_backup(self.selected_game, backup_name, new_name)
                     self.refresh_lists()
                 except Exception as e:
                     QMessageBox.warning(self, "Fehler", f"Umbenennen fehlgeschlagen: {e}")
 
+        elif action == verify_action:
+            game = self.selected_game
+            self.start_verify([(game, backup_name, backup_core.backup_path(game, backup_name))], backup_name)
+
+        elif action == partial_action:
+            try:
+                entries = self.backup_paths(backup_core.backup_path(self.selected_game, backup_name))
+            except Exception as e:
+                QMessageBox.warning(self, "Fehler", f"Backup konnte nicht gelesen werden: {e}")
+                return
+            paths = self.choose_entries(f"Dateien aus {backup_name} wiederherstellen", entries)
+            if paths:
+                self.start_restore(self.selected_game, backup_name, paths)
+
         elif not is_favorite and action == fav_action:
             favorites.append(backup_name)
             self.save_savegames()
-            self.refresh_lists()
+            self.catalog.set_favorite(self.selected_game, backup_name, True)
+            self.backup_model.update_backup(backup_name, favorite=1)
 
         elif is_favorite and action == unfav_action:
             favorites.remove(backup_name)
             self.save_savegames()
-            self.refresh_lists()
+            self.catalog.set_favorite(self.selected_game, backup_name, False)
+            self.backup_model.update_backup(backup_name, favorite=0)
+
+    def closeEvent(self, event):
+        # Laufende Jobs sauber abbrechen, damit keine halben Blobs liegen bleiben
+        self.watcher.stop()
+        self.jobs.cancel_all()
+        self.jobs.pool.waitForDone()
+        self.core.close()  # schreibt ausstehende Änderungen an save_paths.json
+        self.app_lock.release()  # ab hier darf der Updater die exe tauschen
+        super().closeEvent(event)
 
     def save_savegames(self):
-        with open(SAVE_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.savegames, f, indent=2, ensure_ascii=False)
+        backup_core.save_savegames(self.savegames)
 
     def load_savegames(self):
-        if os.path.exists(SAVE_FILE):
-            with open(SAVE_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        return {}
+        return backup_core.load_savegames()
 
 if __name__ == "__main__":
     app = QApplication([])
-    window = BackupApp()
+    app_lock = AppLock()
+    if not app_lock.acquire(APP_LOCK_TIMEOUT):
+        # Zwei Instanzen würden sich Backups, Journal und Updater-Übergabe gegenseitig überschreiben
+        QMessageBox.warning(None, "Läuft bereits", "Das Savegame Backup Tool ist schon geöffnet.")
+        sys.exit(1)
+    window = BackupApp(app_lock)
     window.show()
     app.exec_()
\ No newline at end of file
@@ -0,0 +1,317 @@
+"""
+Überwacht Savegame-Ordner und meldet abgeschlossene Änderungen für automatische Backups.
+
+Unter Linux wird inotify (über ctypes, ohne Zusatzpakete) verwendet, sonst ein günstiges
+Polling mit os.scandir-Stat-Snapshots. In beiden Fällen wird entprellt: erst wenn ein Ordner
+`debounce` Sekunden lang nicht mehr geschrieben wurde, wird der aktuelle Snapshot mit dem
+letzten gesicherten verglichen (nur Größe/mtime, kein Hashen) und bei echten Änderungen
+on_change(spiel, änderungen, snapshot) im Watcher-Thread aufgerufen. Als gesichert gilt der
+Snapshot erst, wenn der Aufrufer confirm(spiel, snapshot) meldet; scheitert das Backup, meldet
+retry(spiel) dieselben Änderungen nach RETRY_DELAY erneut.
+
+watch() liest den Ordner nicht selbst: Snapshot und inotify-Watches legt der Watcher-Thread
+an, damit große Ordner den Aufrufer (GUI-Start) nicht blockieren.
+"""
+import os
+import sys
+import time
+import select
+import struct
+import threading
+
+from op_log import log_failure
+from backup_store import is_restore_area
+
+DEFAULT_DEBOUNCE = 10.0  # Sekunden Ruhe, bevor gesichert wird
+POLL_INTERVAL = 5.0
+RETRY_DELAY = 60.0  # Sekunden bis zum nächsten Versuch nach einem gescheiterten Auto-Backup
+
+
+def snapshot(root):
+    """{rel_pfad: (größe, mtime_ns)} aller Dateien unter root, per os.scandir (ohne Restore-Bereiche)."""
+    result = {}
+    stack = [("", root)]
+    while stack:
+        rel_dir, abs_dir = stack.pop()
+        try:
+            with os.scandir(abs_dir) as it:
+                for entry in it:
+                    rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not is_restore_area(abs_dir, entry.name):  # Staging/Snapshots eines Restores
+                                stack.append((rel_path, entry.path))
+                        else:
+                            st = entry.stat(follow_symlinks=False)
+                            result[rel_path] = (st.st_size, st.st_mtime_ns)
+                    except OSError:
+                        continue  # Datei wurde gerade gelöscht/ersetzt
+        except OSError:
+            continue
+    return result
+
+
+def diff_snapshots(old, new):
+    """Gibt {"added": [...], "changed": [...], "removed": [...]} zurück (leer = keine Änderung)."""
+    changes = {
+        "added": sorted(path for path in new if path not in old),
+        "changed": sorted(path for path, stat in new.items() if path in old and old[path] != stat),
+        "removed": sorted(path for path in old if path not in new),
+    }
+    return changes if any(changes.values()) else {}
+
+
+class _Inotify:
+    """Minimaler inotify-Zugriff über libc (nur Linux)."""
+    IN_MODIFY = 0x002
+    IN_ATTRIB = 0x004
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+            | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 fehlgeschlagen")
+        # wd -> (ordner, {spiele}); mehrere Spiele können denselben Ordner nutzen,
+        # inotify liefert dafür denselben wd zurück
+        self.watches = {}
+        self.lock = threading.RLock()  # Watcher-Thread und GUI ändern watches
+
+    def add_tree(self, game, root):
+        for dirpath, dirs, _ in os.walk(root):
+            dirs[:] = [d for d in dirs if not is_restore_area(dirpath, d)]  # Restore-Bereiche nicht überwachen
+            self.add(game, dirpath)
+
+    def add(self, game, path):
+        with self.lock:
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+            if wd >= 0:
+                self.watches.setdefault(wd, (path, set()))[1].add(game)
+
+    def remove_game(self, game):
+        with self.lock:
+            for wd, (_, games) in list(self.watches.items()):
+                games.discard(game)
+                if not games:
+                    self._libc.inotify_rm_watch(self.fd, wd)
+                    del self.watches[wd]
+
+    def read(self, timeout):
+        """Gibt die Menge der Spiele mit Ereignissen zurück ("*" bei Überlauf)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        with self.lock:
+            return self._parse(data)
+
+    def _parse(self, data):
+        games = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            name = data[offset + self.EVENT.size:offset + self.EVENT.size + length].rstrip(b"\0")
+            offset += self.EVENT.size + length
+            if mask & self.IN_Q_OVERFLOW:
+                games.add("*")
+                continue
+            watch = self.watches.get(wd)
+            if not watch:
+                continue
+            path, watch_games = watch
+            if mask & self.IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            if (mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO)
+                    and not is_restore_area(path, os.fsdecode(name))):
+                for game in list(watch_games):
+                    self.add_tree(game, os.path.join(path, os.fsdecode(name)))
+            games.update(watch_games)
+        return games
+
+    def close(self):
+        os.close(self.fd)
+
+
+class SaveWatcher:
+    def __init__(self, on_change, poll_interval=POLL_INTERVAL, use_inotify=True):
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.games = {}  # spiel -> (pfad, debounce)
+        self.pending = {}  # spiel -> (pfad, debounce), noch vom Watcher-Thread einzurichten
+        self.baselines = {}  # spiel -> zuletzt gesicherter Snapshot
+        self.last_polled = {}  # spiel -> Snapshot der letzten Abfrage (nur Polling)
+        self.dirty = {}  # spiel -> Zeitpunkt der letzten Änderung
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._inotify = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                self._inotify = None  # z.B. Limit erreicht -> Polling
+
+    @property
+    def mode(self):
+        return "inotify" if self._inotify else "polling"
+
+    def watch(self, game, path, debounce=DEFAULT_DEBOUNCE):
+        """
+        Nimmt ein Spiel in die Überwachung auf; der Stand beim Einrichten im Watcher-Thread gilt
+        als gesichert.
+        """
+        with self._lock:
+            self.pending[game] = (path, debounce)
+
+    def config(self, game):
+        """(pfad, debounce) des überwachten bzw. noch einzurichtenden Spiels oder None."""
+        with self._lock:
+            return self.pending.get(game) or self.games.get(game)
+
+    def _setup_pending(self):
+        with self._lock:
+            pending = list(self.pending.items())
+        for game, config in pending:
+            path, _ = config
+            snap = snapshot(path)
+            with self._lock:
+                if self.pending.get(game) is not config:
+                    continue  # inzwischen neu eingerichtet oder nicht mehr überwacht
+                del self.pending[game]
+                self.games[game] = config
+                self.baselines[game] = snap
+                self.last_polled[game] = snap
+                self.dirty.pop(game, None)
+                if self._inotify:
+                    self._inotify.remove_game(game)
+                    if os.path.isdir(path):
+                        self._inotify.add_tree(game, path)
+
+    def confirm(self, game, snap):
+        """Das Backup zu diesem (mit on_change gemeldeten) Snapshot ist fertig: neuer gesicherter Stand."""
+        with self._lock:
+            if game in self.games:
+                self.baselines[game] = snap
+
+    def retry(self, game, delay=RETRY_DELAY):
+        """Auto-Backup gescheitert/abgebrochen: die Änderungen nach delay Sekunden erneut melden."""
+        with self._lock:
+            if game in self.games:
+                self.dirty[game] = time.monotonic() + delay  # Frist ist dirty + debounce
+
+    def unwatch(self, game):
+        with self._lock:
+            self.pending.pop(game, None)
+            self.games.pop(game, None)
+            self.baselines.pop(game, None)
+            self.last_polled.pop(game, None)
+            self.dirty.pop(game, None)
+            if self._inotify:
+                self._inotify.remove_game(game)
+
+    def rebaseline(self, game):
+        """Nach eigenen Schreibzugriffen (Restore) den aktuellen Stand als gesichert übernehmen."""
+        with self._lock:
+            if game in self.games:
+                self.baselines[game] = snapshot(self.games[game][0])
+                self.last_polled[game] = self.baselines[game]
+                self.dirty.pop(game, None)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="save-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+    def _run(self):
+        next_poll = time.monotonic()
+        while not self._stop.is_set():
+            self._setup_pending()
+            now = time.monotonic()
+            if self._inotify:
+                for game in self._inotify.read(self._timeout(now)):
+                    self._mark(game, time.monotonic())
+            else:
+                if now >= next_poll:
+                    self._poll(now)
+                    next_poll = now + self.poll_interval
+                self._stop.wait(min(self._timeout(now), max(next_poll - now, 0.05)))
+            self._flush(time.monotonic())
+
+    def _timeout(self, now):
+        with self._lock:
+            deadlines = [t + self.games[g][1] for g, t in self.dirty.items() if g in self.games]
+        if not deadlines:
+            return 1.0
+        return min(max(min(deadlines) - now, 0.05), 1.0)
+
+    def _mark(self, game, now):
+        with self._lock:
+            targets = list(self.games) if game == "*" else [game]
+            for target in targets:
+                if target in self.games:
+                    self.dirty[target] = now
+
+    def _poll(self, now):
+        with self._lock:
+            games = dict(self.games)
+        for game, (path, _) in games.items():
+            snap = snapshot(path)
+            with self._lock:
+                if game in self.games and snap != self.last_polled.get(game):
+                    self.last_polled[game] = snap
+                    self.dirty[game] = now
+
+    def _flush(self, now):
+        ready = []
+        with self._lock:
+            for game, changed_at in list(self.dirty.items()):
+                if game not in self.games:
+                    self.dirty.pop(game)
+                elif now - changed_at >= self.games[game][1]:
+                    self.dirty.pop(game)
+                    ready.append((game, self.games[game][0]))
+
+        for game, path in ready:
+            snap = snapshot(path)
+            with self._lock:
+                if game not in self.games:
+                    continue
+                # die Baseline rückt erst mit confirm vor, sonst ginge ein gescheitertes Backup verloren
+                changes = diff_snapshots(self.baselines.get(game, {}), snap)
+                if changes:
+                    self.last_polled[game] = snap
+            if changes:
+                try:
+                    self.on_change(game, changes, snap)
+                except Exception as e:
+                    # kein Konsolenfenster in der exe: im Verlauf (operations.log) sichtbar machen
+                    log_failure("auto_backup", e, game=game)
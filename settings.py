@@ -0,0 +1,31 @@
+"""
+Programmweite Einstellungen (settings.json), getrennt von den Spiel-Einträgen in save_paths.json.
+"""
+import os
+import json
+
+SETTINGS_FILE = "settings.json"
+
+DEFAULTS = {
+    "copy_workers": 4,  # parallele Kopier-Threads für Backup/Restore
+    "device_jobs": 1,  # Jobs gleichzeitig pro Platte (st_dev), siehe job_scheduler
+    "device_limits": {},  # {"pfad auf der platte": jobs} für einzelne Platten, z.B. NVMe
+}
+
+
+def load_settings():
+    settings = dict(DEFAULTS)
+    if os.path.exists(SETTINGS_FILE):
+        try:
+            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
+                settings.update(json.load(f))
+        except (OSError, ValueError):
+            pass  # kaputte Datei -> Standardwerte
+    return settings
+
+
+def save_settings(settings):
+    tmp_path = SETTINGS_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, SETTINGS_FILE)
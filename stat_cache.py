@@ -0,0 +1,130 @@
+"""
+Stat-Cache für die Savegame-Liste (Größe, Änderungszeit, Status seit dem letzten Backup).
+
+Verzeichnisinhalte werden per os.scandir gelesen und mit der mtime des Verzeichnisses gemerkt;
+neu eingelesen wird nur ein Verzeichnis, dessen mtime sich geändert hat (Datei angelegt,
+gelöscht oder umbenannt). Dateien auf oberster Ebene werden zusätzlich jedes Mal neu gestatet,
+weil Spiele ihre Slots oft direkt überschreiben, ohne dass sich die Ordner-mtime ändert.
+Ordnergrößen werden rekursiv aus diesen Einträgen berechnet und gemerkt, solange sich keines
+der Unterverzeichnisse geändert hat. Qt-frei, läuft auch im Hintergrund-Thread.
+"""
+import os
+import threading
+from collections import namedtuple
+
+from backup_store import is_restore_area
+
+Entry = namedtuple("Entry", "name is_dir size mtime")  # size/mtime sind bei Ordnern None
+TreeInfo = namedtuple("TreeInfo", "size count mtime files")  # files: {rel_pfad: (größe, mtime)}
+
+STATUS_NEW = "neu"
+STATUS_CHANGED = "geändert"
+STATUS_UNCHANGED = "gesichert"
+
+
+class StatCache:
+    def __init__(self):
+        self._dirs = {}  # ordner -> (mtime_ns, [Entry])
+        self._trees = {}  # ordner -> (signatur, TreeInfo)
+        self._lock = threading.Lock()
+
+    def list_dir(self, path, restat_files=False):
+        """Einträge eines Ordners, nach Name sortiert. Wirft OSError, wenn er fehlt."""
+        mtime_ns = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._dirs.get(path)
+        if cached and cached[0] == mtime_ns:
+            if not restat_files:
+                return cached[1]
+            entries = [entry if entry.is_dir else self._restat(path, entry) for entry in cached[1]]
+            entries = [entry for entry in entries if entry is not None]
+        else:
+            entries = []
+            with os.scandir(path) as it:
+                for item in it:
+                    try:
+                        if item.is_dir(follow_symlinks=False):
+                            entries.append(Entry(item.name, True, None, None))
+                        else:
+                            st = item.stat(follow_symlinks=False)
+                            entries.append(Entry(item.name, False, st.st_size, st.st_mtime))
+                    except OSError:
+                        continue  # gerade gelöscht/ersetzt
+            entries.sort(key=lambda entry: entry.name.lower())
+        with self._lock:
+            self._dirs[path] = (mtime_ns, entries)
+        return entries
+
+    @staticmethod
+    def _restat(path, entry):
+        try:
+            st = os.stat(os.path.join(path, entry.name))
+        except OSError:
+            return None
+        return entry._replace(size=st.st_size, mtime=st.st_mtime)
+
+    def tree_info(self, path):
+        """Größe, Dateianzahl und neueste mtime unter path; gemerkt bis sich ein Unterordner ändert."""
+        listings = []
+        stack = [("", path)]
+        while stack:
+            rel_dir, abs_dir = stack.pop()
+            try:
+                entries = self.list_dir(abs_dir)
+            except OSError:
+                continue
+            listings.append((rel_dir, abs_dir, entries))
+            stack.extend((f"{rel_dir}/{e.name}" if rel_dir else e.name, os.path.join(abs_dir, e.name))
+                         for e in entries if e.is_dir and not is_restore_area(abs_dir, e.name))
+
+        with self._lock:
+            signature = tuple((abs_dir, self._dirs.get(abs_dir, (None,))[0]) for _, abs_dir, _ in listings)
+            cached = self._trees.get(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        files = {}
+        for rel_dir, _, entries in listings:
+            for e in entries:
+                if not e.is_dir:
+                    files[f"{rel_dir}/{e.name}" if rel_dir else e.name] = (e.size, e.mtime)
+        info = TreeInfo(sum(size for size, _ in files.values()), len(files),
+                        max((mtime for _, mtime in files.values()), default=None), files)
+        with self._lock:
+            self._trees[path] = (signature, info)
+        return info
+
+    def invalidate(self, path):
+        """Vergisst path und alles darunter (z.B. nach Restore in den Ordner)."""
+        prefix = os.path.join(path, "")
+        with self._lock:
+            for cache in (self._dirs, self._trees):
+                for key in [k for k in cache if k == path or k.startswith(prefix)]:
+                    del cache[key]
+
+
+def backup_status(entry, state, info=None):
+    """
+    Vergleicht einen Eintrag auf oberster Ebene mit dem Stat-Manifest des letzten Backups.
+    Gibt STATUS_NEW/CHANGED/UNCHANGED zurück, None wenn es kein Manifest gibt (z.B. Archive).
+    Für Ordner wird info (tree_info) gebraucht.
+    """
+    if not state:
+        return None
+    if not entry.is_dir:
+        prev = state.get(entry.name)
+        if prev is None:
+            return STATUS_NEW
+        return STATUS_UNCHANGED if (prev["size"], prev["mtime"]) == (entry.size, entry.mtime) else STATUS_CHANGED
+
+    prefix = entry.name + "/"
+    known = {path: prev for path, prev in state.items() if path.startswith(prefix)}
+    if not known:
+        return STATUS_NEW
+    if len(known) != len(info.files):
+        return STATUS_CHANGED
+    for rel_path, stat in info.files.items():
+        prev = known.get(prefix + rel_path)
+        if prev is None or (prev["size"], prev["mtime"]) != stat:
+            return STATUS_CHANGED
+    return STATUS_UNCHANGED
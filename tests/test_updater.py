@@ -0,0 +1,171 @@
+"""
+Tests für updater.py gegen einen lokalen HTTP-Server (http.server mit Range-Unterstützung)
+statt GitHub. Ausführen mit:
+    python -m unittest discover tests
+"""
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import updater  # noqa: E402
+
+DATA = os.urandom(3 * 1024 * 1024 + 123)
+PARALLEL_MIN_SIZE = 1024 * 1024  # damit DATA parallel geladen wird
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Liefert server.data (ganz oder per Range) und server.digest als .sha256-Datei."""
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code, body, extra=()):
+        self.send_response(code)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", self.server.etag)
+        self.send_header("Accept-Ranges", "bytes")
+        for key, value in extra:
+            self.send_header(key, value)
+        self.end_headers()
+        return body
+
+    def do_HEAD(self):
+        self._send(200, self.server.data)
+
+    def do_GET(self):
+        server = self.server
+        if self.path.endswith(".sha256"):
+            self.wfile.write(self._send(200, f"{server.digest}  save-backup.exe\n".encode()))
+            return
+        match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        if match and self.headers.get("If-Range", server.etag) == server.etag:
+            start, end = map(int, match.groups())
+            with server.lock:
+                server.ranges.append((start, end))
+            body = self._send(206, server.data[start:end + 1],
+                              [("Content-Range", f"bytes {start}-{end}/{len(server.data)}")])
+        else:
+            body = self._send(200, server.data)
+        if server.fail_after is not None:
+            # Verbindung mitten in der Antwort abbrechen
+            self.wfile.write(body[:server.fail_after])
+            self.wfile.flush()
+            self.connection.shutdown(2)
+            return
+        self.wfile.write(body)
+
+
+class UpdaterTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/save-backup.exe"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.data = DATA
+        self.server.digest = hashlib.sha256(DATA).hexdigest()
+        self.server.etag = '"v1"'
+        self.server.fail_after = None
+        self.server.ranges = []
+        self.server.lock = threading.Lock()
+        self.dir = tempfile.mkdtemp()
+        self.exe = os.path.join(self.dir, "save-backup.exe")
+        with open(self.exe, "wb") as f:
+            f.write(b"OLD")
+        self.min_size = updater.PARALLEL_MIN_SIZE
+        updater.PARALLEL_MIN_SIZE = PARALLEL_MIN_SIZE
+
+    def tearDown(self):
+        updater.PARALLEL_MIN_SIZE = self.min_size
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def download(self, parts=updater.DOWNLOAD_PARTS):
+        return updater.download_new_exe(self.url, self.url + ".sha256", self.exe, parts)
+
+    def read(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def test_parallel_ranges(self):
+        self.assertTrue(self.download(parts=4))
+        self.assertEqual(self.read(self.exe), DATA)
+        self.assertEqual(self.read(self.exe + updater.OLD_SUFFIX), b"OLD")
+        self.assertEqual(sorted(self.server.ranges), [(start, end) for start, end, _ in
+                                                      updater.split_ranges(len(DATA), 4)])
+        self.assertFalse(os.path.exists(self.exe + updater.PART_SUFFIX))
+        self.assertFalse(os.path.exists(self.exe + updater.STATE_SUFFIX))
+
+    def test_resume_after_interruption(self):
+        self.server.fail_after = 300 * 1024
+        self.assertFalse(self.download())
+        self.assertEqual(self.read(self.exe), b"OLD")  # alte exe unangetastet
+        with open(self.exe + updater.STATE_SUFFIX, "r", encoding="utf-8") as f:
+            loaded = [piece[2] for piece in json.load(f)["ranges"]]
+        self.assertTrue(all(loaded))
+
+        self.server.fail_after = None
+        self.server.ranges = []
+        self.assertTrue(self.download())
+        self.assertEqual(self.read(self.exe), DATA)
+        # nur der Rest jedes Teils wurde neu angefragt
+        starts = sorted(start for start, _ in self.server.ranges)
+        expected = sorted(start + done for (start, _, _), done in
+                          zip(updater.split_ranges(len(DATA), updater.DOWNLOAD_PARTS), loaded))
+        self.assertEqual(starts, expected)
+
+    def test_changed_etag_restarts(self):
+        self.server.fail_after = 300 * 1024
+        self.assertFalse(self.download())
+        self.server.fail_after = None
+        self.server.etag = '"v2"'
+        self.server.ranges = []
+        self.assertTrue(self.download())
+        self.assertEqual(self.read(self.exe), DATA)
+        self.assertTrue(all(start in {s for s, _, _ in updater.split_ranges(len(DATA), updater.DOWNLOAD_PARTS)}
+                            for start, _ in self.server.ranges))
+
+    def test_hash_mismatch_keeps_old_exe(self):
+        self.server.digest = hashlib.sha256(b"etwas anderes").hexdigest()
+        self.assertFalse(self.download())
+        self.assertEqual(self.read(self.exe), b"OLD")
+        self.assertFalse(os.path.exists(self.exe + updater.OLD_SUFFIX))
+        self.assertFalse(os.path.exists(self.exe + updater.PART_SUFFIX))  # nicht fortsetzen, neu laden
+        self.assertFalse(os.path.exists(self.exe + updater.STATE_SUFFIX))
+
+    @unittest.skipIf(os.name == "nt", "Startskript nur unter POSIX")
+    def test_immediate_clean_exit_rolls_back(self):
+        marker = os.path.join(self.dir, "started")
+        with open(self.exe, "w") as f:
+            f.write(f"#!/bin/sh\necho new >> {marker}\nexit 0\n")
+        with open(self.exe + updater.OLD_SUFFIX, "w") as f:
+            f.write(f"#!/bin/sh\necho old >> {marker}\nsleep 0.2\n")
+        for path in (self.exe, self.exe + updater.OLD_SUFFIX):
+            os.chmod(path, 0o755)
+        grace = updater.START_GRACE
+        updater.START_GRACE = 1
+        try:
+            self.assertFalse(updater.start_new_version(self.exe, os.path.join(self.dir, "version.txt")))
+        finally:
+            updater.START_GRACE = grace
+        with open(self.exe, "r") as f:
+            self.assertIn("echo old", f.read())  # zurückgerollt
+
+
+if __name__ == "__main__":
+    unittest.main()
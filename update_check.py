@@ -0,0 +1,93 @@
+"""
+Versionscheck im Hintergrund.
+
+Der HTTP-Abruf läuft in einem Daemon-Thread und meldet das Ergebnis per Qt-Signal, damit das
+Fenster sofort erscheint - auch offline oder bei langsamer Verbindung. Das letzte Ergebnis
+wird in settings.json zwischengespeichert und höchstens alle CHECK_INTERVAL Sekunden erneuert.
+`requests` wird erst beim eigentlichen Abruf importiert.
+"""
+import os
+import time
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from settings import load_settings, save_settings
+from op_log import operation, timed
+
+GITHUB_VERSION_URL = 'https://raw.githubusercontent.com/Verestrasz2/SaveFile-Backup-Tool/master/version.txt'
+LOCAL_VERSION_FILE = "version.txt"
+CHECK_INTERVAL = 6 * 60 * 60  # höchstens alle 6 Stunden online nachsehen
+
+
+def read_local_version(default):
+    """Liest die lokale version.txt, falls vorhanden, sonst default."""
+    if os.path.exists(LOCAL_VERSION_FILE):
+        try:
+            with open(LOCAL_VERSION_FILE, "r", encoding="utf-8") as f:
+                return f.read().strip() or default
+        except Exception:
+            pass  # fallback auf default
+    return default
+
+
+def is_newer_version(online, local):
+    """Vergleicht Versionsstrings, Return True wenn online > local"""
+    def to_tuple(v):
+        return tuple(int(x) for x in v.split(".") if x.isdigit())
+    try:
+        return to_tuple(online) > to_tuple(local)
+    except Exception:
+        return False
+
+
+def fetch_online_version(timeout=5):
+    import requests  # nur hier gebraucht, spart Importzeit beim Start
+
+    resp = requests.get(GITHUB_VERSION_URL, timeout=timeout)
+    if resp.status_code != 200:
+        return None
+    return resp.text.strip()
+
+
+class UpdateCheck(QObject):
+    update_available = pyqtSignal(str, str)  # online, lokal
+    _fetched = pyqtSignal(str)
+
+    def __init__(self, local_version, parent=None):
+        super().__init__(parent)
+        self.local_version = local_version
+        self._fetched.connect(self._on_fetched)
+
+    def start(self):
+        settings = load_settings()
+        last_checked = settings.get("last_update_check", 0)
+        cached = settings.get("last_online_version")
+        if cached and time.time() - last_checked < CHECK_INTERVAL:
+            # Vor kurzem schon nachgesehen -> kein Netzwerkzugriff
+            self._notify(cached)
+            return
+        threading.Thread(target=self._run, name="update-check", daemon=True).start()
+
+    def _run(self):
+        try:
+            with operation("update_check") as op:
+                with timed("download"):
+                    online_version = fetch_online_version()
+                op.count(len(online_version or ""), 1)
+        except Exception:
+            return  # Online-Version nicht erreichbar - ignoriere
+        if online_version:
+            self._fetched.emit(online_version)
+
+    def _on_fetched(self, online_version):
+        # Läuft im GUI-Thread: Cache aktualisieren, dann ggf. melden
+        settings = load_settings()
+        settings["last_update_check"] = time.time()
+        settings["last_online_version"] = online_version
+        save_settings(settings)
+        self._notify(online_version)
+
+    def _notify(self, online_version):
+        if is_newer_version(online_version, self.local_version):
+            self.update_available.emit(online_version, self.local_version)
@@ -1,67 +1,381 @@
+"""
+Updater für save-backup.exe.
+
+Die neue Version wird nicht direkt über die alte exe geschrieben, sondern in 256-KB-Stücken
+nach save-backup.exe.part geladen (bei großen Dateien in DOWNLOAD_PARTS parallelen
+HTTP-Range-Anfragen). Der Stand steht in save-backup.exe.part.json; ein abgebrochener Download
+wird beim nächsten Start fortgesetzt, solange der Server dieselbe ETag/Größe meldet.
+Vor dem Austausch wird die SHA-256 mit der veröffentlichten Prüfsumme (GITHUB_HASH_URL,
+Format von sha256sum) verglichen. Die alte exe bleibt als save-backup.exe.old liegen und die
+neue wird mit os.replace atomar an ihre Stelle gesetzt; startet sie nicht, wird zurückgerollt
+(auch manuell: updater.py --rollback).
+
+Die App startet den Updater mit --pid <PID> --lock <Lockdatei> und beendet sich. Geladen wird
+sofort; vor dem Austausch wartet der Updater nur, bis die App die Sperre freigibt und genau
+dieser Prozess beendet ist (siehe app_lock.py), ohne Prozessliste und ohne feste Pause.
+
+Alle Adressen lassen sich per Kommandozeile überschreiben, z.B. für einen lokalen Testserver:
+    python updater.py --exe-url http://localhost:8000/save-backup.exe --no-start
+"""
 import requests
 import os
+import json
 import time
+import shutil
+import hashlib
+import argparse
+import threading
 import psutil
 import subprocess
 
+from app_lock import AppLock
+
 # --- KONFIGURATION ---
 GITHUB_VERSION_URL = 'https://raw.githubusercontent.com/Verestrasz2/SaveFile-Backup-Tool/master/version.txt'
 GITHUB_EXE_URL = 'https://github.com/Verestrasz2/SaveFile-Backup-Tool/releases/download/GameFile/save-backup.exe'
+GITHUB_HASH_URL = GITHUB_EXE_URL + '.sha256'
 LOCAL_EXE = 'save-backup.exe'
 LOCAL_VERSION_FILE = 'version.txt'
 
-def kill_process(process_name):
-    for proc in psutil.process_iter(['pid', 'name']):
-        if proc.info['name'] and process_name.lower() in proc.info['name'].lower():
-            print(f"Beende Prozess: {proc.info['name']} (PID {proc.info['pid']})")
-            proc.terminate()
-            try:
-                proc.wait(timeout=5)
-            except psutil.TimeoutExpired:
-                proc.kill()
-
-def download_new_exe():
+PART_SUFFIX = '.part'
+STATE_SUFFIX = '.part.json'
+OLD_SUFFIX = '.old'
+DOWNLOAD_CHUNK = 256 * 1024  # bei Abbruch geht höchstens ein unvollständiges Stück verloren
+HASH_BUFFER = 1024 * 1024
+DOWNLOAD_PARTS = 4
+PARALLEL_MIN_SIZE = 8 * 1024 * 1024  # kleinere Dateien in einem Stück laden
+STATE_SAVE_INTERVAL = 1.0  # Sekunden zwischen zwei Sicherungen des Download-Stands
+REQUEST_TIMEOUT = 30
+START_GRACE = 3  # Sekunden, die die neue exe mindestens laufen muss
+APP_EXIT_TIMEOUT = 30  # so lange darf sich die App zum Beenden Zeit lassen
+
+
+class DownloadError(Exception):
+    pass
+
+
+def wait_for_app(pid=None, lock_path=None, timeout=APP_EXIT_TIMEOUT):
+    """
+    Wartet, bis die App ihre Lockdatei freigibt und der Prozess pid beendet ist. Hängt sie
+    länger als timeout, wird genau dieser Prozess beendet. Gibt die (gehaltene) Sperre zurück.
+    """
+    deadline = time.monotonic() + timeout
+    lock = None
+    if lock_path:
+        lock = AppLock(lock_path)
+        if not lock.acquire(timeout):
+            print("App gibt die Lockdatei nicht frei.")
+    if not pid:
+        return lock
+    try:
+        proc = psutil.Process(pid)
+        if proc.create_time() > psutil.Process().create_time():
+            return lock  # PID gehört inzwischen einem neueren Prozess, die App ist längst weg
+        proc.wait(timeout=max(0.0, deadline - time.monotonic()))
+    except psutil.NoSuchProcess:
+        pass
+    except psutil.TimeoutExpired:
+        if proc.status() == psutil.STATUS_ZOMBIE:
+            return lock  # beendet, nur noch nicht vom Elternprozess abgeholt
+        print(f"App (PID {pid}) reagiert nicht, wird beendet.")
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except psutil.TimeoutExpired:
+            proc.kill()
+    return lock
+
+def fetch_expected_hash(url, session=None):
+    """SHA-256 aus einer Prüfsummen-Datei ("<hex>  <dateiname>" oder nur "<hex>")."""
+    response = (session or requests).get(url, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    digest = response.text.split()[0].lower() if response.text.split() else ""
+    if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+        raise DownloadError(f"Ungültige Prüfsumme unter {url}")
+    return digest
+
+def probe(url, session):
+    """Größe, ETag und Range-Unterstützung per HEAD (Weiterleitungen werden verfolgt)."""
+    response = session.head(url, allow_redirects=True, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    size = response.headers.get('Content-Length')
+    ranges = response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+    return (int(size) if size and size.isdigit() else None), response.headers.get('ETag'), ranges
+
+def load_state(path, url, size, etag):
+    """Gespeicherter Download-Stand, falls er zur selben Datei auf dem Server gehört."""
     try:
-        response = requests.get(GITHUB_EXE_URL, stream=True)
+        with open(path + STATE_SUFFIX, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (state.get('url'), state.get('size'), state.get('etag')) != (url, size, etag) or not etag:
+        return None
+    if not os.path.exists(path + PART_SUFFIX):
+        return None
+    return state
+
+def save_state(path, state):
+    tmp = path + STATE_SUFFIX + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, path + STATE_SUFFIX)
+
+def discard_download(path):
+    for suffix in (PART_SUFFIX, STATE_SUFFIX):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+def split_ranges(size, parts):
+    """[[start, ende (inklusive), geladen]] in etwa gleich großen Stücken."""
+    step = -(-size // parts)
+    return [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+
+def _fetch_range(session, url, part_path, piece, etag, lock, on_bytes):
+    start, end, done = piece
+    if start + done > end:
+        return
+    headers = {'Range': f'bytes={start + done}-{end}'}
+    if etag:
+        headers['If-Range'] = etag  # Datei geändert -> 200 statt 206, dann neu anfangen
+    with session.get(url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT) as response:
         response.raise_for_status()
-        with open(LOCAL_EXE, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
+        if response.status_code != 206:
+            raise DownloadError("Server liefert keine Teilbereiche (mehr)")
+        with open(part_path, 'r+b') as f:
+            f.seek(start + done)
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK):
+                chunk = chunk[:end + 1 - start - piece[2]]
                 f.write(chunk)
-        print("Neue Version erfolgreich heruntergeladen.")
+                with lock:
+                    piece[2] += len(chunk)
+                on_bytes(len(chunk))
+                if piece[2] >= end + 1 - start:
+                    break
+    if piece[2] < end + 1 - start:
+        raise DownloadError(f"Verbindung abgebrochen bei Byte {start + piece[2]}")
+
+def _fetch_whole(session, url, part_path, size, progress):
+    loaded = 0
+    with session.get(url, stream=True, timeout=REQUEST_TIMEOUT) as response:
+        response.raise_for_status()
+        with open(part_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK):
+                f.write(chunk)
+                loaded += len(chunk)
+                if progress:
+                    progress(loaded, size)
+
+def download_file(url, path, parts=DOWNLOAD_PARTS, session=None, progress=None):
+    """
+    Lädt url nach path + ".part" und gibt diesen Pfad zurück. Mit Range-Unterstützung wird
+    parallel geladen und ein früherer Abbruch fortgesetzt, sonst in einem Stück von vorn.
+    progress(geladen, gesamt) wird aus den Download-Threads aufgerufen.
+    """
+    session = session or requests.Session()
+    part_path = path + PART_SUFFIX
+    size, etag, ranges = probe(url, session)
+
+    if not ranges or not size:
+        discard_download(path)
+        _fetch_whole(session, url, part_path, size, progress)
+        return part_path
+
+    state = load_state(path, url, size, etag)
+    if state is None:
+        discard_download(path)
+        with open(part_path, 'wb') as f:
+            f.truncate(size)  # vorbelegen, die Teile schreiben an ihre Position
+        count = parts if size >= PARALLEL_MIN_SIZE else 1
+        state = {'url': url, 'size': size, 'etag': etag, 'ranges': split_ranges(size, count)}
+        save_state(path, state)
+    else:
+        print(f"Setze Download fort ({sum(p[2] for p in state['ranges']) // 1024} KB vorhanden).")
+
+    lock = threading.Lock()
+    last_save = [time.monotonic()]
+    loaded = [sum(piece[2] for piece in state['ranges'])]
+
+    def on_bytes(n):
+        with lock:
+            loaded[0] += n
+            if time.monotonic() - last_save[0] >= STATE_SAVE_INTERVAL:
+                last_save[0] = time.monotonic()
+                save_state(path, state)
+        if progress:
+            progress(loaded[0], size)
+
+    errors = []
+
+    def worker(piece):
+        try:
+            _fetch_range(session, url, part_path, piece, etag, lock, on_bytes)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(piece,), daemon=True) for piece in state['ranges']]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with lock:
+        save_state(path, state)  # Stand für den nächsten Versuch
+    if errors:
+        raise errors[0]
+    return part_path
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(HASH_BUFFER):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def install_file(part_path, path):
+    """Alte Datei als path + ".old" behalten und die neue atomar an ihre Stelle setzen."""
+    if os.path.exists(path):
+        old_path = path + OLD_SUFFIX
+        if os.path.exists(old_path):
+            os.remove(old_path)
+        try:
+            os.link(path, old_path)  # path bleibt bis zum os.replace durchgehend vorhanden
+        except OSError:
+            shutil.copy2(path, old_path)
+    os.replace(part_path, path)
+    try:
+        os.remove(path + STATE_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+def rollback(path=LOCAL_EXE, version_file=LOCAL_VERSION_FILE):
+    """Stellt die beim letzten Update gesicherte exe (und version.txt) wieder her."""
+    restored = False
+    for target in (path, version_file):
+        if os.path.exists(target + OLD_SUFFIX):
+            os.replace(target + OLD_SUFFIX, target)
+            restored = True
+    print("Vorherige Version wiederhergestellt." if restored else "Keine vorherige Version vorhanden.")
+    return restored
+
+def download_new_exe(exe_url=GITHUB_EXE_URL, hash_url=GITHUB_HASH_URL, path=LOCAL_EXE, parts=DOWNLOAD_PARTS,
+                     before_install=None):
+    """
+    Lädt, prüft und installiert die neue exe. Die alte bleibt als .old erhalten.
+    before_install() läuft nach der Prüfung, direkt vor dem Austausch (z.B. auf die App warten).
+    """
+    session = requests.Session()
+    try:
+        expected = fetch_expected_hash(hash_url, session)
+        part_path = download_file(exe_url, path, parts, session)
+        actual = sha256_file(part_path)
+        if actual != expected:
+            discard_download(path)  # kaputt oder manipuliert: nicht fortsetzen, neu laden
+            print(f"Prüfsumme stimmt nicht ({actual} statt {expected}), Download verworfen.")
+            return False
+        if before_install:
+            before_install()
+        install_file(part_path, path)
+        print("Neue Version erfolgreich heruntergeladen und geprüft.")
         return True
     except Exception as e:
         print(f"Fehler beim Herunterladen: {e}")
         return False
 
-def update_version_file():
+def fetch_version(version_url=GITHUB_VERSION_URL):
     try:
-        response = requests.get(GITHUB_VERSION_URL)
+        response = requests.get(version_url, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
-        with open(LOCAL_VERSION_FILE, 'w') as f:
-            f.write(response.text.strip())
+        return response.text.strip()
+    except Exception as e:
+        print(f"Fehler beim Abrufen der version.txt: {e}")
+        return None
+
+def update_version_file(version_url=GITHUB_VERSION_URL, path=LOCAL_VERSION_FILE, version=None):
+    """Schreibt version.txt; version kann vorab mit fetch_version geholt werden."""
+    try:
+        version = version or fetch_version(version_url)
+        if not version:
+            return
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(version)
+        if os.path.exists(path):
+            shutil.copy2(path, path + OLD_SUFFIX)
+        os.replace(tmp, path)
         print("version.txt erfolgreich aktualisiert.")
     except Exception as e:
         print(f"Fehler beim Aktualisieren der version.txt: {e}")
 
+def start_new_version(path=LOCAL_EXE, version_file=LOCAL_VERSION_FILE):
+    """
+    Startet die neue exe; sie muss nach START_GRACE Sekunden noch laufen. Beendet sie sich
+    vorher (auch mit Code 0 - die App beendet sich nie von selbst), wird zurückgerollt.
+    """
+    try:
+        proc = subprocess.Popen([os.path.abspath(path)])
+        proc.wait(timeout=START_GRACE)
+    except subprocess.TimeoutExpired:
+        return True  # läuft
+    except OSError as e:
+        print(f"Neue Version startet nicht: {e}")
+    else:
+        print(f"Neue Version beendet sich sofort (Code {proc.returncode}).")
+    if rollback(path, version_file):
+        subprocess.Popen([os.path.abspath(path)])
+    return False
+
 def main():
-    print("Updater gestartet...")
+    parser = argparse.ArgumentParser(description="Updater für save-backup.exe")
+    parser.add_argument("--exe-url", default=GITHUB_EXE_URL)
+    parser.add_argument("--hash-url", help="Prüfsumme (Standard: exe-url + .sha256)")
+    parser.add_argument("--version-url", default=GITHUB_VERSION_URL)
+    parser.add_argument("--parts", type=int, default=DOWNLOAD_PARTS, help="parallele Range-Anfragen")
+    parser.add_argument("--pid", type=int, help="PID der App, auf deren Ende gewartet wird")
+    parser.add_argument("--lock", help="Lockdatei, die die App beim Beenden freigibt")
+    parser.add_argument("--no-start", action="store_true", help="neue Version nicht starten")
+    parser.add_argument("--rollback", action="store_true", help="vorherige Version wiederherstellen")
+    args = parser.parse_args()
+
+    app_lock = None
 
-    # Schritt 1: Beende die alte App
-    kill_process(LOCAL_EXE)
+    def wait():
+        nonlocal app_lock
+        if args.pid or args.lock:
+            print("Warte auf das Beenden der App...")
+            app_lock = wait_for_app(args.pid, args.lock)
 
-    # Kurze Pause, um sicherzugehen, dass Prozess beendet ist
-    time.sleep(1)
+    if args.rollback:
+        wait()
+        rollback()
+        return
+
+    print("Updater gestartet...")
+    online_version = fetch_version(args.version_url)  # vorab, damit der Neustart nicht darauf wartet
 
-    # Schritt 2: Lade neue EXE herunter
-    if download_new_exe():
+    # Schritt 1: Lade neue EXE herunter und prüfe sie, während sich die App beendet;
+    # Schritt 2: erst direkt vor dem Austausch auf das Ende der App warten
+    ok = download_new_exe(args.exe_url, args.hash_url or args.exe_url + '.sha256', LOCAL_EXE,
+                          max(1, args.parts), before_install=wait)
+    if app_lock:
+        app_lock.release()  # die neue App übernimmt die Sperre
+    if ok:
         # Schritt 3: version.txt aktualisieren
-        update_version_file()
+        update_version_file(args.version_url, version=online_version)
 
         # Schritt 4: neue App starten
-        print("Starte neue Version...")
-        subprocess.Popen([LOCAL_EXE])
+        if not args.no_start:
+            print("Starte neue Version...")
+            start_new_version()
     else:
         print("Update fehlgeschlagen.")
+        if args.pid and not args.no_start and os.path.exists(LOCAL_EXE):
+            if app_lock is None:
+                wait()  # Download vor dem Warten gescheitert: die alte App kann noch laufen
+            if app_lock:
+                app_lock.release()
+            subprocess.Popen([os.path.abspath(LOCAL_EXE)])  # bisherige Version wieder starten
 
 if __name__ == "__main__":
     main()